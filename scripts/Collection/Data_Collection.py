@@ -1,8 +1,9 @@
 import os
-import time
-import requests
 import pandas as pd
 
+from http_transport import Transport
+from rate_limit import RateLimitScheduler, graphql_payload
+
 # -----------------------------
 # Config
 # -----------------------------
@@ -24,6 +25,10 @@ HEADERS = {
     "Accept": "application/vnd.github+json",
 }
 
+# All GitHub requests share one pooled transport and are paced / retried by the rate-limit scheduler
+TRANSPORT = Transport(http2=os.environ.get("HTTP2", "0") == "1")
+SCHEDULER = RateLimitScheduler(send=TRANSPORT.request)
+
 # Collect only items newer than this
 SINCE_ISO = (pd.Timestamp.utcnow() - pd.Timedelta(days=DAYS_BACK)).strftime("%Y-%m-%dT%H:%M:%SZ")
 print(f"Collecting data since: {SINCE_ISO} (last {DAYS_BACK} days)")
@@ -33,6 +38,7 @@ print(f"Collecting data since: {SINCE_ISO} (last {DAYS_BACK} days)")
 # -----------------------------
 PR_QUERY = """
 query($owner:String!, $name:String!, $cursor:String) {
+  rateLimit { cost remaining resetAt }
   repository(owner:$owner, name:$name) {
     pullRequests(
       first: 50,
@@ -74,25 +80,18 @@ def safe_slug(owner: str, repo: str) -> str:
     return f"{owner}__{repo}".replace("/", "__")
 
 def graphql_request(query: str, variables: dict) -> dict:
-    """GraphQL request with timeout + retries"""
-    for attempt in range(1, 6):
-        try:
-            r = requests.post(
-                GRAPHQL_URL,
-                headers=HEADERS,
-                json={"query": query, "variables": variables},
-                timeout=30,
-            )
-            r.raise_for_status()
-            data = r.json()
-            if "errors" in data:
-                raise RuntimeError(data["errors"])
-            return data
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            wait = min(2 ** attempt, 30)
-            print(f"[GraphQL] attempt {attempt}/5 failed ({type(e).__name__}). Retrying in {wait}s...")
-            time.sleep(wait)
-    raise RuntimeError("GraphQL request failed after retries.")
+    """GraphQL request through the rate-limit scheduler (timeouts, retries, limit waits)"""
+    r = SCHEDULER.post(
+        GRAPHQL_URL,
+        headers=HEADERS,
+        json={"query": query, "variables": variables},
+        timeout=30,
+    )
+    r.raise_for_status()
+    data = graphql_payload(r)
+    if "errors" in data:
+        raise RuntimeError(data["errors"])
+    return data
 
 def fetch_all_prs(owner: str, name: str) -> pd.DataFrame:
     rows = []
@@ -144,7 +143,6 @@ def fetch_all_prs(owner: str, name: str) -> pd.DataFrame:
             break
 
         cursor = pr_block["pageInfo"]["endCursor"]
-        time.sleep(0.2)
 
     return pd.DataFrame(rows)
 
@@ -156,7 +154,7 @@ def fetch_workflow_runs(owner: str, repo: str, max_pages: int = 20) -> pd.DataFr
         url = f"{REST_URL}/repos/{owner}/{repo}/actions/runs"
         params = {"per_page": 100, "page": page}
 
-        r = requests.get(url, headers=HEADERS, params=params, timeout=30)
+        r = SCHEDULER.get(url, headers=HEADERS, params=params, timeout=30)
         r.raise_for_status()
         data = r.json()
         runs = data.get("workflow_runs", []) or []
@@ -193,7 +191,6 @@ def fetch_workflow_runs(owner: str, repo: str, max_pages: int = 20) -> pd.DataFr
             })
 
         page += 1
-        time.sleep(0.2)
 
     return pd.DataFrame(rows)
 
@@ -267,5 +264,7 @@ def main():
     print(" -", prs_path)
     print(" -", runs_path)
 
+    TRANSPORT.log_latency_summary()
+
 if __name__ == "__main__":
     main()
@@ -1,19 +1,81 @@
 import os
 import re
+import json
 import time
+import queue
+import random
+import asyncio
+import hashlib
+import inspect
+import argparse
+import threading
 import subprocess
 from pathlib import Path
+from collections import Counter
+from urllib.parse import urlsplit
+from functools import partial, lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta, timezone
 
 import requests
 import pandas as pd
 
+from http_cache import ConditionalCache
+from http_transport import Transport
+from landing_zone import LandingZone
+from page_size import PageSizeController
+from columnar import RUN_FIELDS, ColumnBuffer, ColumnChunk, loads
+from credentials import CredentialPool
+from rate_limit import graphql_payload
+
 # =============================
 # CONFIG
 # =============================
 DAYS_BACK = 750
 CHUNK_DAYS = 14
 
+# Sharded PR mode (--sharded-prs)
+PR_SHARD_DAYS = 30
+PR_SHARD_WORKERS = int(os.environ.get("PR_SHARD_WORKERS", "6"))
+SEARCH_RESULT_CAP = 1000  # GitHub search never returns more than this per query
+
+# Lean PR mode (--lean-prs / --review-details): PRs per nodes(ids:) call in the review pass
+REVIEW_BATCH_SIZE = 50
+# Alias batching (--batch-repos): streams per GraphQL document, adapted to the returned cost
+ALIAS_BATCH_START = 4
+ALIAS_BATCH_MAX = 20
+ALIAS_BATCH_COST_TARGET = 10
+
+REVIEW_COLUMNS = ["owner", "repo", "repo_full", "pr_number", "review_created_at", "review_state", "reviewer"]
+
+# Incremental mode (--incremental): runs are re-scanned this many days before the
+# runs watermark so that queued / in-progress runs get their final status
+RUN_MUTABLE_TAIL_DAYS = 3
+
+# Workflow runs: pages per window are planned from total_count and fetched on a worker pool
+RUNS_PER_PAGE = 100
+RUN_PAGE_WORKERS = int(os.environ.get("RUN_PAGE_WORKERS", "6"))
+
+# Refresh of mutable records: open PRs per nodes(ids:) call, concurrent /actions/runs/{id} lookups
+REFRESH_PR_BATCH_SIZE = 100
+REFRESH_RUN_WORKERS = int(os.environ.get("REFRESH_RUN_WORKERS", "6"))
+
+# Job / timing enrichment (--enrich-jobs): concurrent per-run lookups, stopped while the
+# core budget of the best credential is below JOB_ENRICH_RESERVE (the rest resumes next run)
+JOB_ENRICH_WORKERS = int(os.environ.get("JOB_ENRICH_WORKERS", "8"))
+JOB_ENRICH_RESERVE = int(os.environ.get("JOB_ENRICH_RESERVE", "500"))
+
+# Workflow-run windows are sized from a per-repo density profile (runs per day):
+# neighbouring sparse days are coalesced up to RUN_WINDOW_TARGET runs, and a window
+# whose total_count is over the ~1000-result listing cap is bisected down to RUN_WINDOW_MIN.
+# Windows never cross RUN_PLAN_BLOCK_DAYS blocks anchored at RUN_PLAN_ANCHOR, so closed
+# windows keep the same boundaries (and pinned cache entries) from one run to the next.
+RUN_LISTING_CAP = 1000
+RUN_WINDOW_TARGET = 800
+RUN_WINDOW_MIN = timedelta(hours=1)
+RUN_PLAN_BLOCK_DAYS = 84
+RUN_PLAN_ANCHOR = datetime(2020, 1, 6, tzinfo=timezone.utc)
+
 REPOS = [
     ("prometheus", "prometheus"),
     ("docker", "cli"),
@@ -22,6 +84,48 @@ REPOS = [
     # ("grafana", "grafana"),
 ]
 
+# Async mode (--async): bounded concurrency per API host and per repo
+HOST_CONCURRENCY = int(os.environ.get("HOST_CONCURRENCY", "8"))
+REPO_CONCURRENCY = int(os.environ.get("REPO_CONCURRENCY", "3"))
+
+# HTTP transport: pooled keep-alive sessions; HTTP2=1 multiplexes over HTTP/2 when httpx is installed
+HTTP2 = os.environ.get("HTTP2", "0") == "1"
+
+# On-disk conditional-request cache for REST GETs (HTTP_CACHE=0 disables it)
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE", "1") == "1"
+HTTP_CACHE_MAX_MB = int(os.environ.get("HTTP_CACHE_MAX_MB", "512"))
+# Pinned entries not served for this many days are dropped (their window no longer matches the plan)
+HTTP_CACHE_PIN_TTL_DAYS = int(os.environ.get("HTTP_CACHE_PIN_TTL_DAYS", "14"))
+# Run windows that closed longer ago than this are pinned in the cache and never
+# refetched (GitHub only allows re-running workflow runs for 30 days)
+RUN_WINDOW_PIN_DAYS = 35
+
+# Sampled preview (--sample [FRACTION]): weeks are drawn at random within strata of
+# SAMPLE_STRATUM_WEEKS consecutive weeks; only those weeks' PRs and runs are fetched
+SAMPLE_FRACTION = 0.1
+SAMPLE_STRATUM_WEEKS = 13
+
+# Daemon mode (--daemon): repos are probed in batches and only changed repos are synced.
+# Each repo's poll interval halves when it changed and grows 1.5x when it did not,
+# within [DAEMON_MIN_INTERVAL_S, DAEMON_MAX_INTERVAL_S], with +-DAEMON_JITTER spread.
+DAEMON_MIN_INTERVAL_S = int(os.environ.get("DAEMON_MIN_INTERVAL_S", "600"))
+DAEMON_MAX_INTERVAL_S = int(os.environ.get("DAEMON_MAX_INTERVAL_S", "21600"))
+DAEMON_JITTER = 0.2
+PROBE_BATCH_SIZE = 25
+
+# Count fast path (--counts): one search(...){ issueCount } per (repo, metric, week),
+# COUNT_BATCH_SIZE of them aliased into one GraphQL document
+COUNT_BATCH_SIZE = int(os.environ.get("COUNT_BATCH_SIZE", "50"))
+
+# Staged pipeline (--pipeline): fetch -> enrich -> write threads joined by bounded queues
+PIPELINE_FETCH_WORKERS = int(os.environ.get("PIPELINE_FETCH_WORKERS", "6"))
+PIPELINE_ENRICH_WORKERS = int(os.environ.get("PIPELINE_ENRICH_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = 8
+PIPELINE_CHUNK_ROWS = 5000
+
+# Landing zone for raw API pages + resume checkpoints (LANDING=0 disables it)
+LANDING_ENABLED = os.environ.get("LANDING", "1") == "1"
+
 CD_WORKFLOW_NAME_PATTERNS = [r"deploy", r"release", r"publish", r"delivery", r"cd"]
 
 # Sonar (optional)
@@ -30,15 +134,24 @@ SONAR_HOST_URL = os.environ.get("SONAR_HOST_URL")
 SONAR_TOKEN = os.environ.get("SONAR_TOKEN")
 SONAR_PROJECT_KEY_PREFIX = os.environ.get("SONAR_PROJECT_KEY_PREFIX", "mscthesis")
 
-GRAPHQL_URL = "https://api.github.com/graphql"
-REST_URL = "https://api.github.com"
+# GITHUB_API_URL can point the collector at a local mock server
+REST_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GRAPHQL_URL = f"{REST_URL}/graphql"
 
+# Credential pool: GITHUB_TOKENS="tok1,tok2,..." (personal or installation tokens), else GITHUB_TOKEN.
+# GITHUB_TOKEN_PINS="owner/repo=0,owner=1" pins a repo (or every repo of an owner) to a token by index.
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
-if not GITHUB_TOKEN:
-    raise RuntimeError("Missing GITHUB_TOKEN env var. Set it before running.")
+GITHUB_TOKENS = [t.strip() for t in os.environ.get("GITHUB_TOKENS", "").split(",") if t.strip()]
+if not GITHUB_TOKENS and GITHUB_TOKEN:
+    GITHUB_TOKENS = [GITHUB_TOKEN]
+# indexes are checked by CredentialPool against the configured tokens
+GITHUB_TOKEN_PINS = {
+    key.strip(): idx.strip()
+    for key, idx in (pin.split("=", 1) for pin in os.environ.get("GITHUB_TOKEN_PINS", "").split(",") if "=" in pin)
+}
 
+# Authorization is set per request by the credential pool
 HEADERS = {
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
     "Accept": "application/vnd.github+json",
 }
 
@@ -53,223 +166,1373 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_RAW = PROJECT_ROOT / "data" / "raw"
 DATA_DERIVED = PROJECT_ROOT / "data" / "derived"
 REPO_CACHE = PROJECT_ROOT / "data" / "repos"
-DATA_RAW.mkdir(parents=True, exist_ok=True)
-DATA_DERIVED.mkdir(parents=True, exist_ok=True)
-REPO_CACHE.mkdir(parents=True, exist_ok=True)
+SYNC_STATE_PATH = DATA_RAW / "sync_state.json"
+DAEMON_STATE_PATH = DATA_RAW / "daemon_state.json"
+PAGE_SIZE_PATH = DATA_RAW / "page_sizes.json"
+HTTP_CACHE_PATH = PROJECT_ROOT / "data" / "http_cache" / "github.sqlite"
+DATA_LANDING = PROJECT_ROOT / "data" / "landing"
 
 def log(msg: str):
     print(msg, flush=True)
 
+# Importing this module has no side effects and needs no token, so offline tools
+# (git_mining, webhook_receiver, gharchive) can reuse its schemas and writers.
+def require_github_tokens():
+    if not GITHUB_TOKENS:
+        raise RuntimeError("Missing GITHUB_TOKEN (or GITHUB_TOKENS) env var. Set it before running.")
+
+def ensure_data_dirs():
+    DATA_RAW.mkdir(parents=True, exist_ok=True)
+    DATA_DERIVED.mkdir(parents=True, exist_ok=True)
+    REPO_CACHE.mkdir(parents=True, exist_ok=True)
+
+# =============================
+# HTTP stack: scheduler -> conditional cache -> pooled transport
+# =============================
+# Every GitHub and Sonar request uses this pooled transport
+TRANSPORT = Transport(
+    pool_sizes={urlsplit(REST_URL).netloc: HOST_CONCURRENCY},
+    http2=HTTP2,
+    log=log,
+)
+# REST GETs are revalidated with ETag / Last-Modified (304s are free) or served from pinned entries
+HTTP_CACHE = ConditionalCache(
+    TRANSPORT.request,
+    HTTP_CACHE_PATH,
+    max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024,
+    enabled=HTTP_CACHE_ENABLED,
+    pin_ttl_days=HTTP_CACHE_PIN_TTL_DAYS,
+    log=log,
+)
+# Every GitHub request goes through this pool: one rate-limit scheduler (pacing, waits,
+# retries) per credential, requests routed to the credential with the most headroom.
+# Pinned cache entries are answered before any budget is booked. Without tokens
+# (offline imports) the pool is empty and fails on its first request.
+SCHEDULER = CredentialPool(GITHUB_TOKENS, send=HTTP_CACHE.request, pins=GITHUB_TOKEN_PINS,
+                           peek=HTTP_CACHE.pinned, log=log)
+
+# PR pages (PrFields) are sized per repo between 10 and 100 from latency, cost and errors
+PAGE_SIZES = PageSizeController(PAGE_SIZE_PATH, log=log)
+
+# Raw pages of full backfills are landed as they arrive; unfinished streams resume from their checkpoint
+LANDING = LandingZone(DATA_LANDING, enabled=LANDING_ENABLED)
+
 def safe_slug(owner: str, repo: str) -> str:
     return f"{owner}__{repo}"
 
 def to_dt(s):
     return pd.to_datetime(s, utc=True, errors="coerce")
 
+# One semaphore per API host, shared by every thread that talks to it
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        sem = _host_slots.get(host)
+        if sem is None:
+            sem = _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+    return sem
+
 # =============================
 # GraphQL PR Query (DESC)
 # =============================
+PR_CORE_FRAGMENT = """
+fragment PrCore on PullRequest {
+  id
+  number
+  createdAt
+  mergedAt
+  closedAt
+  state
+  isDraft
+  additions
+  deletions
+  changedFiles
+  commits { totalCount }
+  author { login }
+  mergeCommit { oid }
+}
+"""
+
+PR_FIELDS_FRAGMENT = """
+fragment PrFields on PullRequest {
+  ...PrCore
+  reviews(first: 100) {
+    nodes {
+      createdAt
+      state
+      author { login }
+    }
+  }
+}
+""" + PR_CORE_FRAGMENT
+
+# Lean mode (--lean-prs): only the first review plus totalCount on the main page;
+# full review sets come from a second batched nodes(ids:) pass when needed
+PR_LEAN_FRAGMENT = """
+fragment PrLean on PullRequest {
+  ...PrCore
+  reviews(first: 1) {
+    totalCount
+    nodes {
+      createdAt
+      state
+      author { login }
+    }
+  }
+}
+""" + PR_CORE_FRAGMENT
+
 PR_QUERY = """
+query($owner:String!, $name:String!, $cursor:String, $first:Int!) {
+  rateLimit { cost remaining resetAt }
+  repository(owner:$owner, name:$name) {
+    pullRequests(
+      first: $first,
+      after: $cursor,
+      orderBy: {field: CREATED_AT, direction: DESC},
+      states: [OPEN, CLOSED, MERGED]
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...PrFields }
+    }
+  }
+}
+""" + PR_FIELDS_FRAGMENT
+
+PR_LEAN_QUERY = """
 query($owner:String!, $name:String!, $cursor:String) {
+  rateLimit { cost remaining resetAt }
   repository(owner:$owner, name:$name) {
     pullRequests(
-      first: 50,
+      first: 100,
       after: $cursor,
       orderBy: {field: CREATED_AT, direction: DESC},
       states: [OPEN, CLOSED, MERGED]
     ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...PrLean }
+    }
+  }
+}
+""" + PR_LEAN_FRAGMENT
+
+REVIEW_NODE_FIELDS = """
       pageInfo { hasNextPage endCursor }
       nodes {
-        number
         createdAt
-        mergedAt
-        closedAt
         state
-        isDraft
-        additions
-        deletions
-        changedFiles
-        commits { totalCount }
         author { login }
-        mergeCommit { oid }
-        reviews(first: 100) {
-          nodes {
-            createdAt
-            state
-            author { login }
-          }
-        }
       }
+"""
+
+REVIEWS_BY_IDS_QUERY = """
+query($ids:[ID!]!) {
+  rateLimit { cost remaining resetAt }
+  nodes(ids:$ids) {
+    ... on PullRequest {
+      id
+      number
+      reviews(first: 100) {""" + REVIEW_NODE_FIELDS + """      }
     }
   }
 }
 """
 
-def graphql_request(query: str, variables: dict) -> dict:
-    for attempt in range(1, 6):
+REVIEWS_PAGE_QUERY = """
+query($id:ID!, $cursor:String) {
+  rateLimit { cost remaining resetAt }
+  node(id:$id) {
+    ... on PullRequest {
+      reviews(first: 100, after: $cursor) {""" + REVIEW_NODE_FIELDS + """      }
+    }
+  }
+}
+"""
+
+# Incremental mode (--incremental): most recently updated first
+PR_UPDATED_QUERY = """
+query($owner:String!, $name:String!, $cursor:String, $first:Int!) {
+  rateLimit { cost remaining resetAt }
+  repository(owner:$owner, name:$name) {
+    pullRequests(
+      first: $first,
+      after: $cursor,
+      orderBy: {field: UPDATED_AT, direction: DESC},
+      states: [OPEN, CLOSED, MERGED]
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { updatedAt ...PrFields }
+    }
+  }
+}
+""" + PR_FIELDS_FRAGMENT
+
+# Refresh mode (--refresh): re-read still-open PRs by node id
+PR_REFRESH_QUERY = """
+query($ids:[ID!]!) {
+  rateLimit { cost remaining resetAt }
+  nodes(ids:$ids) {
+    ... on PullRequest { ...PrFields }
+  }
+}
+""" + PR_FIELDS_FRAGMENT
+
+# Date-sharded mode (--sharded-prs): search(type: ISSUE) per created: range
+PR_SEARCH_QUERY = """
+query($q:String!, $cursor:String, $first:Int!) {
+  rateLimit { cost remaining resetAt }
+  search(type: ISSUE, query: $q, first: $first, after: $cursor) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes { ...PrFields }
+  }
+}
+""" + PR_FIELDS_FRAGMENT
+
+# =============================
+# Metric-driven projection (--metrics)
+# Each derived table declares the raw columns it reads (in derive_tables' return
+# order). A targeted run only selects those PR fields in GraphQL and skips every
+# source that none of the requested tables reads.
+# =============================
+DERIVED_TABLES = {
+    "review_overhead_weekly": {
+        "prs": ["created_at", "merged_at", "closed_at", "state", "first_review_at", "review_count",
+                "additions", "deletions"],
+    },
+    "ci_weekly": {"runs": ["run_started_at", "updated_at", "conclusion"]},
+    "ci_failure_volatility_weekly": {"runs": ["run_started_at", "updated_at", "conclusion"]},
+    "ci_flakiness_weekly": {"runs": ["run_started_at", "head_sha"]},
+    "merge_frequency_weekly": {"prs": ["merged_at", "state"]},
+    "release_frequency_monthly": {"releases": ["published_at", "created_at"]},
+    "cd_workflow_weekly": {"runs": ["run_started_at", "updated_at", "conclusion", "workflow_name"]},
+    "time_to_release_monthly": {"prs": ["merged_at", "state"], "releases": ["published_at", "created_at"]},
+}
+
+# PrCore selections per raw PR column; id, number and createdAt are always selected (paging, upserts)
+PR_CORE_SELECTIONS = {
+    "merged_at": "mergedAt",
+    "closed_at": "closedAt",
+    "state": "state",
+    "is_draft": "isDraft",
+    "additions": "additions",
+    "deletions": "deletions",
+    "changed_files": "changedFiles",
+    "commit_count": "commits { totalCount }",
+    "author": "author { login }",
+    "merge_sha": "mergeCommit { oid }",
+}
+PR_REVIEW_COLUMNS = {"first_review_at", "review_count"}
+
+# Set by main() from --metrics: raw PR columns to select, or None for the full selection
+PR_PROJECTION = None
+
+def metric_needs(tables: list) -> dict:
+    """{source: set of raw columns} read by the given derived tables."""
+    needs = {}
+    for table in tables:
+        for source, columns in DERIVED_TABLES[table].items():
+            needs.setdefault(source, set()).update(columns)
+    return needs
+
+def pr_core_fragment(columns: frozenset) -> str:
+    fields = ["id", "number", "createdAt"] + [sel for col, sel in PR_CORE_SELECTIONS.items() if col in columns]
+    return "\nfragment PrCore on PullRequest {\n" + "".join(f"  {f}\n" for f in fields) + "}\n"
+
+@lru_cache(maxsize=None)
+def project_pr_query(query: str, columns: frozenset) -> str:
+    """Narrow the PrCore fragment (and review selections) of a PR query to the given raw columns."""
+    if PR_CORE_FRAGMENT not in query:
+        return query
+    query = query.replace(PR_CORE_FRAGMENT, pr_core_fragment(columns))
+    if columns & PR_REVIEW_COLUMNS:
+        # only review timestamps (first_review_at) and totalCount are read into PR rows
+        return query.replace("      state\n      author { login }\n", "")
+    return re.sub(r"  reviews\(first: \d+\) \{\n.*?\n  \}\n", "", query, flags=re.S)
+
+def skip_source(source: str, owner: str, repo: str) -> pd.DataFrame:
+    """Fetcher for a source no requested table reads: keeps the raw table, no API calls."""
+    prefix, columns = {
+        "prs": ("prs", PR_COLUMNS),
+        "runs": ("workflow_runs", RUN_COLUMNS),
+        "releases": ("releases", RELEASE_COLUMNS),
+    }[source]
+    existing = read_raw_table(owner, repo, prefix, columns)
+    log(f"[{owner}/{repo}] {source}: not needed by the requested metrics. skipped.")
+    return existing if existing is not None else pd.DataFrame(columns=columns)
+
+# Always filled in by a projected fetch: row identity and the paging/upsert keys
+PR_IDENTITY_COLUMNS = ["owner", "repo", "repo_full", "pr_number", "pr_node_id", "created_at"]
+
+def merge_projected_prs(owner: str, repo: str, fetch=None) -> pd.DataFrame:
+    """
+    Projected PR fetch merged into the existing raw table. Only the selected
+    columns of re-fetched PRs are updated, so the other columns keep their values;
+    PRs not in the raw table yet are added with the selected columns only.
+    """
+    fetched = fetch(owner, repo)
+    existing = read_raw_table(owner, repo, "prs", PR_COLUMNS)
+    if existing is None or existing.empty:
+        return fetched
+    if fetched is None or fetched.empty:
+        return existing
+
+    columns = [c for c in PR_COLUMNS if c in PR_PROJECTION and c not in PR_IDENTITY_COLUMNS]
+    merged = existing.drop_duplicates(subset=["pr_number"], keep="last").set_index("pr_number")
+    delta = fetched.reindex(columns=PR_COLUMNS).drop_duplicates(subset=["pr_number"], keep="last").set_index("pr_number")
+    known = delta.index.intersection(merged.index)
+    for col in columns:
+        merged[col] = merged[col].astype(object)
+        merged.loc[known, col] = delta.loc[known, col].astype(object)
+    added = delta.loc[delta.index.difference(merged.index)]
+    log(f"[{owner}/{repo}] projected PRs: {len(known)} updated ({', '.join(columns)}), {len(added)} added")
+    merged = pd.concat([merged, added]).reset_index()[PR_COLUMNS]
+    return merged.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+
+def effective_query(query: str) -> str:
+    """The query as sent: narrowed to PR_PROJECTION on targeted runs."""
+    return project_pr_query(query, PR_PROJECTION) if PR_PROJECTION is not None else query
+
+def query_shape(query: str) -> str:
+    """Short fingerprint of the query as sent; landing streams only resume pages of the same shape."""
+    return hashlib.sha1(effective_query(query).encode("utf-8")).hexdigest()[:12]
+
+def graphql_request(query: str, variables: dict, retry_transient: bool = True) -> dict:
+    query = effective_query(query)
+    # retries, backoff and rate-limit waits are handled by SCHEDULER
+    with host_slot(GRAPHQL_URL):
+        r = SCHEDULER.post(
+            GRAPHQL_URL,
+            headers=HEADERS,
+            json={"query": query, "variables": variables},
+            timeout=30,
+            retry_transient=retry_transient,
+        )
+    r.raise_for_status()
+    # already decoded by SCHEDULER (rateLimit / RATE_LIMITED checks)
+    data = graphql_payload(r)
+    if "errors" in data:
+        raise RuntimeError(data["errors"])
+    return data
+
+def is_transient_error(e: Exception) -> bool:
+    """Timeouts and 5xx, including GraphQL's own 'timeout' errors returned with HTTP 200."""
+    if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(e, requests.exceptions.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(e, RuntimeError) and "timeout" in str(e).lower()
+
+def graphql_page(owner: str, repo: str, query: str, variables: dict) -> dict:
+    """One PR page of PAGE_SIZES' current size for the repo; a timeout / 5xx shrinks it and retries."""
+    key = f"{owner}/{repo}"
+    while True:
+        first = PAGE_SIZES.size(key)
+        # at the smallest size, fall back to SCHEDULER's own retries
+        at_min = first <= PAGE_SIZES.min_size
+        t0 = time.perf_counter()
         try:
-            r = requests.post(
-                GRAPHQL_URL,
-                headers=HEADERS,
-                json={"query": query, "variables": variables},
-                timeout=30,
-            )
-            r.raise_for_status()
-            data = r.json()
-            if "errors" in data:
-                raise RuntimeError(data["errors"])
-            return data
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            wait = min(2 ** attempt, 30)
-            log(f"[GraphQL] attempt {attempt}/5 failed ({type(e).__name__}). retry {wait}s")
-            time.sleep(wait)
-    raise RuntimeError("GraphQL request failed after retries.")
-
-def fetch_all_prs(owner: str, repo: str) -> pd.DataFrame:
+            data = graphql_request(query, {**variables, "first": first}, retry_transient=at_min)
+        except (requests.exceptions.RequestException, RuntimeError) as e:
+            if at_min or not is_transient_error(e) or not PAGE_SIZES.shrink(key, type(e).__name__):
+                raise
+            continue
+        cost = (data["data"].get("rateLimit") or {}).get("cost")
+        PAGE_SIZES.observe(key, time.perf_counter() - t0, cost)
+        return data
+
+def pr_row(owner: str, repo: str, pr: dict) -> dict:
+    review_conn = pr.get("reviews", {}) or {}
+    reviews = review_conn.get("nodes", []) or []
+    review_times = [rv["createdAt"] for rv in reviews if rv.get("createdAt")]
+    first_review = min(review_times) if review_times else None
+
+    return {
+        "owner": owner,
+        "repo": repo,
+        "repo_full": f"{owner}/{repo}",
+        "pr_number": pr["number"],
+        "pr_node_id": pr.get("id"),
+        "created_at": pr["createdAt"],
+        "merged_at": pr.get("mergedAt"),
+        "closed_at": pr.get("closedAt"),
+        "state": pr.get("state"),
+        "is_draft": pr.get("isDraft"),
+        "additions": pr.get("additions"),
+        "deletions": pr.get("deletions"),
+        "changed_files": pr.get("changedFiles"),
+        "commit_count": pr["commits"]["totalCount"] if pr.get("commits") else None,
+        "author": (pr["author"]["login"] if pr.get("author") else None),
+        "merge_sha": (pr["mergeCommit"]["oid"] if pr.get("mergeCommit") else None),
+        "first_review_at": first_review,
+        # lean pages only carry the first review, but always the totalCount
+        "review_count": review_conn.get("totalCount", len(reviews)) if "reviews" in pr else None,
+    }
+
+def review_row(owner: str, repo: str, pr_number: int, rv: dict) -> dict:
+    return {
+        "owner": owner,
+        "repo": repo,
+        "repo_full": f"{owner}/{repo}",
+        "pr_number": pr_number,
+        "review_created_at": rv.get("createdAt"),
+        "review_state": rv.get("state"),
+        "reviewer": (rv["author"]["login"] if rv.get("author") else None),
+    }
+
+def fetch_review_details(owner: str, repo: str, pr_ids: dict) -> list:
+    """
+    Second pass for lean mode: full review sets for {node id: pr_number}, REVIEW_BATCH_SIZE
+    PRs per nodes(ids:) call, then node(id:) pages for PRs with more than 100 reviews.
+    """
+    rows = []
+    ids = list(pr_ids)
+    for i in range(0, len(ids), REVIEW_BATCH_SIZE):
+        batch = ids[i:i + REVIEW_BATCH_SIZE]
+        data = graphql_request(REVIEWS_BY_IDS_QUERY, {"ids": batch})
+        for node in data["data"]["nodes"] or []:
+            if not node:
+                continue
+            conn = node["reviews"]
+            rows.extend(review_row(owner, repo, node["number"], rv) for rv in conn["nodes"] or [])
+
+            while conn["pageInfo"]["hasNextPage"]:
+                page = graphql_request(REVIEWS_PAGE_QUERY, {"id": node["id"], "cursor": conn["pageInfo"]["endCursor"]})
+                conn = page["data"]["node"]["reviews"]
+                rows.extend(review_row(owner, repo, node["number"], rv) for rv in conn["nodes"] or [])
+
+    log(f"[{owner}/{repo}] review details: {len(rows)} reviews for {len(ids)} PRs")
+    return rows
+
+def fetch_all_prs(owner: str, repo: str, lean: bool = False, review_details: bool = False,
+                  on_page=None) -> pd.DataFrame:
+    """All PRs since SINCE_ISO, newest first; on_page(df) also gets each page's rows as they come in."""
     rows = []
     cursor = None
     page = 0
+    query = PR_LEAN_QUERY if lean else PR_QUERY
+    # lean mode: PRs whose full review set still has to be fetched
+    review_rows = []
+    multi_review = {}
+
+    def take(nodes) -> bool:
+        """Map one page of PR nodes; True once PRs older than SINCE_ISO are reached."""
+        start = len(rows)
+        older = False
+        for pr in nodes:
+            if pr["createdAt"] < SINCE_ISO:
+                older = True
+                break
 
-    while True:
+            rows.append(pr_row(owner, repo, pr))
+            if review_details:
+                reviews = pr["reviews"]
+                if reviews["totalCount"] > len(reviews["nodes"]):
+                    multi_review[pr["id"]] = pr["number"]
+                else:
+                    review_rows.extend(review_row(owner, repo, pr["number"], rv) for rv in reviews["nodes"])
+        if on_page is not None and len(rows) > start:
+            on_page(pd.DataFrame(rows[start:]))
+        return older
+
+    # projected pages lack fields: kept apart from the full streams --rebuild-from-landing reads
+    stream = LANDING.stream(owner, repo, "prs_projected" if PR_PROJECTION is not None else "prs_lean" if lean else "prs",
+                            shape=query_shape(query))
+    ckpt = stream.start()
+    finished = False
+    if ckpt:
+        for rec in stream.pages():
+            finished = take(rec["items"]) or finished
+        cursor = ckpt.get("cursor")
+        page = ckpt.get("page", 0)
+        finished = finished or not ckpt.get("has_next", True)
+        log(f"[{owner}/{repo}] resuming PRs from landing zone after page {page} ({len(rows)} rows)")
+
+    while not finished:
         page += 1
-        data = graphql_request(PR_QUERY, {"owner": owner, "name": repo, "cursor": cursor})
+        if lean:
+            data = graphql_request(query, {"owner": owner, "name": repo, "cursor": cursor})
+        else:
+            data = graphql_page(owner, repo, query, {"owner": owner, "name": repo, "cursor": cursor})
         pr_block = data["data"]["repository"]["pullRequests"]
         nodes = pr_block["nodes"] or []
+        has_next = pr_block["pageInfo"]["hasNextPage"]
+        stream.append({"page": page, "cursor": pr_block["pageInfo"]["endCursor"], "has_next": has_next}, nodes)
         if not nodes:
             break
 
         log(f"[{owner}/{repo}] PR page {page} fetched. total rows: {len(rows)}")
 
-        for pr in nodes:
-            if pr["createdAt"] < SINCE_ISO:
-                log(f"[{owner}/{repo}] reached PRs older than SINCE. stopping PRs.")
-                return pd.DataFrame(rows)
-
-            reviews = pr.get("reviews", {}).get("nodes", []) or []
-            review_times = [rv["createdAt"] for rv in reviews if rv.get("createdAt")]
-            first_review = min(review_times) if review_times else None
-
-            rows.append({
-                "owner": owner,
-                "repo": repo,
-                "repo_full": f"{owner}/{repo}",
-                "pr_number": pr["number"],
-                "created_at": pr["createdAt"],
-                "merged_at": pr["mergedAt"],
-                "closed_at": pr["closedAt"],
-                "state": pr["state"],
-                "is_draft": pr["isDraft"],
-                "additions": pr["additions"],
-                "deletions": pr["deletions"],
-                "changed_files": pr["changedFiles"],
-                "commit_count": pr["commits"]["totalCount"] if pr.get("commits") else None,
-                "author": (pr["author"]["login"] if pr.get("author") else None),
-                "merge_sha": (pr["mergeCommit"]["oid"] if pr.get("mergeCommit") else None),
-                "first_review_at": first_review,
-                "review_count": len(reviews),
-            })
-
-        if not pr_block["pageInfo"]["hasNextPage"]:
+        if take(nodes):
+            log(f"[{owner}/{repo}] reached PRs older than SINCE. stopping PRs.")
+            break
+        if not has_next:
             break
         cursor = pr_block["pageInfo"]["endCursor"]
-        time.sleep(0.2)
+
+    stream.finish()
+
+    if review_details:
+        review_rows.extend(fetch_review_details(owner, repo, multi_review))
+        reviews_path = DATA_RAW / f"pr_reviews__{safe_slug(owner, repo)}.csv"
+        pd.DataFrame(review_rows, columns=REVIEW_COLUMNS).to_csv(reviews_path, index=False)
+        log(f"[{owner}/{repo}] saved review details: {reviews_path}")
 
     return pd.DataFrame(rows)
 
 # =============================
-# Workflow runs in windows (fixes 2 months issue)
+# PRs via created: date shards (one search cursor chain per shard, paged in parallel)
 # =============================
-def fetch_workflow_runs_by_windows(owner: str, repo: str, chunk_days: int = 14) -> pd.DataFrame:
+def iso_z(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def pr_date_shards(start: datetime, end: datetime, shard_days: int = PR_SHARD_DAYS):
+    shards = []
+    cur = start
+    while cur < end:
+        nxt = min(cur + timedelta(days=shard_days), end)
+        shards.append((cur, nxt))
+        cur = nxt
+    return shards
+
+def fetch_pr_shard(owner: str, repo: str, shard_start: datetime, shard_end: datetime, qualifier: str = "created"):
+    """Page one created: (or merged:) shard. Returns (rows, None), or (None, sub_shards) if the shard is over the search cap."""
+    q = f"repo:{owner}/{repo} is:pr {qualifier}:{iso_z(shard_start)}..{iso_z(shard_end)}"
     rows = []
-    end = datetime.now(timezone.utc)
-    start = end - timedelta(days=DAYS_BACK)
+    cursor = None
+    page = 0
 
-    window_start = start
-    while window_start < end:
-        window_end = min(window_start + timedelta(days=chunk_days), end)
-        created_param = f"{window_start.date()}..{window_end.date()}"
-        log(f"[{owner}/{repo}] workflows window: {created_param}")
+    while True:
+        page += 1
+        data = graphql_page(owner, repo, PR_SEARCH_QUERY, {"q": q, "cursor": cursor})
+        block = data["data"]["search"]
+
+        if page == 1 and block["issueCount"] > SEARCH_RESULT_CAP:
+            if shard_end - shard_start > timedelta(hours=1):
+                mid = (shard_start + (shard_end - shard_start) / 2).replace(microsecond=0)
+                log(f"[{owner}/{repo}] PR shard {iso_z(shard_start)}..{iso_z(shard_end)} has "
+                    f"{block['issueCount']} results (> {SEARCH_RESULT_CAP}). splitting.")
+                return None, [(shard_start, mid), (mid, shard_end)]
+            log(f"[{owner}/{repo}] WARNING: PR shard {iso_z(shard_start)}..{iso_z(shard_end)} "
+                f"over search cap and cannot be split further; results will be truncated.")
+
+        for pr in block["nodes"] or []:
+            if pr and pr.get("number") is not None:
+                rows.append(pr_row(owner, repo, pr))
+
+        if not block["pageInfo"]["hasNextPage"]:
+            break
+        cursor = block["pageInfo"]["endCursor"]
 
-        page = 1
-        while True:
-            url = f"{REST_URL}/repos/{owner}/{repo}/actions/runs"
-            params = {"per_page": 100, "page": page, "created": created_param}
-
-            r = requests.get(url, headers=HEADERS, params=params, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-            runs = data.get("workflow_runs", []) or []
-            if not runs:
-                break
+    log(f"[{owner}/{repo}] PR shard {shard_start.date()}..{shard_end.date()} done: {len(rows)} PRs in {page} pages")
+    return rows, None
 
-            for run in runs:
-                prs = run.get("pull_requests", []) or []
-                pr_numbers = [p.get("number") for p in prs if p.get("number")]
+def fetch_all_prs_sharded(owner: str, repo: str, shard_days: int = PR_SHARD_DAYS,
+                          shards: list = None, qualifier: str = "created") -> pd.DataFrame:
+    end = datetime.now(timezone.utc)
+    shards = shards or pr_date_shards(SINCE_DT, end, shard_days)
+    rows = []
 
-                rows.append({
-                    "owner": owner,
-                    "repo": repo,
-                    "repo_full": f"{owner}/{repo}",
-                    "run_id": run.get("id"),
-                    "workflow_name": run.get("name"),
-                    "event": run.get("event"),
-                    "status": run.get("status"),
-                    "conclusion": run.get("conclusion"),
-                    "created_at": run.get("created_at"),
-                    "run_started_at": run.get("run_started_at"),
-                    "updated_at": run.get("updated_at"),
-                    "head_sha": run.get("head_sha"),
-                    "pr_numbers": pr_numbers,
-                })
+    with ThreadPoolExecutor(max_workers=PR_SHARD_WORKERS) as pool:
+        pending = {pool.submit(fetch_pr_shard, owner, repo, a, b, qualifier) for a, b in shards}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                shard_rows, sub_shards = fut.result()
+                if sub_shards:
+                    pending |= {pool.submit(fetch_pr_shard, owner, repo, a, b, qualifier) for a, b in sub_shards}
+                else:
+                    rows.extend(shard_rows)
+
+    prs = pd.DataFrame(rows)
+    if prs.empty:
+        return prs
+
+    # shard ranges are inclusive on both ends -> dedupe, then restore fetch_all_prs order (newest first)
+    prs = prs[prs["created_at"] >= SINCE_ISO]
+    prs = (prs.drop_duplicates(subset=["pr_number"])
+              .sort_values(["created_at", "pr_number"], ascending=False)
+              .reset_index(drop=True))
+    log(f"[{owner}/{repo}] sharded PRs: {len(prs)}")
+    return prs
 
-            if len(runs) < 100:
-                break
-            page += 1
-            time.sleep(0.2)
+# =============================
+# Workflow runs in windows (fixes 2 months issue)
+# =============================
+def run_row(owner: str, repo: str, run: dict) -> dict:
+    prs = run.get("pull_requests", []) or []
+    pr_numbers = [p.get("number") for p in prs if p.get("number")]
+
+    return {
+        "owner": owner,
+        "repo": repo,
+        "repo_full": f"{owner}/{repo}",
+        "run_id": run.get("id"),
+        "workflow_name": run.get("name"),
+        "event": run.get("event"),
+        "status": run.get("status"),
+        "conclusion": run.get("conclusion"),
+        "created_at": run.get("created_at"),
+        "run_started_at": run.get("run_started_at"),
+        "updated_at": run.get("updated_at"),
+        "head_sha": run.get("head_sha"),
+        "pr_numbers": pr_numbers,
+    }
 
-        window_start = window_end
-        time.sleep(0.2)
+def fetch_runs_page(owner: str, repo: str, created_param: str, page: int, pinned: bool = False) -> dict:
+    url = f"{REST_URL}/repos/{owner}/{repo}/actions/runs"
+    params = {"per_page": RUNS_PER_PAGE, "page": page, "created": created_param}
 
-    return pd.DataFrame(rows)
+    with host_slot(url):
+        r = SCHEDULER.get(url, headers=HEADERS, params=params, timeout=30, cache_pin=pinned)
+    r.raise_for_status()
+    return loads(r.content)
+
+def created_range(window_start: datetime, window_end: datetime) -> str:
+    # created= ranges are inclusive on both ends; stop one second short of the next window
+    return f"{iso_z(window_start)}..{iso_z(window_end - timedelta(seconds=1))}"
+
+def density_profile_path(owner: str, repo: str) -> Path:
+    return DATA_RAW / f"run_density__{safe_slug(owner, repo)}.json"
+
+def load_density_profile(owner: str, repo: str) -> dict:
+    path = density_profile_path(owner, repo)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def save_density_profile(owner: str, repo: str, created_ats, start: datetime, end: datetime):
+    """Record runs per UTC day (from the runs' created_at) for every day fully inside [start, end)."""
+    profile = load_density_profile(owner, repo)
+    day = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+    if day < start:
+        day += timedelta(days=1)
+    counts = {}
+    for created in created_ats:
+        if created:
+            counts[created[:10]] = counts.get(created[:10], 0) + 1
+    while day + timedelta(days=1) <= end:
+        key = day.date().isoformat()
+        profile[key] = counts.get(key, 0)
+        day += timedelta(days=1)
+    density_profile_path(owner, repo).write_text(json.dumps(profile, sort_keys=True), encoding="utf-8")
+
+def plan_run_windows(start: datetime, end: datetime, density: dict, chunk_days: int = CHUNK_DAYS):
+    """
+    Split [start, end) into windows. Anchored RUN_PLAN_BLOCK_DAYS blocks are cut into
+    chunk_days pieces where the density profile has no data, and into greedy runs of
+    whole days holding up to RUN_WINDOW_TARGET runs where it does.
+    """
+    block = timedelta(days=RUN_PLAN_BLOCK_DAYS)
+    block_start = RUN_PLAN_ANCHOR + ((start - RUN_PLAN_ANCHOR) // block) * block
+    windows = []
+
+    while block_start < end:
+        block_end = block_start + block
+        lo, hi = max(block_start, start), min(block_end, end)
+
+        days = []
+        day = block_start
+        while day < block_end:
+            days.append(day)
+            day += timedelta(days=1)
+        known = [d.date().isoformat() in density for d in days if lo <= d and d + timedelta(days=1) <= hi]
+
+        if not known or not all(known):
+            cut = block_start
+            while cut < block_end:
+                nxt = min(cut + timedelta(days=chunk_days), block_end)
+                if nxt > lo and cut < hi:
+                    windows.append((max(cut, lo), min(nxt, hi)))
+                cut = nxt
+        else:
+            w_start, w_count = lo, 0
+            for d in days:
+                if d + timedelta(days=1) <= lo or d >= hi:
+                    continue
+                n = density.get(d.date().isoformat(), 0)
+                if w_count and w_count + n > RUN_WINDOW_TARGET:
+                    windows.append((w_start, d))
+                    w_start, w_count = d, 0
+                w_count += n
+            windows.append((w_start, hi))
+
+        block_start = block_end
+
+    return windows
+
+def fetch_workflow_runs_by_windows(owner: str, repo: str, chunk_days: int = 14,
+                                   since: datetime = None, until: datetime = None, on_page=None) -> pd.DataFrame:
+    """
+    Page 1 of every planned window is fetched first. A window whose total_count is
+    over RUN_LISTING_CAP is bisected and its halves re-planned; otherwise total_count
+    gives the remaining page numbers. All pages of all windows go through a
+    RUN_PAGE_WORKERS pool, and rows are assembled in (window start, page) order.
+    on_page(df) gets each page's rows in that order, as soon as no pending page
+    can sort before it.
+    """
+    now = datetime.now(timezone.utc)
+    end = until or now
+    start = since or (now - timedelta(days=DAYS_BACK))
+    pin_before = now - timedelta(days=RUN_WINDOW_PIN_DAYS)
+
+    windows = plan_run_windows(start, end, load_density_profile(owner, repo), chunk_days)
+    log(f"[{owner}/{repo}] workflows: {len(windows)} planned windows")
+
+    # only full backfills land pages; incremental deltas and samples (since=...) are small
+    stream = LANDING.stream(owner, repo, "workflow_runs") if since is None and until is None else None
+    landed = {}
+    if stream and stream.start():
+        for rec in stream.pages():
+            landed[(rec["meta"]["created"], rec["meta"]["page"])] = rec
+        log(f"[{owner}/{repo}] resuming workflows from landing zone ({len(landed)} pages landed)")
+
+    pages = {}  # (window start, page) -> ColumnChunk of the page's runs
+    runs = ColumnBuffer(RUN_FIELDS)
+    constants = {"owner": owner, "repo": repo, "repo_full": f"{owner}/{repo}"}
+    n_requests = 0
+    with ThreadPoolExecutor(max_workers=RUN_PAGE_WORKERS) as pool:
+        def submit(w, page):
+            created_param = created_range(*w)
+            rec = landed.get((created_param, page))
+            if rec is not None:
+                fut = Future()
+                fut.set_result({"total_count": rec["meta"]["total_count"], "workflow_runs": rec["items"], "landed": True})
+                return fut
+            return pool.submit(fetch_runs_page, owner, repo, created_param, page, w[1] < pin_before)
+
+        pending = {submit(w, 1): (w, 1) for w in windows}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                w, page = pending.pop(fut)
+                data = fut.result()
+                total = data.get("total_count") or 0
+                split = page == 1 and total > RUN_LISTING_CAP and w[1] - w[0] > RUN_WINDOW_MIN
+                if not data.get("landed"):
+                    n_requests += 1
+                    if stream:
+                        created_param = created_range(*w)
+                        stream.append(
+                            {"created": created_param, "page": page, "total_count": total, "split": split},
+                            [] if split else data.get("workflow_runs", []) or [],
+                            checkpoint={"window": created_param, "page": page},
+                        )
+
+                if split:
+                    mid = w[0] + ((w[1] - w[0]) / 2 // RUN_WINDOW_MIN) * RUN_WINDOW_MIN
+                    if mid <= w[0]:
+                        mid = (w[0] + (w[1] - w[0]) / 2).replace(microsecond=0)
+                    log(f"[{owner}/{repo}] workflows window {created_range(*w)}: {total} runs "
+                        f"(> {RUN_LISTING_CAP}). splitting.")
+                    for half in ((w[0], mid), (mid, w[1])):
+                        pending[submit(half, 1)] = (half, 1)
+                    continue
+
+                pages[(w[0], page)] = ColumnChunk(data.get("workflow_runs", []) or [], RUN_FIELDS)
+                if page == 1:
+                    n_pages = -(-min(total, RUN_LISTING_CAP) // RUNS_PER_PAGE)
+                    log(f"[{owner}/{repo}] workflows window: {created_range(*w)} ({total} runs, {n_pages} pages)")
+                    for p in range(2, n_pages + 1):
+                        pending[submit(w, p)] = (w, p)
+
+            if on_page is not None:
+                # later pages and split halves never sort before the pending page they come from
+                floor = min(((w[0], p) for w, p in pending.values()), default=None)
+                for key in sorted(k for k in pages if floor is None or k < floor):
+                    chunk = pages.pop(key)
+                    runs.extend(chunk)
+                    if chunk.n:
+                        page_runs = ColumnBuffer(RUN_FIELDS)
+                        page_runs.extend(chunk)
+                        on_page(page_runs.to_frame(constants, RUN_COLUMNS))
+
+    if stream:
+        stream.finish()
+
+    for key in sorted(pages):
+        runs.extend(pages.pop(key))
+    log(f"[{owner}/{repo}] workflows: {runs.n} runs in {n_requests} requests")
+    save_density_profile(owner, repo, runs.column("created_at"), start, end)
+
+    return runs.to_frame(constants, RUN_COLUMNS)
 
 # =============================
 # Releases (CD proxy)
 # =============================
-def fetch_releases(owner: str, repo: str, max_pages: int = 20) -> pd.DataFrame:
+def release_row(owner: str, repo: str, rel: dict) -> dict:
+    return {
+        "owner": owner,
+        "repo": repo,
+        "repo_full": f"{owner}/{repo}",
+        "release_id": rel.get("id"),
+        "tag_name": rel.get("tag_name"),
+        "name": rel.get("name"),
+        "draft": rel.get("draft"),
+        "prerelease": rel.get("prerelease"),
+        "created_at": rel.get("created_at"),
+        "published_at": rel.get("published_at"),
+    }
+
+def fetch_releases(owner: str, repo: str, max_pages: int = 20, since_iso: str = None, on_page=None) -> pd.DataFrame:
+    # only full backfills land pages; incremental deltas (since_iso=...) are small
+    stream = LANDING.stream(owner, repo, "releases") if since_iso is None else None
+    since_iso = since_iso or SINCE_ISO
     rows = []
     page = 1
-    while page <= max_pages:
+
+    def take(rels) -> bool:
+        """Map one page of releases; True once releases older than since_iso are reached."""
+        start = len(rows)
+        older = False
+        for rel in rels:
+            published = rel.get("published_at") or rel.get("created_at")
+            if published and published < since_iso:
+                older = True
+                break
+
+            rows.append(release_row(owner, repo, rel))
+        if on_page is not None and len(rows) > start:
+            on_page(pd.DataFrame(rows[start:]))
+        return older
+
+    finished = False
+    ckpt = stream.start() if stream else None
+    if ckpt:
+        for rec in stream.pages():
+            finished = take(rec["items"]) or finished or not rec["items"]
+        page = ckpt.get("page", 0) + 1
+        log(f"[{owner}/{repo}] resuming releases from landing zone at page {page}")
+
+    while not finished and page <= max_pages:
         url = f"{REST_URL}/repos/{owner}/{repo}/releases"
         params = {"per_page": 100, "page": page}
-        r = requests.get(url, headers=HEADERS, params=params, timeout=30)
+        with host_slot(url):
+            r = SCHEDULER.get(url, headers=HEADERS, params=params, timeout=30)
         r.raise_for_status()
         rels = r.json() or []
-        if not rels:
+        if stream:
+            stream.append({"page": page}, rels)
+        if not rels or take(rels):
             break
 
-        for rel in rels:
+        page += 1
+
+    if stream:
+        stream.finish()
+    return pd.DataFrame(rows)
+
+# =============================
+# Rebuild raw tables from the landing zone (--rebuild-from-landing), no API calls
+# =============================
+def rebuild_prs_from_landing(owner: str, repo: str) -> pd.DataFrame:
+    stream = LANDING.stream(owner, repo, "prs")
+    if not stream.pages_path.exists():
+        stream = LANDING.stream(owner, repo, "prs_lean")
+    rows = [pr_row(owner, repo, pr)
+            for rec in stream.pages() for pr in rec["items"] if pr["createdAt"] >= SINCE_ISO]
+    prs = pd.DataFrame(rows)
+    if prs.empty:
+        return prs
+    return prs.drop_duplicates(subset=["pr_number"]).reset_index(drop=True)
+
+def rebuild_runs_from_landing(owner: str, repo: str) -> pd.DataFrame:
+    pages = {}
+    for rec in LANDING.stream(owner, repo, "workflow_runs").pages():
+        if not rec["meta"].get("split"):
+            pages[(rec["meta"]["created"], rec["meta"]["page"])] = ColumnChunk(rec["items"], RUN_FIELDS)
+    runs = ColumnBuffer(RUN_FIELDS)
+    for key in sorted(pages):
+        runs.extend(pages.pop(key))
+    return runs.to_frame({"owner": owner, "repo": repo, "repo_full": f"{owner}/{repo}"}, RUN_COLUMNS)
+
+def rebuild_releases_from_landing(owner: str, repo: str) -> pd.DataFrame:
+    rows = []
+    for rec in LANDING.stream(owner, repo, "releases").pages():
+        for rel in rec["items"]:
             published = rel.get("published_at") or rel.get("created_at")
-            if published and published < SINCE_ISO:
-                return pd.DataFrame(rows)
-
-            rows.append({
-                "owner": owner,
-                "repo": repo,
-                "repo_full": f"{owner}/{repo}",
-                "release_id": rel.get("id"),
-                "tag_name": rel.get("tag_name"),
-                "name": rel.get("name"),
-                "draft": rel.get("draft"),
-                "prerelease": rel.get("prerelease"),
-                "created_at": rel.get("created_at"),
-                "published_at": rel.get("published_at"),
-            })
+            if not published or published >= SINCE_ISO:
+                rows.append(release_row(owner, repo, rel))
+    rels = pd.DataFrame(rows)
+    if rels.empty:
+        return rels
+    return rels.drop_duplicates(subset=["release_id"]).reset_index(drop=True)
+
+# =============================
+# Multi-repo alias batching (--batch-repos)
+# PR and release pages of several repos are packed into one GraphQL document as
+# aliased repository(...) fields, each alias with its own cursor. A stream leaves
+# the batch once it reaches SINCE_ISO; the batch size follows the returned cost.
+# =============================
+BATCH_SOURCES = {
+    "prs": {
+        "connection": ("pullRequests(first: 50, after: $c{i}, "
+                       "orderBy: {{field: CREATED_AT, direction: DESC}}, states: [OPEN, CLOSED, MERGED])"),
+        "nodes": "...PrFields",
+        "fragment": PR_FIELDS_FRAGMENT,
+        "time": lambda node: node["createdAt"],
+        "row": pr_row,
+    },
+    "releases": {
+        "connection": "releases(first: 100, after: $c{i}, orderBy: {{field: CREATED_AT, direction: DESC}})",
+        "nodes": "databaseId tagName name isDraft isPrerelease createdAt publishedAt",
+        "fragment": "",
+        "time": lambda node: node["publishedAt"] or node["createdAt"],
+        # same shape as the REST release, so the row matches fetch_releases
+        "row": lambda owner, repo, node: release_row(owner, repo, {
+            "id": node["databaseId"], "tag_name": node["tagName"], "name": node["name"],
+            "draft": node["isDraft"], "prerelease": node["isPrerelease"],
+            "created_at": node["createdAt"], "published_at": node["publishedAt"],
+        }),
+    },
+}
+
+def build_batch_query(streams: list) -> str:
+    params = ", ".join(f"$o{i}:String!, $n{i}:String!, $c{i}:String" for i in range(len(streams)))
+    fields = []
+    fragments = set()
+    for i, st in enumerate(streams):
+        spec = BATCH_SOURCES[st["source"]]
+        fields.append(
+            f"  a{i}: repository(owner:$o{i}, name:$n{i}) {{\n"
+            f"    {spec['connection'].format(i=i)} {{\n"
+            f"      pageInfo {{ hasNextPage endCursor }}\n"
+            f"      nodes {{ {spec['nodes']} }}\n"
+            f"    }}\n"
+            f"  }}"
+        )
+        fragments.add(spec["fragment"])
+    return (f"query({params}) {{\n  rateLimit {{ cost remaining resetAt }}\n"
+            + "\n".join(fields) + "\n}\n" + "".join(sorted(fragments)))
+
+def fetch_batched(repos: list, sources=("prs", "releases")) -> dict:
+    """Returns {(owner, repo, source): DataFrame} for every repo and source."""
+    streams = [{"owner": o, "repo": r, "source": src, "cursor": None, "rows": []}
+               for o, r in repos for src in sources]
+    active = list(streams)
+    batch_size = ALIAS_BATCH_START
+    n_queries = 0
+
+    while active:
+        batch = active[:batch_size]
+        variables = {}
+        for i, st in enumerate(batch):
+            variables.update({f"o{i}": st["owner"], f"n{i}": st["repo"], f"c{i}": st["cursor"]})
+
+        try:
+            data = graphql_request(build_batch_query(batch), variables)["data"]
+        except (requests.exceptions.HTTPError, RuntimeError) as e:
+            if batch_size == 1:
+                raise
+            batch_size = max(1, batch_size // 2)
+            log(f"[Batch] query for {len(batch)} streams failed ({type(e).__name__}). batch size -> {batch_size}")
+            continue
+        n_queries += 1
+
+        for i, st in enumerate(batch):
+            spec = BATCH_SOURCES[st["source"]]
+            conn = next(iter(data[f"a{i}"].values()))
+            done = not conn["pageInfo"]["hasNextPage"]
+            for node in conn["nodes"] or []:
+                if spec["time"](node) < SINCE_ISO:
+                    done = True
+                    break
+                st["rows"].append(spec["row"](st["owner"], st["repo"], node))
+            st["cursor"] = conn["pageInfo"]["endCursor"]
+            if done:
+                active.remove(st)
+                log(f"[Batch] {st['owner']}/{st['repo']} {st['source']} done: {len(st['rows'])} rows")
+
+        cost = (data.get("rateLimit") or {}).get("cost") or len(batch)
+        per_stream = max(cost / len(batch), 1e-3)
+        batch_size = max(1, min(ALIAS_BATCH_MAX, int(ALIAS_BATCH_COST_TARGET / per_stream)))
+
+    log(f"[Batch] {len(streams)} streams in {n_queries} queries")
+    return {(st["owner"], st["repo"], st["source"]): pd.DataFrame(st["rows"]) for st in streams}
+
+def take_batched(batched: dict, source: str, owner: str, repo: str) -> pd.DataFrame:
+    return batched[(owner, repo, source)]
+
+# =============================
+# Incremental sync (watermarks + upsert)
+# Per-repo, per-source high-water marks live in data/raw/sync_state.json:
+#   prs      -> max updatedAt seen (delta query ordered by UPDATED_AT)
+#   runs     -> max created_at seen (re-scanned from mark - RUN_MUTABLE_TAIL_DAYS)
+#   releases -> max published_at seen
+# Marks are staged while fetching and only persisted once the repo's raw CSVs are written.
+# =============================
+PR_COLUMNS = [
+    "owner", "repo", "repo_full", "pr_number", "pr_node_id", "created_at", "merged_at", "closed_at", "state",
+    "is_draft", "additions", "deletions", "changed_files", "commit_count", "author", "merge_sha",
+    "first_review_at", "review_count",
+]
+RUN_COLUMNS = [
+    "owner", "repo", "repo_full", "run_id", "workflow_name", "event", "status", "conclusion",
+    "created_at", "run_started_at", "updated_at", "head_sha", "pr_numbers",
+]
+RELEASE_COLUMNS = [
+    "owner", "repo", "repo_full", "release_id", "tag_name", "name", "draft", "prerelease",
+    "created_at", "published_at",
+]
+
+_sync_lock = threading.Lock()
+_pending_marks = {}
+
+def load_sync_state() -> dict:
+    if not SYNC_STATE_PATH.exists():
+        return {}
+    return json.loads(SYNC_STATE_PATH.read_text(encoding="utf-8"))
+
+def get_sync_mark(repo_full: str, source: str):
+    with _sync_lock:
+        return load_sync_state().get(repo_full, {}).get(source)
+
+def stage_sync_mark(repo_full: str, source: str, mark: str):
+    with _sync_lock:
+        _pending_marks.setdefault(repo_full, {})[source] = mark
+
+def commit_sync_marks(owner: str, repo: str):
+    repo_full = f"{owner}/{repo}"
+    with _sync_lock:
+        marks = _pending_marks.pop(repo_full, None)
+        if not marks:
+            return
+        state = load_sync_state()
+        state.setdefault(repo_full, {}).update(marks)
+        tmp = SYNC_STATE_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(SYNC_STATE_PATH)
+    log(f"[{repo_full}] sync marks: {marks}")
+
+def read_raw_table(owner: str, repo: str, prefix: str, columns: list):
+    path = DATA_RAW / f"{prefix}__{safe_slug(owner, repo)}.csv"
+    if not path.exists():
+        return None
+    try:
+        df = pd.read_csv(path)
+    except pd.errors.EmptyDataError:
+        return None
+    if not set(columns).issubset(df.columns):
+        return None
+    return df[columns]
+
+def upsert_rows(existing, delta: pd.DataFrame, key: str) -> pd.DataFrame:
+    frames = [df for df in (existing, delta) if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=[key], keep="last")
+
+def fetch_prs_incremental(owner: str, repo: str, full_fetch=None) -> pd.DataFrame:
+    repo_full = f"{owner}/{repo}"
+    mark = get_sync_mark(repo_full, "prs")
+    existing = read_raw_table(owner, repo, "prs", PR_COLUMNS)
+
+    if mark is None or existing is None:
+        log(f"[{repo_full}] no PR watermark yet. full fetch.")
+        started = iso_z(datetime.now(timezone.utc))
+        prs = (full_fetch or fetch_all_prs)(owner, repo)
+        stage_sync_mark(repo_full, "prs", started)
+        return prs
+
+    rows = []
+    cursor = None
+    page = 0
+    new_mark = mark
 
+    while True:
         page += 1
-        time.sleep(0.2)
+        data = graphql_page(owner, repo, PR_UPDATED_QUERY, {"owner": owner, "name": repo, "cursor": cursor})
+        pr_block = data["data"]["repository"]["pullRequests"]
+        nodes = pr_block["nodes"] or []
+
+        reached_mark = False
+        for pr in nodes:
+            if pr["updatedAt"] < mark:
+                reached_mark = True
+                break
+            new_mark = max(new_mark, pr["updatedAt"])
+            if pr["createdAt"] >= SINCE_ISO:
+                rows.append(pr_row(owner, repo, pr))
+
+        if reached_mark or not pr_block["pageInfo"]["hasNextPage"]:
+            break
+        cursor = pr_block["pageInfo"]["endCursor"]
+
+    log(f"[{repo_full}] PRs updated since {mark}: {len(rows)} ({page} pages)")
+    stage_sync_mark(repo_full, "prs", new_mark)
+
+    prs = upsert_rows(existing, pd.DataFrame(rows), "pr_number")
+    prs = prs[prs["created_at"] >= SINCE_ISO]
+    return prs.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+
+def fetch_runs_incremental(owner: str, repo: str, chunk_days: int = CHUNK_DAYS) -> pd.DataFrame:
+    repo_full = f"{owner}/{repo}"
+    mark = get_sync_mark(repo_full, "runs")
+    existing = read_raw_table(owner, repo, "workflow_runs", RUN_COLUMNS)
+
+    if mark is None or existing is None:
+        log(f"[{repo_full}] no runs watermark yet. full fetch.")
+        mark = SINCE_ISO
+        existing = None
+        runs = fetch_workflow_runs_by_windows(owner, repo, chunk_days=chunk_days)
+    else:
+        since = max(to_dt(mark) - timedelta(days=RUN_MUTABLE_TAIL_DAYS), SINCE_DT)
+        log(f"[{repo_full}] runs since {iso_z(since)} (watermark {mark})")
+        runs = fetch_workflow_runs_by_windows(owner, repo, chunk_days=chunk_days, since=since)
+        # runs still queued / in progress before the tail are looked up by id
+        older = existing[to_dt(existing["created_at"]) < since]
+        existing = upsert_rows(existing, refresh_runs(owner, repo, older), "run_id")
+
+    if not runs.empty:
+        mark = max(mark, runs["created_at"].dropna().max())
+    stage_sync_mark(repo_full, "runs", mark)
+
+    runs = upsert_rows(existing, runs, "run_id")
+    if runs.empty:
+        return runs
+    # same exact lower bound as the full fetch (a date would keep up to a day of older runs)
+    runs = runs[runs["created_at"] >= SINCE_ISO]
+    return runs.sort_values(["created_at", "run_id"]).reset_index(drop=True)
+
+def fetch_releases_incremental(owner: str, repo: str) -> pd.DataFrame:
+    repo_full = f"{owner}/{repo}"
+    mark = get_sync_mark(repo_full, "releases")
+    existing = read_raw_table(owner, repo, "releases", RELEASE_COLUMNS)
+
+    if mark is None or existing is None:
+        log(f"[{repo_full}] no releases watermark yet. full fetch.")
+        mark = SINCE_ISO
+        existing = None
+        rels = fetch_releases(owner, repo)
+    else:
+        rels = fetch_releases(owner, repo, since_iso=max(mark, SINCE_ISO))
+        log(f"[{repo_full}] releases published since {mark}: {len(rels)}")
+
+    if not rels.empty:
+        published = rels["published_at"].fillna(rels["created_at"]).dropna()
+        if not published.empty:
+            mark = max(mark, published.max())
+    stage_sync_mark(repo_full, "releases", mark)
+
+    rels = upsert_rows(existing, rels, "release_id")
+    if rels.empty:
+        return rels
+    rels = rels[rels["published_at"].fillna(rels["created_at"]) >= SINCE_ISO]
+    return rels.sort_values(["created_at", "release_id"], ascending=False).reset_index(drop=True)
 
+# =============================
+# Refresh of mutable records (--refresh)
+# Only PRs still OPEN and runs not yet completed in the raw tables are re-read:
+# PRs in batches of REFRESH_PR_BATCH_SIZE per nodes(ids:) call, runs through
+# /actions/runs/{id} on REFRESH_RUN_WORKERS threads. Merged / closed PRs and
+# completed runs are final and never fetched again.
+# =============================
+def refresh_prs(owner: str, repo: str, existing: pd.DataFrame) -> pd.DataFrame:
+    open_prs = existing[(existing["state"] == "OPEN") & existing["pr_node_id"].notna()]
+    ids = open_prs["pr_node_id"].tolist()
+    rows = []
+    for i in range(0, len(ids), REFRESH_PR_BATCH_SIZE):
+        data = graphql_request(PR_REFRESH_QUERY, {"ids": ids[i:i + REFRESH_PR_BATCH_SIZE]})
+        # deleted / inaccessible PRs come back as null and keep their last known row
+        rows.extend(pr_row(owner, repo, pr) for pr in data["data"]["nodes"] if pr)
+    log(f"[{owner}/{repo}] refreshed {len(rows)} of {len(ids)} open PRs")
     return pd.DataFrame(rows)
 
+def fetch_run(owner: str, repo: str, run_id: int):
+    url = f"{REST_URL}/repos/{owner}/{repo}/actions/runs/{run_id}"
+    with host_slot(url):
+        r = SCHEDULER.get(url, headers=HEADERS, timeout=30)
+    if r.status_code == 404:
+        return None  # deleted run: keep its last known row
+    r.raise_for_status()
+    return r.json()
+
+def refresh_runs(owner: str, repo: str, existing: pd.DataFrame) -> pd.DataFrame:
+    run_ids = existing.loc[existing["status"] != "completed", "run_id"].dropna().astype(int).tolist()
+    if not run_ids:
+        return pd.DataFrame()
+    with ThreadPoolExecutor(max_workers=REFRESH_RUN_WORKERS) as pool:
+        runs = list(pool.map(partial(fetch_run, owner, repo), run_ids))
+    rows = [run_row(owner, repo, run) for run in runs if run]
+    log(f"[{owner}/{repo}] refreshed {len(rows)} of {len(run_ids)} unfinished runs")
+    return pd.DataFrame(rows)
+
+def refresh_open_prs(owner: str, repo: str, full_fetch=None) -> pd.DataFrame:
+    existing = read_raw_table(owner, repo, "prs", PR_COLUMNS)
+    if existing is None:
+        log(f"[{owner}/{repo}] no raw PRs to refresh. full fetch.")
+        return (full_fetch or fetch_all_prs)(owner, repo)
+    prs = upsert_rows(existing, refresh_prs(owner, repo, existing), "pr_number")
+    return prs.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+
+def refresh_open_runs(owner: str, repo: str, chunk_days: int = CHUNK_DAYS) -> pd.DataFrame:
+    existing = read_raw_table(owner, repo, "workflow_runs", RUN_COLUMNS)
+    if existing is None:
+        log(f"[{owner}/{repo}] no raw runs to refresh. full fetch.")
+        return fetch_workflow_runs_by_windows(owner, repo, chunk_days=chunk_days)
+    runs = upsert_rows(existing, refresh_runs(owner, repo, existing), "run_id")
+    return runs.sort_values(["created_at", "run_id"]).reset_index(drop=True)
+
+def keep_releases(owner: str, repo: str) -> pd.DataFrame:
+    existing = read_raw_table(owner, repo, "releases", RELEASE_COLUMNS)
+    if existing is None:
+        log(f"[{owner}/{repo}] no raw releases yet. full fetch.")
+        return fetch_releases(owner, repo)
+    return existing
+
+# =============================
+# Job / timing enrichment (--enrich-jobs)
+# Every completed run gets /actions/runs/{id}/jobs?filter=all (all attempts) and
+# /actions/runs/{id}/timing, fanned out on JOB_ENRICH_WORKERS threads through the
+# shared SCHEDULER. Completed runs never change, so each result is appended to
+# data/raw/run_jobs_cache__<repo>.jsonl as soon as it arrives and is never fetched
+# again; an interrupted pass resumes from there. Output: run_jobs__<repo>.csv (one
+# row per job attempt) plus per-run job aggregates joined onto the runs.
+# =============================
+JOB_COLUMNS = [
+    "owner", "repo", "repo_full", "run_id", "run_attempt", "job_id", "job_name", "status", "conclusion",
+    "started_at", "completed_at", "job_duration_s",
+]
+
+def job_cache_path(owner: str, repo: str) -> Path:
+    return DATA_RAW / f"run_jobs_cache__{safe_slug(owner, repo)}.jsonl"
+
+def load_job_cache(owner: str, repo: str) -> dict:
+    path = job_cache_path(owner, repo)
+    cache = {}
+    if not path.exists():
+        return cache
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.endswith("\n"):  # a crash can leave a partial last line
+                entry = json.loads(line)
+                cache[entry["run_id"]] = entry
+    return cache
+
+def fetch_run_jobs(owner: str, repo: str, run_id: int) -> dict:
+    base = f"{REST_URL}/repos/{owner}/{repo}/actions/runs/{run_id}"
+    # deleted after it was listed: cached as a run without jobs, like fetch_run keeps its last row
+    deleted = {"run_id": run_id, "run_duration_ms": None, "jobs": []}
+    jobs = []
+    page = 1
+    while True:
+        with host_slot(base):
+            r = SCHEDULER.get(f"{base}/jobs", headers=HEADERS, timeout=30,
+                              params={"filter": "all", "per_page": 100, "page": page})
+        if r.status_code == 404:
+            return deleted
+        r.raise_for_status()
+        data = loads(r.content)
+        jobs.extend({k: job.get(k) for k in ("id", "run_attempt", "name", "status", "conclusion",
+                                             "started_at", "completed_at")}
+                    for job in data.get("jobs") or [])
+        if page * 100 >= (data.get("total_count") or 0):
+            break
+        page += 1
+
+    with host_slot(base):
+        r = SCHEDULER.get(f"{base}/timing", headers=HEADERS, timeout=30)
+    if r.status_code == 404:
+        return deleted
+    r.raise_for_status()
+    return {"run_id": run_id, "run_duration_ms": loads(r.content).get("run_duration_ms"), "jobs": jobs}
+
+def fetch_jobs_for_runs(owner: str, repo: str, run_ids: list) -> dict:
+    """
+    Cached job entries for run_ids, fetching the missing ones until the core budget
+    runs low. A run whose lookup fails is logged and left out of the cache, so the
+    next run retries it.
+    """
+    cache = load_job_cache(owner, repo)
+    todo = [rid for rid in run_ids if rid not in cache]
+    log(f"[{owner}/{repo}] jobs: {len(run_ids) - len(todo)} runs cached, {len(todo)} to fetch")
+
+    cache_lock = threading.Lock()
+    fetched = 0
+    failed = 0
+    deferred = 0
+    with open(job_cache_path(owner, repo), "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=JOB_ENRICH_WORKERS) as pool:
+        pending = {}  # future -> run id
+        ids = iter(todo)
+        while True:
+            # keep at most 2x workers in flight so a low budget stops the fan-out quickly
+            while len(pending) < 2 * JOB_ENRICH_WORKERS:
+                rid = next(ids, None)
+                if rid is None:
+                    break
+                budget = SCHEDULER.budget("core")
+                if budget["remaining"] is not None and budget["remaining"] < JOB_ENRICH_RESERVE \
+                        and budget["reset_at"] > time.time():
+                    deferred = 1 + sum(1 for _ in ids)
+                    log(f"[{owner}/{repo}] jobs: core budget {budget['remaining']} < {JOB_ENRICH_RESERVE}. "
+                        f"deferring {deferred} runs to the next run.")
+                    break
+                pending[pool.submit(fetch_run_jobs, owner, repo, rid)] = rid
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                rid = pending.pop(fut)
+                try:
+                    entry = fut.result()
+                except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+                    failed += 1
+                    log(f"[{owner}/{repo}] jobs: run {rid} failed ({e!r}). retried next run.")
+                    continue
+                with cache_lock:
+                    out.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                    out.flush()
+                cache[entry["run_id"]] = entry
+                fetched += 1
+                if fetched % 500 == 0:
+                    log(f"[{owner}/{repo}] jobs: {fetched}/{len(todo)} runs fetched")
+
+    log(f"[{owner}/{repo}] jobs: fetched {fetched} runs"
+        + (f", {failed} failed" if failed else "") + (f", {deferred} deferred" if deferred else ""))
+    return {rid: cache[rid] for rid in run_ids if rid in cache}
+
+def enrich_runs_with_jobs(owner: str, repo: str, runs: pd.DataFrame) -> pd.DataFrame:
+    if runs.empty:
+        return runs
+    completed = runs.loc[runs["status"] == "completed", "run_id"].dropna().astype(int).tolist()
+    entries = fetch_jobs_for_runs(owner, repo, completed)
+
+    job_rows = [
+        {
+            "owner": owner, "repo": repo, "repo_full": f"{owner}/{repo}", "run_id": rid,
+            "run_attempt": job["run_attempt"], "job_id": job["id"], "job_name": job["name"],
+            "status": job["status"], "conclusion": job["conclusion"],
+            "started_at": job["started_at"], "completed_at": job["completed_at"],
+        }
+        for rid, entry in entries.items() for job in entry["jobs"]
+    ]
+    jobs = pd.DataFrame(job_rows, columns=JOB_COLUMNS)
+    jobs["job_duration_s"] = (to_dt(jobs["completed_at"]) - to_dt(jobs["started_at"])).dt.total_seconds()
+    jobs_path = DATA_RAW / f"run_jobs__{safe_slug(owner, repo)}.csv"
+    jobs.to_csv(jobs_path, index=False)
+    log(f"[{owner}/{repo}] saved jobs: {jobs_path} ({len(jobs)} job attempts)")
+
+    # per-run aggregates; durations and failures from the latest attempt only
+    latest = jobs[jobs["run_attempt"] == jobs.groupby("run_id")["run_attempt"].transform("max")]
+    per_run = pd.DataFrame({
+        "run_duration_ms": pd.Series({rid: e["run_duration_ms"] for rid, e in entries.items()}, dtype="float64"),
+        "run_attempts": jobs.groupby("run_id")["run_attempt"].max(),
+        "job_count": latest.groupby("run_id").size(),
+        "failed_jobs": latest.groupby("run_id")["conclusion"].apply(lambda c: c.isin(["failure", "timed_out"]).sum()),
+        "jobs_duration_s": latest.groupby("run_id")["job_duration_s"].sum(),
+    })
+    per_run.index.name = "run_id"
+    runs = runs.drop(columns=[c for c in per_run.columns if c in runs.columns])
+    return runs.merge(per_run.reset_index(), on="run_id", how="left")
+
+def fetch_runs_with_jobs(owner: str, repo: str, fetch_runs=None) -> pd.DataFrame:
+    runs = (fetch_runs or fetch_workflow_runs_by_windows)(owner, repo)
+    return enrich_runs_with_jobs(owner, repo, runs)
+
 # =============================
 # Enrich
 # =============================
@@ -300,6 +1563,10 @@ def enrich_runs(runs: pd.DataFrame) -> pd.DataFrame:
     runs["run_started_dt"] = to_dt(runs["run_started_at"])
     runs["updated_dt"] = to_dt(runs["updated_at"])
     runs["ci_duration_min"] = (runs["updated_dt"] - runs["run_started_dt"]).dt.total_seconds() / 60.0
+    if "run_duration_ms" in runs.columns:
+        # --enrich-jobs: the run's own timing, not skewed by re-runs or late updates
+        timed = runs["run_duration_ms"].notna()
+        runs.loc[timed, "ci_duration_min"] = runs.loc[timed, "run_duration_ms"] / 60000.0
 
     runs["is_failure"] = runs["conclusion"].isin(["failure", "cancelled", "timed_out"])
 
@@ -318,17 +1585,9 @@ def enrich_releases(rels: pd.DataFrame) -> pd.DataFrame:
 # =============================
 # Derived tables
 # =============================
-def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
-    prs = prs.copy()
-    runs = runs.copy()
-    rels = rels.copy()
-
-    # Buckets
-    prs["week"] = prs["created_at_dt"].dt.to_period("W").dt.start_time
-    runs["week"] = runs["run_started_dt"].dt.to_period("W").dt.start_time
-
+def merges_weekly_table(prs: pd.DataFrame) -> pd.DataFrame:
     # ✅ Merge frequency per week (you asked for this)
-    merges_weekly = (
+    return (
         prs[prs["is_merged"]].dropna(subset=["merged_at_dt"])
            .assign(week_merged=lambda d: d["merged_at_dt"].dt.to_period("W").dt.start_time)
            .groupby(["repo_full", "week_merged"], as_index=False)
@@ -337,8 +1596,9 @@ def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
            .sort_values("week")
     )
 
+def review_weekly_table(prs: pd.DataFrame) -> pd.DataFrame:
     # Review overhead weekly (includes review_latency + review_duration + review_count)
-    review_weekly = (
+    return (
         prs.dropna(subset=["week"])
            .groupby(["repo_full", "week"], as_index=False)
            .agg(
@@ -353,8 +1613,9 @@ def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
            .sort_values("week")
     )
 
+def ci_weekly_table(runs: pd.DataFrame) -> pd.DataFrame:
     # CI weekly
-    ci_weekly = (
+    return (
         runs.dropna(subset=["week", "ci_duration_min"])
             .groupby(["repo_full", "week"], as_index=False)
             .agg(
@@ -365,14 +1626,17 @@ def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
             .sort_values("week")
     )
 
-    # ✅ TD: CI flakiness = retry rate per SHA + volatility
-    retry = (
+def runs_per_sha(runs: pd.DataFrame) -> pd.DataFrame:
+    return (
         runs.dropna(subset=["week", "head_sha"])
             .groupby(["repo_full", "week", "head_sha"])
             .size()
             .reset_index(name="runs_per_sha")
     )
-    flakiness_weekly = (
+
+def flakiness_weekly_table(retry: pd.DataFrame) -> pd.DataFrame:
+    # ✅ TD: CI flakiness = retry rate per SHA + volatility
+    return (
         retry.groupby(["repo_full", "week"], as_index=False)
              .agg(
                  avg_runs_per_sha=("runs_per_sha", "mean"),
@@ -381,6 +1645,7 @@ def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
              .sort_values("week")
     )
 
+def ci_volatility_table(ci_weekly: pd.DataFrame) -> pd.DataFrame:
     # Failure volatility (std dev on weekly failure rate over rolling window)
     # (simple volatility proxy)
     ci_vol = ci_weekly.copy()
@@ -391,81 +1656,293 @@ def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
               .std()
               .reset_index(level=0, drop=True)
     )
+    return ci_vol
 
+def release_monthly_table(rels: pd.DataFrame) -> pd.DataFrame:
     # ✅ CD proxy: Release Frequency per month (you asked for this)
-    if not rels.empty:
-        rels["month"] = rels["release_time_dt"].dt.to_period("M").dt.start_time
-        release_frequency_monthly = (
-            rels.dropna(subset=["month"])
-                .groupby(["repo_full", "month"], as_index=False)
-                .agg(release_frequency=("release_id", "count"))
-                .sort_values("month")
-        )
-    else:
-        release_frequency_monthly = pd.DataFrame(columns=["repo_full", "month", "release_frequency"])
+    if rels.empty:
+        return pd.DataFrame(columns=["repo_full", "month", "release_frequency"])
+    rels = rels.copy()
+    rels["month"] = rels["release_time_dt"].dt.to_period("M").dt.start_time
+    return (
+        rels.dropna(subset=["month"])
+            .groupby(["repo_full", "month"], as_index=False)
+            .agg(release_frequency=("release_id", "count"))
+            .sort_values("month")
+    )
 
+def cd_weekly_table(runs: pd.DataFrame) -> pd.DataFrame:
     # ✅ CD proxy: Release/Deploy workflow success rate (weekly)
     cd_runs = runs[runs["is_cd_workflow"]].copy()
-    if not cd_runs.empty:
-        cd_weekly = (
-            cd_runs.dropna(subset=["week"])
-                  .groupby(["repo_full", "week"], as_index=False)
-                  .agg(
-                      cd_runs=("run_id", "count"),
-                      cd_failure_rate=("is_failure", "mean"),
-                      cd_success_rate=("is_failure", lambda s: 1.0 - s.mean()),
-                      cd_duration_med_min=("ci_duration_min", "median"),
-                  )
-                  .sort_values("week")
-        )
-    else:
-        cd_weekly = pd.DataFrame(columns=["repo_full","week","cd_runs","cd_failure_rate","cd_success_rate","cd_duration_med_min"])
+    if cd_runs.empty:
+        return pd.DataFrame(columns=["repo_full","week","cd_runs","cd_failure_rate","cd_success_rate","cd_duration_med_min"])
+    return (
+        cd_runs.dropna(subset=["week"])
+              .groupby(["repo_full", "week"], as_index=False)
+              .agg(
+                  cd_runs=("run_id", "count"),
+                  cd_failure_rate=("is_failure", "mean"),
+                  cd_success_rate=("is_failure", lambda s: 1.0 - s.mean()),
+                  cd_duration_med_min=("ci_duration_min", "median"),
+              )
+              .sort_values("week")
+    )
 
+def ttr_monthly_table(prs: pd.DataFrame, rels: pd.DataFrame) -> pd.DataFrame:
     # ✅ CD proxy: Time-to-Release (merge -> next release)
-    if not rels.empty:
-        rel_times = (rels[["repo_full", "release_time_dt"]]
-                     .dropna()
-                     .sort_values("release_time_dt"))
-
-        ttr_rows = []
-        for repo_full, pr_sub in prs[prs["is_merged"]].dropna(subset=["merged_at_dt"]).groupby("repo_full"):
-            rel_sub = rel_times[rel_times["repo_full"] == repo_full]
-            if rel_sub.empty:
-                continue
-            rel_list = rel_sub["release_time_dt"].tolist()
-
-            for t in pr_sub["merged_at_dt"].tolist():
-                # find first release >= merge time
-                idx = next((i for i, rt in enumerate(rel_list) if rt >= t), None)
-                if idx is not None:
-                    ttr_days = (rel_list[idx] - t).total_seconds() / 86400.0
-                    ttr_rows.append({"repo_full": repo_full, "merged_at_dt": t, "time_to_release_days": ttr_days})
-
-        ttr = pd.DataFrame(ttr_rows)
-        if not ttr.empty:
-            ttr["month"] = ttr["merged_at_dt"].dt.to_period("M").dt.start_time
-            time_to_release_monthly = (
-                ttr.groupby(["repo_full","month"], as_index=False)
-                   .agg(time_to_release_med_days=("time_to_release_days","median"),
-                        n=("time_to_release_days","count"))
-                   .sort_values("month")
-            )
-        else:
-            time_to_release_monthly = pd.DataFrame(columns=["repo_full","month","time_to_release_med_days","n"])
-    else:
-        time_to_release_monthly = pd.DataFrame(columns=["repo_full","month","time_to_release_med_days","n"])
+    empty = pd.DataFrame(columns=["repo_full","month","time_to_release_med_days","n"])
+    if rels.empty:
+        return empty
+    rel_times = (rels[["repo_full", "release_time_dt"]]
+                 .dropna()
+                 .sort_values("release_time_dt"))
+
+    ttr_rows = []
+    for repo_full, pr_sub in prs[prs["is_merged"]].dropna(subset=["merged_at_dt"]).groupby("repo_full"):
+        rel_sub = rel_times[rel_times["repo_full"] == repo_full]
+        if rel_sub.empty:
+            continue
+        rel_list = rel_sub["release_time_dt"].tolist()
+
+        for t in pr_sub["merged_at_dt"].tolist():
+            # find first release >= merge time
+            idx = next((i for i, rt in enumerate(rel_list) if rt >= t), None)
+            if idx is not None:
+                ttr_days = (rel_list[idx] - t).total_seconds() / 86400.0
+                ttr_rows.append({"repo_full": repo_full, "merged_at_dt": t, "time_to_release_days": ttr_days})
+
+    ttr = pd.DataFrame(ttr_rows)
+    if ttr.empty:
+        return empty
+    ttr["month"] = ttr["merged_at_dt"].dt.to_period("M").dt.start_time
+    return (
+        ttr.groupby(["repo_full","month"], as_index=False)
+           .agg(time_to_release_med_days=("time_to_release_days","median"),
+                n=("time_to_release_days","count"))
+           .sort_values("month")
+    )
 
+def derive_tables(prs: pd.DataFrame, runs: pd.DataFrame, rels: pd.DataFrame):
+    prs = prs.copy()
+    runs = runs.copy()
+
+    # Buckets
+    prs["week"] = prs["created_at_dt"].dt.to_period("W").dt.start_time
+    runs["week"] = runs["run_started_dt"].dt.to_period("W").dt.start_time
+
+    ci_weekly = ci_weekly_table(runs)
     return (
-        review_weekly,
+        review_weekly_table(prs),
         ci_weekly,
-        ci_vol,
-        flakiness_weekly,
-        merges_weekly,
-        release_frequency_monthly,
-        cd_weekly,
-        time_to_release_monthly
+        ci_volatility_table(ci_weekly),
+        flakiness_weekly_table(runs_per_sha(runs)),
+        merges_weekly_table(prs),
+        release_monthly_table(rels),
+        cd_weekly_table(runs),
+        ttr_monthly_table(prs, rels),
     )
 
+# =============================
+# Online aggregation (--online-tables)
+# One aggregator per derived table, fed enriched row batches while repos are
+# collected. Each repo's final PR / run / release frames are fed once (in
+# chunks under --pipeline), so state is just totals per (repo, week) (per
+# (repo, month) for the monthly tables): a row count and the sums a rate needs.
+# Raw values are kept only for the columns a table takes a median or quantile
+# of, and time-to-release keeps merge and release times to pair them up.
+# emit() turns that state into the same columns and row order as the
+# matching *_table() helper, so the CSVs equal a batch derive_tables over
+# everything fed so far, at any point of a run.
+# =============================
+class BucketStats:
+    """(repo_full, bucket) -> row count "n", plus per column a sum, raw values or per-value counts."""
+
+    def __init__(self, sums=(), values=(), tallies=()):
+        self.sums = list(sums)
+        # medians / quantiles cannot be merged from totals: these keep every row's value
+        self.values = list(values)
+        self.tallies = list(tallies)
+        self.buckets = {}
+
+    def add(self, df: pd.DataFrame, buckets: pd.Series):
+        df = df.assign(_bucket=buckets).dropna(subset=["_bucket"])
+        for (repo_full, bucket), rows in df.groupby(["repo_full", "_bucket"], sort=False):
+            stats = self.buckets.get((repo_full, bucket))
+            if stats is None:
+                stats = self.buckets[(repo_full, bucket)] = {
+                    "n": 0,
+                    **{col: 0 for col in self.sums},
+                    **{col: [] for col in self.values},
+                    **{col: Counter() for col in self.tallies},
+                }
+            stats["n"] += len(rows)
+            for col in self.sums:
+                stats[col] += int(rows[col].sum())
+            for col in self.values:
+                stats[col].extend(rows[col].tolist())
+            for col in self.tallies:
+                stats[col].update(rows[col].tolist())
+
+    def rows(self):
+        # the order groupby(["repo_full", bucket]) gives the batch helpers
+        return sorted(self.buckets.items())
+
+def median(values: list) -> float:
+    return pd.Series(values, dtype=float).median()
+
+def created_week(prs: pd.DataFrame) -> pd.Series:
+    return prs["created_at_dt"].dt.to_period("W").dt.start_time
+
+def merged_week(prs: pd.DataFrame) -> pd.Series:
+    return prs["merged_at_dt"].dt.to_period("W").dt.start_time.where(prs["is_merged"])
+
+def merged_month(prs: pd.DataFrame) -> pd.Series:
+    return prs["merged_at_dt"].dt.to_period("M").dt.start_time.where(prs["is_merged"])
+
+def run_week(runs: pd.DataFrame) -> pd.Series:
+    return runs["run_started_dt"].dt.to_period("W").dt.start_time
+
+def release_month(rels: pd.DataFrame) -> pd.Series:
+    return rels["release_time_dt"].dt.to_period("M").dt.start_time
+
+class TableAggregator:
+    table = None
+    # output columns: repo_full, the bucket, then what row() returns per bucket
+    columns = []
+    # source -> (bucket of each row (NaT = not counted), BucketStats arguments)
+    feeds = {}
+
+    def __init__(self):
+        self.state = {source: BucketStats(**stats) for source, (_, stats) in self.feeds.items()}
+
+    def update(self, source: str, df: pd.DataFrame):
+        if source not in self.feeds or df is None or df.empty:
+            return
+        bucket_of, _ = self.feeds[source]
+        self.state[source].add(df, bucket_of(df))
+
+    def row(self, stats: dict) -> tuple:
+        raise NotImplementedError
+
+    def emit(self) -> pd.DataFrame:
+        (source,) = self.feeds
+        data = [(repo_full, bucket, *self.row(stats)) for (repo_full, bucket), stats in self.state[source].rows()]
+        return pd.DataFrame(data, columns=self.columns).sort_values(self.columns[1])
+
+class ReviewOverheadAggregator(TableAggregator):
+    table = "review_overhead_weekly"
+    medians = ["pr_cycle_hours", "review_latency_hours", "review_duration_hours", "review_count", "pr_churn"]
+    columns = ["repo_full", "week", "pr_cycle_med_h", "review_latency_med_h", "review_duration_med_h",
+               "review_count_med", "pr_churn_med", "merged_prs", "prs_total"]
+    feeds = {"prs": (created_week, {"sums": ["is_merged"], "values": medians})}
+
+    def row(self, stats):
+        return (*(median(stats[col]) for col in self.medians), stats["is_merged"], stats["n"])
+
+class MergeFrequencyAggregator(TableAggregator):
+    table = "merge_frequency_weekly"
+    columns = ["repo_full", "week", "merge_frequency"]
+    feeds = {"prs": (merged_week, {})}
+
+    def row(self, stats):
+        return (stats["n"],)
+
+class CiWeeklyAggregator(TableAggregator):
+    table = "ci_weekly"
+    columns = ["repo_full", "week", "ci_duration_med_min", "ci_failure_rate", "ci_runs"]
+    feeds = {"runs": (lambda runs: run_week(runs).where(runs["ci_duration_min"].notna()),
+                      {"sums": ["is_failure"], "values": ["ci_duration_min"]})}
+
+    def row(self, stats):
+        return median(stats["ci_duration_min"]), stats["is_failure"] / stats["n"], stats["n"]
+
+class CiVolatilityAggregator(CiWeeklyAggregator):
+    table = "ci_failure_volatility_weekly"
+
+    def emit(self):
+        return ci_volatility_table(super().emit())
+
+class CiFlakinessAggregator(TableAggregator):
+    table = "ci_flakiness_weekly"
+    columns = ["repo_full", "week", "avg_runs_per_sha", "p95_runs_per_sha"]
+    feeds = {"runs": (lambda runs: run_week(runs).where(runs["head_sha"].notna()), {"tallies": ["head_sha"]})}
+
+    def row(self, stats):
+        per_sha = pd.Series(list(stats["head_sha"].values()))
+        return per_sha.mean(), per_sha.quantile(0.95)
+
+class CdWeeklyAggregator(TableAggregator):
+    table = "cd_workflow_weekly"
+    columns = ["repo_full", "week", "cd_runs", "cd_failure_rate", "cd_success_rate", "cd_duration_med_min"]
+    feeds = {"runs": (lambda runs: run_week(runs).where(runs["is_cd_workflow"]),
+                      {"sums": ["is_failure"], "values": ["ci_duration_min"]})}
+
+    def row(self, stats):
+        failure_rate = stats["is_failure"] / stats["n"]
+        return stats["n"], failure_rate, 1.0 - failure_rate, median(stats["ci_duration_min"])
+
+class ReleaseFrequencyAggregator(TableAggregator):
+    table = "release_frequency_monthly"
+    columns = ["repo_full", "month", "release_frequency"]
+    feeds = {"releases": (release_month, {})}
+
+    def row(self, stats):
+        return (stats["n"],)
+
+class TimeToReleaseAggregator(TableAggregator):
+    table = "time_to_release_monthly"
+    # every merge is paired with the next release of its repo, so both keep their times
+    feeds = {
+        "prs": (merged_month, {"values": ["merged_at_dt"]}),
+        "releases": (release_month, {"values": ["release_time_dt"]}),
+    }
+
+    def times(self, source: str, col: str) -> pd.DataFrame:
+        data = [(repo_full, t) for (repo_full, _), stats in self.state[source].rows() for t in stats[col]]
+        df = pd.DataFrame(data, columns=["repo_full", col])
+        df[col] = pd.to_datetime(df[col], utc=True)
+        return df
+
+    def emit(self):
+        return ttr_monthly_table(self.times("prs", "merged_at_dt").assign(is_merged=True),
+                                 self.times("releases", "release_time_dt"))
+
+ONLINE_AGGREGATORS = {
+    agg.table: agg for agg in (
+        ReviewOverheadAggregator, CiWeeklyAggregator, CiVolatilityAggregator, CiFlakinessAggregator,
+        MergeFrequencyAggregator, ReleaseFrequencyAggregator, CdWeeklyAggregator, TimeToReleaseAggregator,
+    )
+}
+
+class OnlineTables:
+    """The aggregators of the requested tables (default: all), safe to feed from several threads."""
+
+    def __init__(self, tables=None):
+        self.aggregators = {table: ONLINE_AGGREGATORS[table]() for table in tables or DERIVED_TABLES}
+        self._lock = threading.Lock()
+
+    def update(self, source: str, df: pd.DataFrame):
+        with self._lock:
+            for agg in self.aggregators.values():
+                agg.update(source, df)
+
+    def emit(self) -> dict:
+        with self._lock:
+            return {table: agg.emit() for table, agg in self.aggregators.items()}
+
+    def write(self, out_dir: Path):
+        # atomic per table, so a reader never sees a half-written CSV mid-run; the lock
+        # spans write and replace so two writers (--async) never share a .tmp file
+        with self._lock:
+            for table, agg in self.aggregators.items():
+                path = out_dir / f"{table}.csv"
+                tmp = path.with_suffix(".tmp")
+                agg.emit().to_csv(tmp, index=False)
+                tmp.replace(path)
+
+# Set by main() for --online-tables
+ONLINE_TABLES = None
+
 # =============================
 # SonarQube snapshots (optional)
 # =============================
@@ -517,7 +1994,8 @@ def sonar_api_get(path: str, params: dict):
     if not SONAR_HOST_URL or not SONAR_TOKEN:
         raise RuntimeError("SONAR_HOST_URL and SONAR_TOKEN must be set for sonar snapshots.")
     url = f"{SONAR_HOST_URL.rstrip('/')}/{path.lstrip('/')}"
-    r = requests.get(url, params=params, auth=(SONAR_TOKEN, ""), timeout=60)
+    with host_slot(url):
+        r = TRANSPORT.request("GET", url, params=params, auth=(SONAR_TOKEN, ""), timeout=60)
     r.raise_for_status()
     return r.json()
 
@@ -578,59 +2056,45 @@ def run_sonar_snapshots_for_repo(owner, repo):
 # =============================
 # MAIN
 # =============================
-def main():
-    log("=== collect_all_metrics.py START ===")
-    log(f"Project root: {PROJECT_ROOT}")
-    log(f"Data raw: {DATA_RAW}")
-    log(f"Data derived: {DATA_DERIVED}")
-    log(f"Collect since: {SINCE_ISO} (DAYS_BACK={DAYS_BACK})")
-    log(f"Repos: {REPOS}")
+def save_repo_outputs(owner, repo, prs, runs, rels):
+    repo_full = f"{owner}/{repo}"
+    slug = safe_slug(owner, repo)
 
-    all_prs = []
-    all_runs = []
-    all_rels = []
-    all_sonar = []
-
-    for owner, repo in REPOS:
-        repo_full = f"{owner}/{repo}"
-        slug = safe_slug(owner, repo)
-
-        log(f"\n=== Processing {repo_full} ===")
-
-        prs = fetch_all_prs(owner, repo)
-        runs = fetch_workflow_runs_by_windows(owner, repo, chunk_days=CHUNK_DAYS)
-        rels = fetch_releases(owner, repo)
-
-        log(f"[{repo_full}] raw PRs: {len(prs)} | raw runs: {len(runs)} | raw releases: {len(rels)}")
-
-        if not prs.empty:
-            prs = enrich_prs(prs)
-        if not runs.empty:
-            runs = enrich_runs(runs)
-        if not rels.empty:
-            rels = enrich_releases(rels)
-
-        # Save raw per repo
-        prs_path = DATA_RAW / f"prs__{slug}.csv"
-        runs_path = DATA_RAW / f"workflow_runs__{slug}.csv"
-        rels_path = DATA_RAW / f"releases__{slug}.csv"
-        prs.to_csv(prs_path, index=False)
-        runs.to_csv(runs_path, index=False)
-        rels.to_csv(rels_path, index=False)
-        log(f"Saved raw:\n - {prs_path}\n - {runs_path}\n - {rels_path}")
-
-        all_prs.append(prs)
-        all_runs.append(runs)
-        all_rels.append(rels)
-
-        # Sonar optional
-        sonar_df = run_sonar_snapshots_for_repo(owner, repo)
-        if not sonar_df.empty:
-            sonar_path = DATA_RAW / f"sonar_snapshots__{slug}.csv"
-            sonar_df.to_csv(sonar_path, index=False)
-            log(f"[Sonar] Saved: {sonar_path}")
-            all_sonar.append(sonar_df)
+    log(f"[{repo_full}] raw PRs: {len(prs)} | raw runs: {len(runs)} | raw releases: {len(rels)}")
 
+    if not prs.empty:
+        prs = enrich_prs(prs)
+    if not runs.empty:
+        runs = enrich_runs(runs)
+    if not rels.empty:
+        rels = enrich_releases(rels)
+
+    # Save raw per repo
+    prs_path = DATA_RAW / f"prs__{slug}.csv"
+    runs_path = DATA_RAW / f"workflow_runs__{slug}.csv"
+    rels_path = DATA_RAW / f"releases__{slug}.csv"
+    prs.to_csv(prs_path, index=False)
+    runs.to_csv(runs_path, index=False)
+    rels.to_csv(rels_path, index=False)
+    log(f"Saved raw:\n - {prs_path}\n - {runs_path}\n - {rels_path}")
+
+    if ONLINE_TABLES is not None:
+        ONLINE_TABLES.update("prs", prs)
+        ONLINE_TABLES.update("runs", runs)
+        ONLINE_TABLES.update("releases", rels)
+        ONLINE_TABLES.write(DATA_DERIVED)
+        log(f"[{repo_full}] online derived tables refreshed in {DATA_DERIVED}")
+
+    return prs, runs, rels
+
+def save_repo_sonar(owner, repo, sonar_df):
+    if sonar_df.empty:
+        return
+    sonar_path = DATA_RAW / f"sonar_snapshots__{safe_slug(owner, repo)}.csv"
+    sonar_df.to_csv(sonar_path, index=False)
+    log(f"[Sonar] Saved: {sonar_path}")
+
+def save_combined_outputs(all_prs, all_runs, all_rels, all_sonar, tables=None):
     # Combine raw
     prs_all = pd.concat(all_prs, ignore_index=True) if all_prs else pd.DataFrame()
     runs_all = pd.concat(all_runs, ignore_index=True) if all_runs else pd.DataFrame()
@@ -642,7 +2106,21 @@ def main():
     log("\nSaved combined raw:\n - prs.csv\n - workflow_runs.csv\n - releases.csv")
 
     # Derived
-    if not prs_all.empty and not runs_all.empty:
+    if ONLINE_TABLES is not None:
+        # already up to date: every repo was fed to the aggregators as it was written
+        ONLINE_TABLES.write(DATA_DERIVED)
+        log(f"\nSaved online derived tables {list(ONLINE_TABLES.aggregators)} to: {DATA_DERIVED}")
+    elif tables is not None:
+        # targeted run (--metrics): sources no requested table reads may be empty
+        if prs_all.empty:
+            prs_all = enrich_prs(pd.DataFrame(columns=PR_COLUMNS))
+        if runs_all.empty:
+            runs_all = enrich_runs(pd.DataFrame(columns=RUN_COLUMNS))
+        derived = dict(zip(DERIVED_TABLES, derive_tables(prs_all, runs_all, rels_all)))
+        for table in tables:
+            derived[table].to_csv(DATA_DERIVED / f"{table}.csv", index=False)
+        log(f"\nSaved derived tables {tables} to: {DATA_DERIVED}")
+    elif not prs_all.empty and not runs_all.empty:
         (review_weekly, ci_weekly, ci_vol, flakiness_weekly,
          merges_weekly, release_freq_monthly, cd_weekly, ttr_monthly) = derive_tables(prs_all, runs_all, rels_all)
 
@@ -665,6 +2143,831 @@ def main():
         sonar_all.to_csv(DATA_RAW / "sonar_snapshots.csv", index=False)
         log(f"[Sonar] Saved combined: {DATA_RAW / 'sonar_snapshots.csv'}")
 
+def collect_sequential(fetchers):
+    fetch_prs, fetch_runs, fetch_rels = fetchers
+
+    all_prs = []
+    all_runs = []
+    all_rels = []
+    all_sonar = []
+
+    for owner, repo in REPOS:
+        log(f"\n=== Processing {owner}/{repo} ===")
+
+        prs = fetch_prs(owner, repo)
+        runs = fetch_runs(owner, repo)
+        rels = fetch_rels(owner, repo)
+
+        prs, runs, rels = save_repo_outputs(owner, repo, prs, runs, rels)
+        commit_sync_marks(owner, repo)
+        all_prs.append(prs)
+        all_runs.append(runs)
+        all_rels.append(rels)
+
+        # Sonar optional
+        sonar_df = run_sonar_snapshots_for_repo(owner, repo)
+        save_repo_sonar(owner, repo, sonar_df)
+        if not sonar_df.empty:
+            all_sonar.append(sonar_df)
+
+    return all_prs, all_runs, all_rels, all_sonar
+
+# =============================
+# Async collection: every repo and every source in flight at once.
+# The blocking fetchers run in worker threads; host_slot() caps the
+# number of concurrent requests per API host, and a per-repo semaphore
+# caps how many sources of the same repo are fetched at the same time.
+# =============================
+async def collect_repo_async(owner, repo, repo_slots: asyncio.Semaphore, fetchers):
+    fetch_prs, fetch_runs, fetch_rels = fetchers
+
+    async def run(fn, *args, **kwargs):
+        async with repo_slots:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    log(f"\n=== Processing {owner}/{repo} (async) ===")
+    prs, runs, rels = await asyncio.gather(
+        run(fetch_prs, owner, repo),
+        run(fetch_runs, owner, repo),
+        run(fetch_rels, owner, repo),
+    )
+    prs, runs, rels = await asyncio.to_thread(save_repo_outputs, owner, repo, prs, runs, rels)
+    commit_sync_marks(owner, repo)
+
+    sonar_df = await asyncio.to_thread(run_sonar_snapshots_for_repo, owner, repo)
+    save_repo_sonar(owner, repo, sonar_df)
+    return prs, runs, rels, sonar_df
+
+async def collect_async(fetchers):
+    loop = asyncio.get_running_loop()
+    # enough threads for every (repo, source) pair; host_slot() does the real limiting
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max(4, len(REPOS) * 4)))
+
+    # gather() keeps REPOS order, so combined CSVs match the sequential run
+    results = await asyncio.gather(*[
+        collect_repo_async(owner, repo, asyncio.Semaphore(REPO_CONCURRENCY), fetchers)
+        for owner, repo in REPOS
+    ])
+
+    all_prs = [r[0] for r in results]
+    all_runs = [r[1] for r in results]
+    all_rels = [r[2] for r in results]
+    all_sonar = [r[3] for r in results if not r[3].empty]
+    return all_prs, all_runs, all_rels, all_sonar
+
+# =============================
+# Staged pipeline (--pipeline)
+# Fetch workers run every (repo, source) fetcher and cut its rows into
+# PIPELINE_CHUNK_ROWS chunks: fetchers taking on_page= hand over each page as
+# it arrives, so a source's first chunks are enriched while its later pages
+# are still downloading; the others are cut once they return. Enrich workers
+# run enrich_* on chunks as they arrive; one writer streams the chunks of each raw CSV to disk in order and,
+# once all three sources of a repo are on disk, commits its sync marks. The
+# queues are bounded, so a slow writer holds back enrichment, which holds back
+# fetching, instead of buffering everything in memory. Sonar snapshots run as
+# one more fetch task per repo. Results are returned in REPOS order, like
+# collect_sequential.
+# =============================
+PIPELINE_SOURCES = {
+    "prs": ("prs", enrich_prs),
+    "runs": ("workflow_runs", enrich_runs),
+    "releases": ("releases", enrich_releases),
+}
+
+class PipelineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = {"fetch": 0.0, "enrich": 0.0, "write": 0.0}
+        self.errors = []
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.busy[stage] += seconds
+
+class PipelineChunks:
+    """Cuts one task's rows into PIPELINE_CHUNK_ROWS chunks for enrich_q; the last chunk is flagged."""
+
+    def __init__(self, task, enrich_q: queue.Queue):
+        self.task = task
+        self.enrich_q = enrich_q
+        self.frames = []  # rows not cut into a chunk yet
+        self.n_rows = 0
+        self.sent = 0
+        self.blocked_s = 0.0
+
+    def add(self, df: pd.DataFrame):
+        if df is None or df.empty:
+            return
+        self.frames.append(df)
+        self.n_rows += len(df)
+        while self.n_rows >= PIPELINE_CHUNK_ROWS:
+            rows = pd.concat(self.frames, ignore_index=True) if len(self.frames) > 1 else self.frames[0]
+            self._put(rows.iloc[:PIPELINE_CHUNK_ROWS], last=False)
+            rest = rows.iloc[PIPELINE_CHUNK_ROWS:]
+            self.frames = [rest] if len(rest) else []
+            self.n_rows = len(rest)
+
+    def finish(self, df: pd.DataFrame):
+        """Queue what is left as the last chunk; df (the fetcher's result) when no rows came at all,
+        an empty frame when the rows ended on a chunk boundary."""
+        if self.frames:
+            self._put(pd.concat(self.frames, ignore_index=True) if len(self.frames) > 1 else self.frames[0], last=True)
+        else:
+            self._put(df if self.sent == 0 else df.iloc[:0], last=True)
+
+    def _put(self, chunk: pd.DataFrame, last: bool):
+        t0 = time.perf_counter()
+        self.enrich_q.put((self.task, self.sent, last, chunk))
+        self.blocked_s += time.perf_counter() - t0
+        self.sent += 1
+
+def pipeline_fetch(task, fetch, enrich_q: queue.Queue, stats: PipelineStats):
+    owner, repo, source = task
+    chunks = PipelineChunks(task, enrich_q)
+    t0 = time.perf_counter()
+    if "on_page" in inspect.signature(fetch).parameters:
+        df = fetch(owner, repo, on_page=chunks.add)
+    else:
+        df = fetch(owner, repo)
+        if source != "sonar":
+            chunks.add(df)
+    # time spent waiting on a full enrich_q is back-pressure, not fetching
+    stats.add("fetch", time.perf_counter() - t0 - chunks.blocked_s)
+    chunks.finish(df)
+
+def pipeline_enrich(enrich_q: queue.Queue, write_q: queue.Queue, stats: PipelineStats):
+    while True:
+        item = enrich_q.get()
+        if item is None:
+            return
+        task, i, last, df = item
+        source = task[2]
+        t0 = time.perf_counter()
+        try:
+            if source != "sonar" and not df.empty:
+                df = PIPELINE_SOURCES[source][1](df)
+        except Exception as e:
+            # keep draining, so fetchers blocked on a full queue can finish
+            stats.errors.append(e)
+            continue
+        stats.add("enrich", time.perf_counter() - t0)
+        write_q.put((task, i, last, df))
+
+def pipeline_write(write_q: queue.Queue, results: dict, stats: PipelineStats):
+    pending = {}  # task -> {chunk index: frame} not yet written
+    written = {}  # task -> chunks written so far
+    n_chunks = {}  # task -> chunk count, once its last chunk came in
+    frames = {}   # task -> written chunks, for the combined outputs
+    while True:
+        item = write_q.get()
+        if item is None:
+            return
+        try:
+            pipeline_write_chunk(item, pending, written, n_chunks, frames, results, stats)
+        except Exception as e:
+            stats.errors.append(e)
+
+def pipeline_write_chunk(item, pending: dict, written: dict, n_chunks: dict, frames: dict, results: dict,
+                         stats: PipelineStats):
+    """Write the chunks of one raw CSV in order; record the frame once the last chunk is on disk."""
+    task, i, last, df = item
+    owner, repo, source = task
+    pending.setdefault(task, {})[i] = df
+    if last:
+        n_chunks[task] = i + 1
+    t0 = time.perf_counter()
+    # enrich workers may finish chunks out of order: write them in order
+    while written.get(task, 0) in pending[task]:
+        idx = written.get(task, 0)
+        chunk = pending[task].pop(idx)
+        written[task] = idx + 1
+        if idx > 0 and chunk.empty:
+            continue  # end-of-rows marker
+        frames.setdefault(task, []).append(chunk)
+        if source == "sonar":
+            save_repo_sonar(owner, repo, chunk)
+        else:
+            path = DATA_RAW / f"{PIPELINE_SOURCES[source][0]}__{safe_slug(owner, repo)}.csv"
+            chunk.to_csv(path, index=False, mode="w" if idx == 0 else "a", header=idx == 0)
+            if ONLINE_TABLES is not None:
+                ONLINE_TABLES.update(source, chunk)
+    stats.add("write", time.perf_counter() - t0)
+    if written.get(task) != n_chunks.get(task):
+        return
+
+    del n_chunks[task]
+    parts = frames.pop(task)
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    results.setdefault((owner, repo), {})[source] = df
+    if len(results[(owner, repo)]) == len(PIPELINE_SOURCES) + 1:
+        r = results[(owner, repo)]
+        log(f"[{owner}/{repo}] raw PRs: {len(r['prs'])} | raw runs: {len(r['runs'])} "
+            f"| raw releases: {len(r['releases'])} (written)")
+        commit_sync_marks(owner, repo)
+        if ONLINE_TABLES is not None:
+            ONLINE_TABLES.write(DATA_DERIVED)
+
+def collect_pipeline(fetchers):
+    fetch_by_source = dict(zip(PIPELINE_SOURCES, fetchers))
+    fetch_by_source["sonar"] = run_sonar_snapshots_for_repo
+    enrich_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    write_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stats = PipelineStats()
+    results = {}
+
+    t_start = time.perf_counter()
+    enrichers = [threading.Thread(target=pipeline_enrich, args=(enrich_q, write_q, stats), daemon=True)
+                 for _ in range(max(1, PIPELINE_ENRICH_WORKERS))]
+    writer = threading.Thread(target=pipeline_write, args=(write_q, results, stats), daemon=True)
+    for t in enrichers + [writer]:
+        t.start()
+
+    tasks = [(owner, repo, source) for owner, repo in REPOS for source in fetch_by_source]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, PIPELINE_FETCH_WORKERS)) as pool:
+            futures = [pool.submit(pipeline_fetch, task, fetch_by_source[task[2]], enrich_q, stats) for task in tasks]
+            for fut in futures:
+                fut.result()
+    finally:
+        # drain what was fetched before a failure, then stop the stages in order
+        for _ in enrichers:
+            enrich_q.put(None)
+        for t in enrichers:
+            t.join()
+        write_q.put(None)
+        writer.join()
+
+    wall = time.perf_counter() - t_start
+    busy = ", ".join(f"{stage} {secs:.1f}s" for stage, secs in stats.busy.items())
+    log(f"[Pipeline] wall {wall:.1f}s | busy: {busy}")
+
+    if stats.errors:
+        raise stats.errors[0]
+    missing = [f"{o}/{r}" for o, r in REPOS if len(results.get((o, r), {})) <= len(PIPELINE_SOURCES)]
+    if missing:
+        raise RuntimeError(f"Pipeline did not finish writing: {missing}")
+    all_prs = [results[(o, r)]["prs"] for o, r in REPOS]
+    all_runs = [results[(o, r)]["runs"] for o, r in REPOS]
+    all_rels = [results[(o, r)]["releases"] for o, r in REPOS]
+    all_sonar = [results[(o, r)]["sonar"] for o, r in REPOS if not results[(o, r)]["sonar"].empty]
+    return all_prs, all_runs, all_rels, all_sonar
+
+# =============================
+# Sampled preview (--sample)
+# A stratified random sample of whole weeks (Monday..Sunday, as derive_tables buckets
+# them) is fetched: PRs created or merged in the week via search shards, all runs
+# created in the week, and all releases (a handful of pages). derive_tables runs on
+# the sample, weekly tables keep only sampled weeks, and sample_summary.csv gives
+# per-repo means of the weekly metrics with 95% confidence intervals.
+# Everything is written to data/derived/sample/; the regular raw and derived
+# tables are not touched.
+# =============================
+SAMPLE_DIR = DATA_DERIVED / "sample"
+
+# Weekly derived tables and their per-week count columns (a sampled week without rows counts as 0)
+SAMPLE_WEEKLY_TABLES = {
+    "review_overhead_weekly": ["merged_prs", "prs_total"],
+    "ci_weekly": ["ci_runs"],
+    "ci_flakiness_weekly": [],
+    "merge_frequency_weekly": ["merge_frequency"],
+    "cd_workflow_weekly": ["cd_runs"],
+}
+
+# Two-sided 95% Student t quantiles for 1..30 degrees of freedom
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def t_crit_95(df: int) -> float:
+    return _T95[df - 1] if df <= len(_T95) else 1.96
+
+def population_weeks(start: datetime, end: datetime) -> list:
+    """Start of every full Monday..Sunday week inside [start, end)."""
+    week = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+    week += timedelta(days=(7 - week.weekday()) % 7)
+    if week < start:
+        week += timedelta(days=7)
+    weeks = []
+    while week + timedelta(days=7) <= end:
+        weeks.append(week)
+        week += timedelta(days=7)
+    return weeks
+
+def sample_weeks(weeks: list, fraction: float, rng: random.Random) -> list:
+    """Proportional stratified sample: at least one week from every stratum."""
+    sampled = []
+    for i in range(0, len(weeks), SAMPLE_STRATUM_WEEKS):
+        stratum = weeks[i:i + SAMPLE_STRATUM_WEEKS]
+        sampled.extend(rng.sample(stratum, max(1, round(fraction * len(stratum)))))
+    return sorted(sampled)
+
+def fetch_sample(owner: str, repo: str, weeks: list, needs: dict = None):
+    """Sampled weeks of every source; with `needs` (--metrics) only the sources it names."""
+    prs = runs = rels = pd.DataFrame()
+    if needs is None or "prs" in needs:
+        shards = [(w, w + timedelta(days=7) - timedelta(seconds=1)) for w in weeks]
+        prs = pd.concat([
+            fetch_all_prs_sharded(owner, repo, shards=shards, qualifier="created"),
+            fetch_all_prs_sharded(owner, repo, shards=shards, qualifier="merged"),
+        ], ignore_index=True)
+        if not prs.empty:
+            prs = prs.drop_duplicates(subset=["pr_number"]).reset_index(drop=True)
+
+    if needs is None or "runs" in needs:
+        runs = pd.concat([
+            fetch_workflow_runs_by_windows(owner, repo, since=w, until=w + timedelta(days=7)) for w in weeks
+        ], ignore_index=True)
+    if needs is None or "releases" in needs:
+        rels = fetch_releases(owner, repo)
+    return prs, runs, rels
+
+def sample_summary(derived: dict, repos: list, weeks: list, n_population: int) -> pd.DataFrame:
+    week_index = pd.DatetimeIndex([w.replace(tzinfo=None) for w in weeks], name="week")
+    n = len(weeks)
+    fpc = ((n_population - n) / (n_population - 1)) ** 0.5 if n_population > 1 else 0.0
+    rows = []
+    for table, count_cols in SAMPLE_WEEKLY_TABLES.items():
+        df = derived[table]
+        metrics = [c for c in df.columns if c not in ("repo_full", "week")]
+        for repo_full in repos:
+            per_week = df[df["repo_full"] == repo_full].set_index("week")[metrics].reindex(week_index)
+            per_week[count_cols] = per_week[count_cols].fillna(0)
+            for metric in metrics:
+                values = pd.to_numeric(per_week[metric], errors="coerce").dropna()
+                k = len(values)
+                mean = values.mean() if k else None
+                half = t_crit_95(k - 1) * values.std(ddof=1) / k ** 0.5 * fpc if k > 1 else None
+                rows.append({
+                    "table": table, "repo_full": repo_full, "metric": metric,
+                    "sampled_weeks": n, "weeks_with_data": k, "population_weeks": n_population,
+                    "mean": mean,
+                    "ci95_low": mean - half if half is not None else None,
+                    "ci95_high": mean + half if half is not None else None,
+                })
+    return pd.DataFrame(rows)
+
+def collect_sample(fraction: float = SAMPLE_FRACTION, seed: int = None, tables=None, needs: dict = None):
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    end = datetime.now(timezone.utc)
+    weeks = population_weeks(SINCE_DT, end)
+    sampled = sample_weeks(weeks, fraction, random.Random(seed))
+    log(f"[Sample] {len(sampled)} of {len(weeks)} weeks (fraction {fraction}, seed {seed})")
+
+    all_prs, all_runs, all_rels = [], [], []
+    for owner, repo in REPOS:
+        log(f"\n=== Sampling {owner}/{repo} ===")
+        prs, runs, rels = fetch_sample(owner, repo, sampled, needs=needs)
+        log(f"[{owner}/{repo}] sampled PRs: {len(prs)} | runs: {len(runs)} | releases: {len(rels)}")
+        all_prs.append(enrich_prs(prs if not prs.empty else pd.DataFrame(columns=PR_COLUMNS)))
+        all_runs.append(enrich_runs(runs if not runs.empty else pd.DataFrame(columns=RUN_COLUMNS)))
+        if not rels.empty:
+            all_rels.append(enrich_releases(rels))
+
+    prs_all = pd.concat(all_prs, ignore_index=True)
+    runs_all = pd.concat(all_runs, ignore_index=True)
+    rels_all = pd.concat(all_rels, ignore_index=True) if all_rels else pd.DataFrame()
+    derived = dict(zip(DERIVED_TABLES, derive_tables(prs_all, runs_all, rels_all)))
+
+    # weekly tables: only sampled weeks are complete
+    week_starts = {w.replace(tzinfo=None) for w in sampled}
+    for table in SAMPLE_WEEKLY_TABLES:
+        df = derived[table]
+        derived[table] = df[df["week"].isin(week_starts)] if not df.empty else df
+
+    SAMPLE_DIR.mkdir(parents=True, exist_ok=True)
+    for table in tables or DERIVED_TABLES:
+        derived[table].to_csv(SAMPLE_DIR / f"{table}.csv", index=False)
+    prs_all.to_csv(SAMPLE_DIR / "prs.csv", index=False)
+    runs_all.to_csv(SAMPLE_DIR / "workflow_runs.csv", index=False)
+    pd.DataFrame({"week": [iso_z(w) for w in sampled]}).to_csv(SAMPLE_DIR / "sample_weeks.csv", index=False)
+
+    summary = sample_summary(derived, [f"{o}/{r}" for o, r in REPOS], sampled, len(weeks))
+    summary.to_csv(SAMPLE_DIR / "sample_summary.csv", index=False)
+    log(f"\n[Sample] saved sampled tables and sample_summary.csv to: {SAMPLE_DIR}")
+
+# =============================
+# Count fast path (--counts)
+# Volume-only tables come from issueCount instead of downloading the records:
+#   merge_frequency_weekly  <- is:pr is:merged merged:<week>   (created since SINCE_ISO,
+#   prs_opened_weekly       <- is:pr created:<week>             like the full PR fetch)
+#   release_frequency_monthly <- releases are not searchable, so a lean aliased
+#                                release listing (fetch_batched) is counted per month
+# Weeks are UTC Monday..Sunday buckets, as in derive_tables; the first and last
+# bucket are clipped to [SINCE_DT, now). Written to data/derived/counts/.
+# =============================
+COUNTS_DIR = DATA_DERIVED / "counts"
+
+COUNT_TABLES = {
+    "merge_frequency_weekly": ("merge_frequency", "is:pr is:merged merged:{range} created:>={since}"),
+    "prs_opened_weekly": ("prs_opened", "is:pr created:{range}"),
+    "release_frequency_monthly": ("release_frequency", None),
+}
+
+def count_buckets(start: datetime, end: datetime) -> list:
+    """(week_start, range_start, range_end) for every week overlapping [start, end)."""
+    week = datetime(start.year, start.month, start.day, tzinfo=timezone.utc) - timedelta(days=start.weekday())
+    buckets = []
+    while week < end:
+        buckets.append((week, max(week, start), min(week + timedelta(days=7), end)))
+        week += timedelta(days=7)
+    return buckets
+
+def build_count_query(n: int) -> str:
+    params = ", ".join(f"$q{i}:String!" for i in range(n))
+    fields = "\n".join(f"  c{i}: search(type: ISSUE, query: $q{i}, first: 0) {{ issueCount }}" for i in range(n))
+    return f"query({params}) {{\n  rateLimit {{ cost remaining resetAt }}\n{fields}\n}}\n"
+
+def fetch_counts(queries: list) -> list:
+    """issueCount of every search query, COUNT_BATCH_SIZE aliases per document."""
+    batches = [queries[i:i + COUNT_BATCH_SIZE] for i in range(0, len(queries), COUNT_BATCH_SIZE)]
+
+    def run(batch):
+        data = graphql_request(build_count_query(len(batch)), {f"q{i}": q for i, q in enumerate(batch)})["data"]
+        return [data[f"c{i}"]["issueCount"] for i in range(len(batch))]
+
+    with ThreadPoolExecutor(max_workers=HOST_CONCURRENCY) as pool:
+        counts = [c for part in pool.map(run, batches) for c in part]
+    log(f"[Counts] {len(queries)} buckets in {len(batches)} queries")
+    return counts
+
+def collect_counts(tables=None):
+    tables = tables or list(COUNT_TABLES)
+    end = datetime.now(timezone.utc)
+    buckets = count_buckets(SINCE_DT, end)
+
+    queries, keys = [], []
+    for table in tables:
+        column, template = COUNT_TABLES[table]
+        if template is None:
+            continue
+        for owner, repo in REPOS:
+            for week, lo, hi in buckets:
+                rng = f"{iso_z(lo)}..{iso_z(hi - timedelta(seconds=1))}"
+                queries.append(f"repo:{owner}/{repo} " + template.format(range=rng, since=SINCE_ISO))
+                keys.append((table, f"{owner}/{repo}", week.replace(tzinfo=None)))
+    counts = fetch_counts(queries) if queries else []
+
+    derived = {}
+    for table in tables:
+        column, template = COUNT_TABLES[table]
+        if template is None:
+            batched = fetch_batched(REPOS, sources=("releases",))
+            rels = [enrich_releases(df) for df in batched.values() if not df.empty]
+            rels = pd.concat(rels, ignore_index=True) if rels else pd.DataFrame()
+            empty_prs = enrich_prs(pd.DataFrame(columns=PR_COLUMNS))
+            empty_runs = enrich_runs(pd.DataFrame(columns=RUN_COLUMNS))
+            derived[table] = dict(zip(DERIVED_TABLES, derive_tables(empty_prs, empty_runs, rels)))[table]
+            continue
+        rows = [{"repo_full": repo_full, "week": week, column: n}
+                for (t, repo_full, week), n in zip(keys, counts) if t == table and n]
+        # zero weeks are left out, as derive_tables has no rows for them
+        derived[table] = (pd.DataFrame(rows, columns=["repo_full", "week", column])
+                            .sort_values(["week", "repo_full"]).reset_index(drop=True))
+
+    COUNTS_DIR.mkdir(parents=True, exist_ok=True)
+    for table, df in derived.items():
+        df.to_csv(COUNTS_DIR / f"{table}.csv", index=False)
+    log(f"\n[Counts] saved {list(derived)} to: {COUNTS_DIR}")
+    return derived
+
+# =============================
+# Daemon mode (--daemon)
+# Due repos are probed together: one aliased GraphQL document per PROBE_BATCH_SIZE
+# repos (pushedAt, latest PR updatedAt, latest release) plus a per_page=1 runs
+# listing per repo (revalidated through the HTTP cache, so mostly free 304s).
+# Repos whose probe fingerprint changed get an incremental sync; derived tables
+# are rebuilt from the raw CSVs after every cycle that synced something.
+# =============================
+def build_probe_query(n: int) -> str:
+    params = ", ".join(f"$o{i}:String!, $n{i}:String!" for i in range(n))
+    fields = "\n".join(
+        f"  p{i}: repository(owner:$o{i}, name:$n{i}) {{\n"
+        f"    pushedAt\n"
+        f"    pullRequests(first: 1, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{ nodes {{ updatedAt }} }}\n"
+        f"    releases(first: 1, orderBy: {{field: CREATED_AT, direction: DESC}}) {{ nodes {{ createdAt }} }}\n"
+        f"  }}"
+        for i in range(n)
+    )
+    return f"query({params}) {{\n  rateLimit {{ cost remaining resetAt }}\n{fields}\n}}\n"
+
+def probe_latest_run(owner: str, repo: str):
+    url = f"{REST_URL}/repos/{owner}/{repo}/actions/runs"
+    with host_slot(url):
+        r = SCHEDULER.get(url, headers=HEADERS, params={"per_page": 1}, timeout=30)
+    r.raise_for_status()
+    runs = r.json().get("workflow_runs") or []
+    return [runs[0].get("id"), runs[0].get("status"), runs[0].get("updated_at")] if runs else None
+
+def probe_repos(repos: list) -> dict:
+    """{(owner, repo): fingerprint} of cheap activity signals; repos whose probe failed are left out."""
+    fingerprints = {}
+    for i in range(0, len(repos), PROBE_BATCH_SIZE):
+        batch = repos[i:i + PROBE_BATCH_SIZE]
+        variables = {}
+        for j, (owner, repo) in enumerate(batch):
+            variables.update({f"o{j}": owner, f"n{j}": repo})
+        try:
+            data = graphql_request(build_probe_query(len(batch)), variables)["data"]
+        except Exception as e:
+            log(f"[Daemon] probe of {len(batch)} repos failed ({e!r})")
+            continue
+        for j, (owner, repo) in enumerate(batch):
+            node = data[f"p{j}"] or {}
+            prs = (node.get("pullRequests") or {}).get("nodes") or []
+            rels = (node.get("releases") or {}).get("nodes") or []
+            fingerprints[(owner, repo)] = {
+                "pushed_at": node.get("pushedAt"),
+                "pr_updated_at": prs[0]["updatedAt"] if prs else None,
+                "release_created_at": rels[0]["createdAt"] if rels else None,
+            }
+
+    def latest_run(key):
+        try:
+            return probe_latest_run(*key)
+        except Exception as e:
+            log(f"[Daemon] {key[0]}/{key[1]}: run probe failed ({e!r})")
+            return e
+
+    probed = list(fingerprints)
+    with ThreadPoolExecutor(max_workers=HOST_CONCURRENCY) as pool:
+        latest_runs = list(pool.map(latest_run, probed))
+    for key, run in zip(probed, latest_runs):
+        if isinstance(run, Exception):
+            del fingerprints[key]
+        else:
+            fingerprints[key]["latest_run"] = run
+    return fingerprints
+
+def load_daemon_state() -> dict:
+    if not DAEMON_STATE_PATH.exists():
+        return {}
+    return json.loads(DAEMON_STATE_PATH.read_text(encoding="utf-8"))
+
+def save_daemon_state(state: dict):
+    tmp = DAEMON_STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(DAEMON_STATE_PATH)
+
+def next_interval(interval_s: float, changed: bool) -> float:
+    interval_s = interval_s / 2 if changed else interval_s * 1.5
+    return max(DAEMON_MIN_INTERVAL_S, min(DAEMON_MAX_INTERVAL_S, interval_s))
+
+def jittered(seconds: float) -> float:
+    return seconds * random.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER)
+
+def sync_repo(owner: str, repo: str, fetchers):
+    fetch_prs, fetch_runs, fetch_rels = fetchers
+    log(f"\n=== Syncing {owner}/{repo} ===")
+    prs = fetch_prs(owner, repo)
+    runs = fetch_runs(owner, repo)
+    rels = fetch_rels(owner, repo)
+    save_repo_outputs(owner, repo, prs, runs, rels)
+    commit_sync_marks(owner, repo)
+
+def rebuild_combined_outputs(tables=None):
+    """Combined raw + derived tables from the per-repo raw CSVs of every repo in REPOS."""
+    all_prs, all_runs, all_rels = [], [], []
+    for owner, repo in REPOS:
+        prs = read_raw_table(owner, repo, "prs", PR_COLUMNS)
+        runs = read_raw_table(owner, repo, "workflow_runs", RUN_COLUMNS)
+        rels = read_raw_table(owner, repo, "releases", RELEASE_COLUMNS)
+        if prs is not None and not prs.empty:
+            all_prs.append(enrich_prs(prs))
+        if runs is not None and not runs.empty:
+            all_runs.append(enrich_runs(runs))
+        if rels is not None and not rels.empty:
+            all_rels.append(enrich_releases(rels))
+    save_combined_outputs(all_prs, all_runs, all_rels, [], tables=tables)
+
+def run_daemon(fetchers, tables=None, max_cycles: int = None):
+    state = load_daemon_state()
+    cycles = 0
+    while max_cycles is None or cycles < max_cycles:
+        cycles += 1
+        now = time.time()
+        due = [(o, r) for o, r in REPOS if state.get(f"{o}/{r}", {}).get("next_due", 0) <= now]
+
+        if due:
+            fingerprints = probe_repos(due)
+            synced = 0
+            for owner, repo in due:
+                repo_full = f"{owner}/{repo}"
+                entry = state.get(repo_full, {"interval_s": DAEMON_MIN_INTERVAL_S})
+                fingerprint = fingerprints.get((owner, repo))
+                failed = fingerprint is None
+                changed = not failed and entry.get("fingerprint") != fingerprint
+                if changed:
+                    try:
+                        sync_repo(owner, repo, fetchers)
+                        synced += 1
+                    except Exception as e:
+                        log(f"[Daemon] {repo_full}: sync failed ({e!r})")
+                        failed = True
+                if failed:
+                    # keep the old fingerprint so the repo is synced again, just less often
+                    entry["failures"] = entry.get("failures", 0) + 1
+                    entry["interval_s"] = next_interval(entry["interval_s"], changed=False)
+                    log(f"[Daemon] {repo_full}: {entry['failures']} failed cycle(s). "
+                        f"next try in ~{entry['interval_s']:.0f}s")
+                else:
+                    entry.pop("failures", None)
+                    entry["fingerprint"] = fingerprint
+                    entry["interval_s"] = next_interval(entry["interval_s"], changed)
+                entry["next_due"] = time.time() + jittered(entry["interval_s"])
+                state[repo_full] = entry
+                save_daemon_state(state)
+            log(f"[Daemon] cycle {cycles}: probed {len(due)} repos, synced {synced}")
+            if synced:
+                try:
+                    rebuild_combined_outputs(tables)
+                except Exception as e:
+                    log(f"[Daemon] rebuilding combined tables failed ({e!r}). retried after the next sync")
+
+        next_due = min(state.get(f"{o}/{r}", {}).get("next_due", 0) for o, r in REPOS)
+        wait_s = max(0.0, next_due - time.time())
+        if max_cycles is not None and cycles >= max_cycles:
+            break
+        log(f"[Daemon] next probe in {wait_s:.0f}s")
+        time.sleep(wait_s)
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Collect PR, CI, release and Sonar metrics for REPOS.")
+    ap.add_argument("--async", dest="async_mode", action="store_true",
+                    help="fetch all repos and sources concurrently (HOST_CONCURRENCY / REPO_CONCURRENCY)")
+    ap.add_argument("--sharded-prs", action="store_true",
+                    help=f"fetch PRs as parallel created: search shards ({PR_SHARD_DAYS} days, split above {SEARCH_RESULT_CAP})")
+    ap.add_argument("--incremental", action="store_true",
+                    help="only fetch records past the per-repo watermarks and upsert them into data/raw")
+    ap.add_argument("--lean-prs", action="store_true",
+                    help="100 PRs per page with only the first review and review totalCount (cheaper GraphQL cost)")
+    ap.add_argument("--review-details", action="store_true",
+                    help="with --lean-prs: fetch full review sets in a batched second pass into pr_reviews__<repo>.csv")
+    ap.add_argument("--batch-repos", action="store_true",
+                    help="fetch PRs and releases of all repos through aliased multi-repo GraphQL queries")
+    ap.add_argument("--metrics", type=lambda v: [t.strip() for t in v.split(",") if t.strip()],
+                    help="comma-separated derived tables to produce; only the raw fields and sources they read "
+                         f"are fetched (choices: {', '.join(DERIVED_TABLES)})")
+    ap.add_argument("--refresh", action="store_true",
+                    help="only re-read still-open PRs (nodes(ids:)) and unfinished runs (/actions/runs/{id}) from data/raw")
+    ap.add_argument("--enrich-jobs", action="store_true",
+                    help="fetch jobs (all attempts) and timing of every completed run into run_jobs__<repo>.csv; "
+                         "cached per run id, resumable")
+    ap.add_argument("--sample", nargs="?", type=float, const=SAMPLE_FRACTION, default=None, metavar="FRACTION",
+                    help=f"preview from a stratified random sample of weeks (default fraction {SAMPLE_FRACTION}) "
+                         "with confidence intervals, written to data/derived/sample/")
+    ap.add_argument("--sample-seed", type=int, default=None, help="random seed for --sample")
+    ap.add_argument("--daemon", action="store_true",
+                    help="keep running: probe REPOS in batches and incrementally sync only the repos that changed")
+    ap.add_argument("--rebuild-from-landing", action="store_true",
+                    help="rebuild raw and derived tables from data/landing without calling the API")
+    ap.add_argument("--pipeline", action="store_true",
+                    help="overlap fetching, enrichment and CSV writing in threads joined by bounded queues")
+    ap.add_argument("--online-tables", action="store_true",
+                    help="keep the derived tables in incremental aggregators fed as repos are written, "
+                         "and rewrite data/derived after every repo")
+    ap.add_argument("--counts", action="store_true",
+                    help="volume tables only, from aliased search issueCount queries, written to data/derived/counts/ "
+                         f"(with --metrics, a subset of: {', '.join(COUNT_TABLES)})")
+    args = ap.parse_args(argv)
+    if args.counts:
+        if (args.async_mode or args.pipeline or args.online_tables or args.sharded_prs or args.incremental or args.lean_prs or args.review_details
+                or args.batch_repos or args.refresh or args.enrich_jobs or args.sample is not None
+                or args.daemon or args.rebuild_from_landing):
+            ap.error("--counts can only be combined with --metrics")
+        unknown = sorted(set(args.metrics or []) - set(COUNT_TABLES))
+        if unknown:
+            ap.error(f"--counts cannot produce: {', '.join(unknown)}")
+        return args
+    if args.batch_repos and (args.incremental or args.sharded_prs or args.lean_prs or args.review_details):
+        ap.error("--batch-repos cannot be combined with --incremental, --sharded-prs or --lean-prs")
+    unknown = sorted(set(args.metrics or []) - set(DERIVED_TABLES))
+    if unknown:
+        ap.error(f"unknown --metrics tables: {', '.join(unknown)}")
+    if args.metrics and args.review_details:
+        ap.error("--metrics cannot be combined with --review-details")
+    if args.sample is not None and not 0 < args.sample <= 1:
+        ap.error("--sample FRACTION must be in (0, 1]")
+    if args.sample is not None and (args.incremental or args.batch_repos or args.refresh
+                                    or args.rebuild_from_landing or args.daemon):
+        ap.error("--sample cannot be combined with --incremental, --batch-repos, --refresh, "
+                 "--rebuild-from-landing or --daemon")
+    if args.daemon and (args.batch_repos or args.refresh or args.rebuild_from_landing or args.async_mode):
+        ap.error("--daemon cannot be combined with --batch-repos, --refresh, --rebuild-from-landing or --async")
+    if args.pipeline and (args.async_mode or args.daemon or args.sample is not None):
+        ap.error("--pipeline cannot be combined with --async, --daemon or --sample")
+    if args.online_tables and (args.daemon or args.sample is not None):
+        ap.error("--online-tables cannot be combined with --daemon or --sample")
+    if args.refresh and (args.incremental or args.batch_repos or args.rebuild_from_landing):
+        ap.error("--refresh cannot be combined with --incremental, --batch-repos or --rebuild-from-landing")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    require_github_tokens()
+    ensure_data_dirs()
+
+    log("=== collect_all_metrics.py START ===")
+    log(f"Project root: {PROJECT_ROOT}")
+    log(f"Data raw: {DATA_RAW}")
+    log(f"Data derived: {DATA_DERIVED}")
+    log(f"Collect since: {SINCE_ISO} (DAYS_BACK={DAYS_BACK})")
+    log(f"Repos: {REPOS}")
+
+    try:
+        collect(args)
+    finally:
+        # learned page sizes are kept whichever mode ran and however it ended
+        PAGE_SIZES.save()
+
+def collect(args):
+    global PR_PROJECTION, ONLINE_TABLES
+    if args.counts:
+        log(f"Counts mode: {args.metrics or list(COUNT_TABLES)} ({COUNT_BATCH_SIZE} buckets per query)")
+        collect_counts(args.metrics)
+        SCHEDULER.log_budgets()
+        TRANSPORT.log_latency_summary()
+        return
+
+    needs = None
+    if args.metrics:
+        needs = metric_needs(args.metrics)
+        if "prs" in needs:
+            PR_PROJECTION = frozenset(needs["prs"])
+        log(f"Metrics: {args.metrics} -> sources {sorted(needs)}, PR fields {sorted(PR_PROJECTION or [])}")
+
+    if args.sharded_prs:
+        fetch_prs = fetch_all_prs_sharded
+    elif args.lean_prs or args.review_details:
+        fetch_prs = partial(fetch_all_prs, lean=True, review_details=args.review_details)
+    else:
+        fetch_prs = fetch_all_prs
+    if args.rebuild_from_landing:
+        log(f"Rebuild mode: raw tables from {DATA_LANDING}")
+        fetchers = (rebuild_prs_from_landing, rebuild_runs_from_landing, rebuild_releases_from_landing)
+    elif args.refresh:
+        log("Refresh mode: still-open PRs and unfinished runs from data/raw")
+        fetchers = (partial(refresh_open_prs, full_fetch=fetch_prs), refresh_open_runs, keep_releases)
+    elif args.incremental or args.daemon:
+        log(f"Incremental mode: watermarks in {SYNC_STATE_PATH}")
+        fetchers = (partial(fetch_prs_incremental, full_fetch=fetch_prs),
+                    fetch_runs_incremental,
+                    fetch_releases_incremental)
+    elif args.batch_repos:
+        log("Batch mode: PRs and releases for all repos via aliased GraphQL queries")
+        batch_sources = [src for src in BATCH_SOURCES if needs is None or src in needs]
+        batched = fetch_batched(REPOS, sources=batch_sources) if batch_sources else {}
+        fetchers = (partial(take_batched, batched, "prs"),
+                    partial(fetch_workflow_runs_by_windows, chunk_days=CHUNK_DAYS),
+                    partial(take_batched, batched, "releases"))
+    else:
+        fetchers = (fetch_prs,
+                    partial(fetch_workflow_runs_by_windows, chunk_days=CHUNK_DAYS),
+                    fetch_releases)
+
+    if args.enrich_jobs:
+        log(f"Job enrichment: JOB_ENRICH_WORKERS={JOB_ENRICH_WORKERS} JOB_ENRICH_RESERVE={JOB_ENRICH_RESERVE}")
+        fetchers = (fetchers[0], partial(fetch_runs_with_jobs, fetch_runs=fetchers[1]), fetchers[2])
+
+    if needs is not None:
+        fetchers = tuple(
+            fetch if source in needs else partial(skip_source, source)
+            for source, fetch in zip(("prs", "runs", "releases"), fetchers)
+        )
+        if PR_PROJECTION is not None:
+            # never write a partial PR table over the full one
+            fetchers = (partial(merge_projected_prs, fetch=fetchers[0]),) + fetchers[1:]
+
+    if args.sample is not None:
+        collect_sample(args.sample, seed=args.sample_seed, tables=args.metrics, needs=needs)
+        SCHEDULER.log_budgets()
+        TRANSPORT.log_latency_summary()
+        return
+
+    if args.daemon:
+        log(f"Daemon mode: poll intervals {DAEMON_MIN_INTERVAL_S}s..{DAEMON_MAX_INTERVAL_S}s, state in {DAEMON_STATE_PATH}")
+        run_daemon(fetchers, tables=args.metrics)
+        return
+
+    if args.online_tables:
+        ONLINE_TABLES = OnlineTables(args.metrics)
+        log(f"Online tables: {list(ONLINE_TABLES.aggregators)} refreshed in {DATA_DERIVED} after every repo")
+
+    if args.async_mode:
+        log(f"Async mode: HOST_CONCURRENCY={HOST_CONCURRENCY} REPO_CONCURRENCY={REPO_CONCURRENCY}")
+        all_prs, all_runs, all_rels, all_sonar = asyncio.run(collect_async(fetchers))
+    elif args.pipeline:
+        log(f"Pipeline mode: PIPELINE_FETCH_WORKERS={PIPELINE_FETCH_WORKERS} "
+            f"PIPELINE_ENRICH_WORKERS={PIPELINE_ENRICH_WORKERS} queues of {PIPELINE_QUEUE_SIZE}")
+        all_prs, all_runs, all_rels, all_sonar = collect_pipeline(fetchers)
+    else:
+        all_prs, all_runs, all_rels, all_sonar = collect_sequential(fetchers)
+
+    save_combined_outputs(all_prs, all_runs, all_rels, all_sonar, tables=args.metrics)
+    SCHEDULER.log_budgets()
+    TRANSPORT.log_latency_summary()
+    HTTP_CACHE.log_stats()
+
     log("=== collect_all_metrics.py DONE ===")
 
 if __name__ == "__main__":
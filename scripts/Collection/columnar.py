@@ -0,0 +1,84 @@
+"""
+Columnar decoding for large API listings (workflow runs).
+
+Responses are parsed with orjson when it is installed (falls back to the json
+module), and only the projected fields of each item are appended to
+per-column buffers: int64 columns go into array('q'), everything else into
+plain lists. to_frame() hands the columns to pandas in one go, so no per-row
+dict or list of row dicts is ever built.
+"""
+import json
+from array import array
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional: faster parsing only
+    orjson = None
+
+
+def loads(content: bytes):
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def _pr_numbers(item: dict) -> list:
+    return [p.get("number") for p in (item.get("pull_requests") or []) if p.get("number")]
+
+# column -> (item key or extractor, int64 column?); same values as run_row()
+RUN_FIELDS = {
+    "run_id": ("id", True),
+    "workflow_name": ("name", False),
+    "event": ("event", False),
+    "status": ("status", False),
+    "conclusion": ("conclusion", False),
+    "created_at": ("created_at", False),
+    "run_started_at": ("run_started_at", False),
+    "updated_at": ("updated_at", False),
+    "head_sha": ("head_sha", False),
+    "pr_numbers": (_pr_numbers, False),
+}
+
+
+class ColumnChunk:
+    """Projected columns of one page of items."""
+
+    def __init__(self, items: list, fields: dict):
+        self.n = len(items)
+        self.columns = {}
+        for col, (key, is_int) in fields.items():
+            values = [key(it) for it in items] if callable(key) else [it.get(key) for it in items]
+            if is_int and None not in values:
+                values = array("q", values)
+            self.columns[col] = values
+
+
+class ColumnBuffer:
+    """Concatenates ColumnChunks (in the order given) into one DataFrame."""
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+        self.n = 0
+        self._columns = {col: array("q") if is_int else [] for col, (_, is_int) in fields.items()}
+
+    def extend(self, chunk: ColumnChunk):
+        for col, values in chunk.columns.items():
+            buf = self._columns[col]
+            if isinstance(buf, array) and not isinstance(values, array):
+                buf = self._columns[col] = list(buf)  # a null in an int column: keep it as objects
+            buf.extend(values)
+        self.n += chunk.n
+
+    def column(self, col: str):
+        return self._columns[col]
+
+    def to_frame(self, constants: dict = None, columns: list = None) -> pd.DataFrame:
+        """DataFrame with constant columns (e.g. owner / repo) first, in `columns` order when given."""
+        data = {col: [value] * self.n for col, value in (constants or {}).items()}
+        for col, buf in self._columns.items():
+            data[col] = np.frombuffer(buf, dtype=np.int64).copy() if isinstance(buf, array) else buf
+        if self.n == 0:
+            return pd.DataFrame()
+        df = pd.DataFrame(data)
+        return df[columns] if columns else df
@@ -0,0 +1,157 @@
+"""
+Pool of GitHub credentials (personal access tokens or installation tokens).
+
+Each credential gets its own RateLimitScheduler, so its core / graphql / search
+budgets are tracked from its own X-RateLimit-* headers and GraphQL rateLimit
+objects. CredentialPool.request() has the same call shape as
+RateLimitScheduler.request() and, per request,
+- uses the credential a repo is pinned to (e.g. an installation token that
+  only covers one org), otherwise
+- routes to the credential with the most remaining budget on that bucket,
+  skipping credentials that are cooling down after a primary or secondary
+  limit; the limited request is re-sent with the next best credential.
+When every usable credential is blocked, the request waits on the one that
+becomes free first. A pool without tokens can be built (e.g. by tools that only
+import the collector's schemas) but raises on its first request.
+"""
+import time
+import threading
+from urllib.parse import urlsplit
+
+from rate_limit import RateLimitScheduler, _bucket_for, _is_rate_limit, graphql_payload
+
+
+class Credential:
+    def __init__(self, name: str, token: str, scheduler: RateLimitScheduler):
+        self.name = name
+        self.token = token
+        self.scheduler = scheduler
+        self.requests = 0
+
+
+def _repo_of(url: str, kwargs: dict):
+    """owner/repo a request is about: REST /repos/{owner}/{repo}/..., GraphQL owner/name variables or repo: query."""
+    parts = urlsplit(url).path.strip("/").split("/")
+    if len(parts) >= 3 and parts[0] == "repos":
+        return f"{parts[1]}/{parts[2]}"
+    variables = (kwargs.get("json") or {}).get("variables") or {}
+    if variables.get("owner") and variables.get("name"):
+        return f"{variables['owner']}/{variables['name']}"
+    for term in str(variables.get("q", "")).split():
+        if term.startswith("repo:"):
+            return term[len("repo:"):]
+    return None
+
+
+def _rate_limited(bucket: str, r) -> bool:
+    """True for a response the scheduler handed back because of a limit: 429, a limit 403 or GraphQL RATE_LIMITED."""
+    if r.status_code == 429:
+        return True
+    if r.status_code == 403:
+        # a plain 403 (no access to the repo, SSO enforcement) would fail with every token alike
+        return _is_rate_limit(r)
+    if bucket != "graphql" or r.status_code != 200:
+        return False
+    try:
+        errors = graphql_payload(r).get("errors") or []
+    except ValueError:
+        return False
+    return any(e.get("type") == "RATE_LIMITED" for e in errors)
+
+
+class CredentialPool:
+    def __init__(self, tokens: list, send=None, pins: dict = None, log=print, **scheduler_kwargs):
+        self.log = log
+        self.credentials = [
+            Credential(f"cred{i}", token, RateLimitScheduler(
+                send=send, log=lambda msg, name=f"cred{i}": log(f"{msg} ({name})"), **scheduler_kwargs))
+            for i, token in enumerate(tokens)
+        ]
+        # "owner/repo" or "owner" -> credential index
+        self.pins = self._check_pins(pins or {}, len(self.credentials))
+        self._lock = threading.Lock()
+
+    @property
+    def send(self):
+        return self.credentials[0].scheduler.send if self.credentials else None
+
+    @send.setter
+    def send(self, send):
+        for cred in self.credentials:
+            cred.scheduler.send = send
+
+    @staticmethod
+    def _check_pins(pins: dict, n_tokens: int) -> dict:
+        checked = {}
+        for key, idx in pins.items():
+            try:
+                checked[key] = int(idx)
+            except (TypeError, ValueError):
+                raise ValueError(f"Token pin {key}={idx}: the token index must be an integer.") from None
+            # a pool without tokens fails on its first request anyway
+            if n_tokens and not 0 <= checked[key] < n_tokens:
+                raise ValueError(f"Token pin {key}={idx}: only tokens 0..{n_tokens - 1} are configured.")
+        return checked
+
+    def pinned(self, repo_full: str):
+        if not repo_full:
+            return None
+        idx = self.pins.get(repo_full, self.pins.get(repo_full.split("/")[0]))
+        return None if idx is None else self.credentials[idx]
+
+    def _headroom(self, cred: Credential, bucket: str, now: float):
+        b = cred.scheduler.budget(bucket)
+        if b["blocked_until"] > now:
+            # cooling down: least preferred, the one free soonest first
+            return (0, -b["blocked_until"], -cred.requests)
+        if b["remaining"] is None or b["reset_at"] <= now:
+            return (1, float("inf"), -cred.requests)
+        return (1, b["remaining"], -cred.requests)
+
+    def _pick(self, bucket: str, exclude: set) -> Credential:
+        now = time.time()
+        with self._lock:
+            candidates = [c for c in self.credentials if c.name not in exclude] or self.credentials
+            cred = max(candidates, key=lambda c: self._headroom(c, bucket, now))
+            cred.requests += 1
+        return cred
+
+    def request(self, method: str, url: str, **kwargs):
+        if not self.credentials:
+            raise ValueError("CredentialPool needs at least one token.")
+        bucket = _bucket_for(url)
+        pinned = self.pinned(_repo_of(url, kwargs))
+        tried = set()
+
+        while True:
+            cred = pinned or self._pick(bucket, tried)
+            tried.add(cred.name)
+            # the last untried credential waits out its own limits instead of rerouting
+            reroute = pinned is None and len(tried) < len(self.credentials)
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers["Authorization"] = f"Bearer {cred.token}"
+            r = cred.scheduler.request(method, url, headers=headers, reroute_limits=reroute, **kwargs)
+            kwargs["headers"] = headers
+
+            # decided by the response: a 200 is returned even if it just used up the budget
+            if reroute and _rate_limited(bucket, r):
+                self.log(f"[Credentials] {cred.name} limited on {bucket}. rerouting.")
+                continue
+            return r
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def budget(self, bucket: str) -> dict:
+        """Budget of the credential with the most headroom on this bucket."""
+        now = time.time()
+        best = max(self.credentials, key=lambda c: self._headroom(c, bucket, now))
+        return best.scheduler.budget(bucket)
+
+    def log_budgets(self):
+        for cred in self.credentials:
+            budgets = {bucket: cred.scheduler.budget(bucket)["remaining"] for bucket in ("core", "graphql", "search")}
+            self.log(f"[Credentials] {cred.name}: {cred.requests} requests, remaining {budgets}")
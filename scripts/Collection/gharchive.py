@@ -0,0 +1,193 @@
+"""
+Historical backfill from GH Archive (https://www.gharchive.org/) hourly dumps.
+
+Local YYYY-MM-DD-H.json.gz files are parsed in parallel, one worker process per
+file. Events of repos in REPOS are mapped to the raw row schemas of the API
+fetchers:
+    PullRequestEvent        -> prs         (pr_row, latest event per PR wins)
+    PullRequestReviewEvent  -> pr_reviews  (review_row) + first_review_at / review_count
+    ReleaseEvent            -> releases    (release_row; "deleted" drops the release)
+and upserted into the per-repo CSVs in data/raw, after which the combined and
+derived tables are rebuilt. No API calls are made.
+
+GH Archive records the public events timeline, which has no workflow-run
+events: workflow_runs__<repo>.csv is left as it is and still has to come from
+the API collector (or webhook_receiver).
+
+    python gharchive.py ~/gharchive/2025-*.json.gz
+    python gharchive.py ~/gharchive/ --workers 16 --metrics merge_frequency_weekly
+"""
+import os
+import gzip
+import zlib
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import collect_all_metrics as cam
+from columnar import loads
+from webhook_receiver import graphql_shaped_pr
+
+GHARCHIVE_WORKERS = int(os.environ.get("GHARCHIVE_WORKERS", str(os.cpu_count() or 4)))
+
+EVENT_TYPES = {"PullRequestEvent", "PullRequestReviewEvent", "ReleaseEvent"}
+EVENT_MARKERS = [f'"type":"{t}"'.encode() for t in EVENT_TYPES]
+
+# =============================
+# One hourly file (runs in a worker process)
+# =============================
+def review_of(payload: dict) -> dict:
+    """Archive review object in the GraphQL shape review_row() reads."""
+    review = payload["review"]
+    return {
+        "createdAt": review.get("submitted_at"),
+        "state": (review.get("state") or "").upper(),
+        "author": {"login": review["user"]["login"]} if review.get("user") else None,
+    }
+
+def parse_archive_file(path: str, repos: frozenset) -> dict:
+    """Rows per source for the events of `repos` in one file, each tagged with the event time."""
+    out = {"prs": [], "reviews": [], "releases": [], "counts": Counter()}
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                # cheap prefilter before decoding the whole event
+                if not any(marker in line for marker in EVENT_MARKERS):
+                    continue
+                ev = loads(line)
+                etype = ev.get("type")
+                full_name = (ev.get("repo") or {}).get("name", "")
+                if etype not in EVENT_TYPES or full_name not in repos:
+                    continue
+                owner, _, repo = full_name.partition("/")
+                at = ev.get("created_at")
+                payload = ev.get("payload") or {}
+
+                if etype == "PullRequestEvent":
+                    pr = graphql_shaped_pr(payload["pull_request"])
+                    out["prs"].append((at, cam.pr_row(owner, repo, pr)))
+                elif etype == "PullRequestReviewEvent":
+                    rv = cam.review_row(owner, repo, payload["pull_request"]["number"], review_of(payload))
+                    pr = cam.pr_row(owner, repo, graphql_shaped_pr(payload["pull_request"]))
+                    out["reviews"].append((at, rv, pr))
+                else:
+                    deleted = payload.get("action") == "deleted"
+                    out["releases"].append((at, cam.release_row(owner, repo, payload["release"]), deleted))
+                out["counts"][etype] += 1
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            # truncated download: keep the events read so far
+            cam.log(f"[GHArchive] {path}: truncated ({e!r})")
+    return out
+
+# =============================
+# Merge into data/raw
+# =============================
+def latest(pairs: list, key: str) -> pd.DataFrame:
+    """Rows of (event_at, row) pairs, last event per key."""
+    pairs = sorted(pairs, key=lambda p: p[0] or "")
+    return pd.DataFrame([row for _, row in pairs]).drop_duplicates(subset=[key], keep="last")
+
+def review_stats(reviews: pd.DataFrame) -> pd.DataFrame:
+    return (
+        reviews.dropna(subset=["review_created_at"])
+               .groupby("pr_number", as_index=False)
+               .agg(first_review_at=("review_created_at", "min"), review_count=("review_created_at", "count"))
+    )
+
+def merge_repo(owner: str, repo: str, events: dict):
+    slug = cam.safe_slug(owner, repo)
+
+    # reviews first: their PR objects also fill in PRs without a PullRequestEvent
+    reviews_path = cam.DATA_RAW / f"pr_reviews__{slug}.csv"
+    reviews = pd.read_csv(reviews_path) if reviews_path.exists() else pd.DataFrame(columns=cam.REVIEW_COLUMNS)
+    if events["reviews"]:
+        delta = pd.DataFrame([rv for _, rv, _ in events["reviews"]], columns=cam.REVIEW_COLUMNS)
+        reviews = (pd.concat([reviews, delta], ignore_index=True)
+                     .drop_duplicates(subset=["pr_number", "review_created_at", "reviewer"], keep="last"))
+        reviews.to_csv(reviews_path, index=False)
+
+    prs = cam.read_raw_table(owner, repo, "prs", cam.PR_COLUMNS)
+    pr_pairs = events["prs"] + [(at, pr) for at, _, pr in events["reviews"]]
+    if pr_pairs:
+        delta = latest(pr_pairs, "pr_number")[cam.PR_COLUMNS]
+        # a PR only seen through reviews must not overwrite a fuller PullRequestEvent row
+        seen = {pr["pr_number"] for _, pr in events["prs"]}
+        if prs is not None:
+            delta = delta[delta["pr_number"].isin(seen) | ~delta["pr_number"].isin(prs["pr_number"])]
+        prs = cam.upsert_rows(prs, delta, "pr_number")
+    if prs is not None and not prs.empty and not reviews.empty:
+        stats = review_stats(reviews).set_index("pr_number")
+        reviewed = {rv["pr_number"] for _, rv, _ in events["reviews"]}
+        has = prs["pr_number"].isin(stats.index) & prs["pr_number"].isin(reviewed)
+        prs.loc[has, "first_review_at"] = prs.loc[has, "pr_number"].map(stats["first_review_at"])
+        prs.loc[has, "review_count"] = prs.loc[has, "pr_number"].map(stats["review_count"])
+    if prs is None or prs.empty:
+        prs = pd.DataFrame(columns=cam.PR_COLUMNS)
+    prs = prs.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+
+    # not in the archive: kept as collected from the API
+    runs = cam.read_raw_table(owner, repo, "workflow_runs", cam.RUN_COLUMNS)
+    if runs is None or runs.empty:
+        runs = pd.DataFrame(columns=cam.RUN_COLUMNS)
+    runs = runs.sort_values(["created_at", "run_id"]).reset_index(drop=True)
+
+    rels = cam.read_raw_table(owner, repo, "releases", cam.RELEASE_COLUMNS)
+    if events["releases"]:
+        pairs = sorted(events["releases"], key=lambda p: p[0] or "")
+        last = {}
+        for _, row, deleted in pairs:
+            last[row["release_id"]] = (row, deleted)
+        kept = pd.DataFrame([row for row, deleted in last.values() if not deleted], columns=cam.RELEASE_COLUMNS)
+        rels = cam.upsert_rows(rels, kept, "release_id")
+        gone = [rid for rid, (_, deleted) in last.items() if deleted]
+        if gone and not rels.empty:
+            rels = rels[~rels["release_id"].isin(gone)]
+    if rels is None or rels.empty:
+        rels = pd.DataFrame(columns=cam.RELEASE_COLUMNS)
+    rels = rels.sort_values(["created_at", "release_id"], ascending=False).reset_index(drop=True)
+
+    cam.save_repo_outputs(owner, repo, prs, runs, rels)
+
+def ingest(paths: list, workers: int = GHARCHIVE_WORKERS, tables=None):
+    repos = frozenset(f"{owner}/{repo}" for owner, repo in cam.REPOS)
+    events = {r: {"prs": [], "reviews": [], "releases": []} for r in repos}
+    counts = Counter()
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for i, (path, out) in enumerate(zip(paths, pool.map(parse_archive_file, paths, [repos] * len(paths)))):
+            for source in ("prs", "reviews", "releases"):
+                for item in out[source]:
+                    events[item[1]["repo_full"]][source].append(item)
+            counts.update(out["counts"])
+            if (i + 1) % 100 == 0 or i + 1 == len(paths):
+                cam.log(f"[GHArchive] {i + 1}/{len(paths)} files, events so far: {dict(counts)}")
+
+    cam.ensure_data_dirs()
+    for owner, repo in cam.REPOS:
+        merge_repo(owner, repo, events[f"{owner}/{repo}"])
+    cam.rebuild_combined_outputs(tables=tables)
+
+def archive_files(args: list) -> list:
+    paths = []
+    for arg in args:
+        p = Path(arg)
+        paths.extend(sorted(p.glob("*.json.gz")) if p.is_dir() else [p])
+    return [str(p) for p in paths]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Backfill data/raw from local GH Archive hourly .json.gz files.")
+    ap.add_argument("paths", nargs="+", help="archive files or directories of them")
+    ap.add_argument("--workers", type=int, default=GHARCHIVE_WORKERS, help="parallel file parsers (processes)")
+    ap.add_argument("--metrics", type=lambda v: [t.strip() for t in v.split(",") if t.strip()],
+                    help="comma-separated derived tables to write (default: all)")
+    args = ap.parse_args(argv)
+
+    paths = archive_files(args.paths)
+    cam.log(f"[GHArchive] {len(paths)} files, {args.workers} workers, repos: {cam.REPOS}")
+    ingest(paths, workers=args.workers, tables=args.metrics)
+
+if __name__ == "__main__":
+    main()
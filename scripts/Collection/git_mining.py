@@ -0,0 +1,281 @@
+"""
+Churn, merge cadence and release dates from the local clones in data/repos,
+without any GitHub API calls.
+
+Per repo (clone via ensure_repo_cloned, then `git fetch --tags --prune`):
+- the first-parent history of origin/HEAD is walked with
+  `git log --first-parent --numstat`: one row per mainline commit with its
+  additions / deletions against the first parent (for a merge commit that is
+  the whole merged PR), and the PR number parsed from "Merge pull request #N"
+  or squash-merge "... (#N)" subjects,
+- tags (creator date: tagger date for annotated tags, commit date otherwise)
+  stand in for releases.
+
+The walk is incremental: the last processed mainline SHA per repo is kept in
+data/raw/git_state.json and only commits after it are read and upserted into
+git_commits__<repo>.csv. If that SHA is no longer on the mainline (force push)
+the repo is walked again from SINCE_ISO. Repos are walked in parallel, and long
+ranges are split into fixed-size segments that are read by parallel `git log`
+processes.
+
+Derived tables (same columns as the API-based ones where they overlap) go to
+data/derived/git/: merge_frequency_weekly, churn_weekly,
+release_frequency_monthly and time_to_release_monthly.
+
+    python git_mining.py                 # fetch, walk new commits, write tables
+    python git_mining.py --no-fetch      # offline: only what the clones have
+    python git_mining.py --full          # ignore git_state.json and re-walk
+"""
+import os
+import re
+import json
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import collect_all_metrics as cam
+
+GIT_MINING_WORKERS = int(os.environ.get("GIT_MINING_WORKERS", "4"))
+GIT_LOG_WORKERS = int(os.environ.get("GIT_LOG_WORKERS", "4"))
+GIT_LOG_SEGMENT = 2000  # mainline commits per `git log` process
+GIT_FETCH = os.environ.get("GIT_FETCH", "1") == "1"
+
+GIT_STATE_PATH = cam.DATA_RAW / "git_state.json"
+GIT_DERIVED = cam.DATA_DERIVED / "git"
+
+COMMIT_COLUMNS = [
+    "owner", "repo", "repo_full", "sha", "committed_at", "authored_at", "author", "is_merge",
+    "pr_number", "additions", "deletions", "changed_files",
+]
+TAG_COLUMNS = ["owner", "repo", "repo_full", "tag_name", "sha", "created_at", "prerelease"]
+
+MERGE_PR_RE = re.compile(r"^Merge pull request #(\d+)")
+SQUASH_PR_RE = re.compile(r"\(#(\d+)\)\s*$")
+PRERELEASE_RE = re.compile(r"[-.](alpha|beta|rc|pre|dev|snapshot)", re.IGNORECASE)
+
+# record / field separators that cannot occur in a subject line
+LOG_FORMAT = "%x1e%H%x1f%P%x1f%cI%x1f%aI%x1f%an%x1f%s"
+
+_state_lock = threading.Lock()
+
+def utc_z(iso: str) -> str:
+    return datetime.fromisoformat(iso).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def git(repo_path, *args) -> str:
+    return cam.run_cmd(["git", "-c", "core.quotepath=off", *args], cwd=repo_path)
+
+def is_ancestor(repo_path, sha: str, tip: str) -> bool:
+    r = subprocess.run(["git", "merge-base", "--is-ancestor", sha, tip], cwd=repo_path, capture_output=True)
+    return r.returncode == 0
+
+# =============================
+# State (last processed mainline SHA per repo)
+# =============================
+def load_git_state() -> dict:
+    if not GIT_STATE_PATH.exists():
+        return {}
+    return json.loads(GIT_STATE_PATH.read_text(encoding="utf-8"))
+
+def save_git_mark(repo_full: str, head: str):
+    with _state_lock:
+        state = load_git_state()
+        state[repo_full] = {"head": head, "walked_at": cam.iso_z(datetime.now(timezone.utc))}
+        GIT_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = GIT_STATE_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(GIT_STATE_PATH)
+
+# =============================
+# Log walking
+# =============================
+def parse_pr_number(subject: str):
+    m = MERGE_PR_RE.match(subject) or SQUASH_PR_RE.search(subject)
+    return int(m.group(1)) if m else None
+
+def parse_log(owner: str, repo: str, out: str) -> list:
+    """Rows of `git log --numstat --format=LOG_FORMAT` output."""
+    rows = []
+    for record in out.split("\x1e"):
+        if not record.strip():
+            continue
+        header, _, numstat = record.partition("\n")
+        sha, parents, committed, authored, author, subject = header.split("\x1f", 5)
+        adds = dels = files = 0
+        for line in numstat.splitlines():
+            parts = line.split("\t", 2)
+            if len(parts) != 3:
+                continue
+            files += 1
+            # binary files show "-": they count as changed but carry no line churn
+            adds += int(parts[0]) if parts[0].isdigit() else 0
+            dels += int(parts[1]) if parts[1].isdigit() else 0
+        rows.append({
+            "owner": owner,
+            "repo": repo,
+            "repo_full": f"{owner}/{repo}",
+            "sha": sha,
+            "committed_at": utc_z(committed),
+            "authored_at": utc_z(authored),
+            "author": author,
+            "is_merge": len(parents.split()) > 1,
+            "pr_number": parse_pr_number(subject),
+            "additions": adds,
+            "deletions": dels,
+            "changed_files": files,
+        })
+    return rows
+
+def mainline_shas(repo_path, tip: str, last: str = None) -> list:
+    """First-parent SHAs after `last` (or since SINCE_ISO), newest first."""
+    rev = f"{last}..{tip}" if last else tip
+    args = ["rev-list", "--first-parent", rev]
+    if not last:
+        args.insert(2, f"--since={cam.SINCE_ISO}")
+    out = git(repo_path, *args)
+    return out.split() if out else []
+
+def walk_segment(owner: str, repo: str, repo_path, tip: str, n: int) -> list:
+    # --first-parent also diffs merge commits against their first parent
+    out = git(repo_path, "log", "--first-parent", "--numstat", "--no-renames",
+              f"--format={LOG_FORMAT}", "-n", str(n), tip)
+    return parse_log(owner, repo, out)
+
+def walk_mainline(owner: str, repo: str, repo_path, shas: list) -> pd.DataFrame:
+    segments = [shas[i:i + GIT_LOG_SEGMENT] for i in range(0, len(shas), GIT_LOG_SEGMENT)]
+    with ThreadPoolExecutor(max_workers=max(1, min(GIT_LOG_WORKERS, len(segments)))) as pool:
+        parts = list(pool.map(lambda seg: walk_segment(owner, repo, repo_path, seg[0], len(seg)), segments))
+    rows = [row for part in parts for row in part]
+    return pd.DataFrame(rows, columns=COMMIT_COLUMNS)
+
+def read_tags(owner: str, repo: str, repo_path) -> pd.DataFrame:
+    out = git(repo_path, "for-each-ref", "refs/tags",
+              "--format=%(refname:short)%1f%(creatordate:iso-strict)%1f%(*objectname)%1f%(objectname)")
+    rows = []
+    for line in out.splitlines():
+        tag, created, peeled, obj = line.split("\x1f")
+        if not created:
+            continue
+        rows.append({
+            "owner": owner,
+            "repo": repo,
+            "repo_full": f"{owner}/{repo}",
+            "tag_name": tag,
+            "sha": peeled or obj,
+            "created_at": utc_z(created),
+            "prerelease": bool(PRERELEASE_RE.search(tag)),
+        })
+    tags = pd.DataFrame(rows, columns=TAG_COLUMNS)
+    tags = tags[cam.to_dt(tags["created_at"]) >= cam.SINCE_DT]
+    return tags.sort_values(["created_at", "tag_name"], ascending=False).reset_index(drop=True)
+
+def mine_repo(owner: str, repo: str, fetch: bool = GIT_FETCH, full: bool = False):
+    repo_full = f"{owner}/{repo}"
+    repo_path = cam.ensure_repo_cloned(owner, repo)
+    if fetch:
+        git(repo_path, "fetch", "--tags", "--prune", "--force", "origin")
+    tip = git(repo_path, "rev-parse", "refs/remotes/origin/HEAD")
+
+    existing = None if full else cam.read_raw_table(owner, repo, "git_commits", COMMIT_COLUMNS)
+    last = None if existing is None else load_git_state().get(repo_full, {}).get("head")
+    if last and not is_ancestor(repo_path, last, tip):
+        cam.log(f"[Git] {repo_full}: {last[:12]} is no longer on the mainline. walking from {cam.SINCE_ISO}")
+        existing, last = None, None
+
+    shas = mainline_shas(repo_path, tip, last)
+    delta = walk_mainline(owner, repo, repo_path, shas) if shas else pd.DataFrame(columns=COMMIT_COLUMNS)
+    commits = cam.upsert_rows(existing, delta, "sha")
+    if commits.empty:
+        commits = pd.DataFrame(columns=COMMIT_COLUMNS)
+    commits = commits.sort_values(["committed_at", "sha"], ascending=False).reset_index(drop=True)
+    commits["pr_number"] = commits["pr_number"].astype("Int64")
+    tags = read_tags(owner, repo, repo_path)
+
+    slug = cam.safe_slug(owner, repo)
+    commits.to_csv(cam.DATA_RAW / f"git_commits__{slug}.csv", index=False)
+    tags.to_csv(cam.DATA_RAW / f"git_tags__{slug}.csv", index=False)
+    save_git_mark(repo_full, tip)
+    cam.log(f"[Git] {repo_full}: {len(shas)} new mainline commits ({len(commits)} total), {len(tags)} tags")
+    return commits, tags
+
+# =============================
+# Derived tables
+# =============================
+def commits_as_prs(commits: pd.DataFrame) -> pd.DataFrame:
+    """Mainline commits that landed a PR, in the PR_COLUMNS shape derive_tables reads."""
+    merged = commits.dropna(subset=["pr_number"])
+    prs = pd.DataFrame({col: merged[col] if col in merged else None for col in cam.PR_COLUMNS})
+    prs["merged_at"] = merged["committed_at"]
+    prs["closed_at"] = merged["committed_at"]
+    prs["state"] = "MERGED"
+    prs["merge_sha"] = merged["sha"]
+    return prs
+
+def tags_as_releases(tags: pd.DataFrame) -> pd.DataFrame:
+    rels = pd.DataFrame({col: tags[col] if col in tags else None for col in cam.RELEASE_COLUMNS})
+    rels["release_id"] = tags["tag_name"]
+    rels["name"] = tags["tag_name"]
+    rels["draft"] = False
+    rels["published_at"] = tags["created_at"]
+    return rels
+
+def churn_weekly(commits: pd.DataFrame) -> pd.DataFrame:
+    commits = commits.copy()
+    commits["week"] = cam.to_dt(commits["committed_at"]).dt.to_period("W").dt.start_time
+    commits["churn"] = commits["additions"] + commits["deletions"]
+    return (
+        commits.groupby(["repo_full", "week"], as_index=False)
+               .agg(
+                   mainline_commits=("sha", "count"),
+                   pr_merges=("pr_number", "count"),
+                   additions=("additions", "sum"),
+                   deletions=("deletions", "sum"),
+                   churn=("churn", "sum"),
+                   churn_med=("churn", "median"),
+               )
+               .sort_values("week")
+    )
+
+def derive_git_tables(commits: pd.DataFrame, tags: pd.DataFrame) -> dict:
+    prs = cam.enrich_prs(commits_as_prs(commits))
+    runs = cam.enrich_runs(pd.DataFrame(columns=cam.RUN_COLUMNS))
+    rels = cam.enrich_releases(tags_as_releases(tags)) if not tags.empty else pd.DataFrame()
+    derived = dict(zip(cam.DERIVED_TABLES, cam.derive_tables(prs, runs, rels)))
+    return {
+        "merge_frequency_weekly": derived["merge_frequency_weekly"],
+        "churn_weekly": churn_weekly(commits),
+        "release_frequency_monthly": derived["release_frequency_monthly"],
+        "time_to_release_monthly": derived["time_to_release_monthly"],
+    }
+
+def mine_all(repos: list, fetch: bool = GIT_FETCH, full: bool = False, workers: int = GIT_MINING_WORKERS):
+    cam.ensure_data_dirs()
+    GIT_DERIVED.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # map() keeps REPOS order, so combined CSVs are stable across runs
+        results = list(pool.map(lambda r: mine_repo(r[0], r[1], fetch=fetch, full=full), repos))
+
+    commits = pd.concat([c for c, _ in results], ignore_index=True)
+    tags = pd.concat([t for _, t in results], ignore_index=True)
+    commits.to_csv(cam.DATA_RAW / "git_commits.csv", index=False)
+    tags.to_csv(cam.DATA_RAW / "git_tags.csv", index=False)
+
+    for table, df in derive_git_tables(commits, tags).items():
+        df.to_csv(GIT_DERIVED / f"{table}.csv", index=False)
+    cam.log(f"[Git] Saved derived tables to: {GIT_DERIVED}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Mine churn, merge cadence and tag releases from the local clones.")
+    ap.add_argument("--no-fetch", action="store_true", help="do not `git fetch` before walking")
+    ap.add_argument("--full", action="store_true", help=f"ignore {GIT_STATE_PATH.name} and re-walk from SINCE_ISO")
+    ap.add_argument("--workers", type=int, default=GIT_MINING_WORKERS, help="repos walked in parallel")
+    args = ap.parse_args(argv)
+
+    cam.log(f"[Git] repos: {cam.REPOS} (clones in {cam.REPO_CACHE}, since {cam.SINCE_ISO})")
+    mine_all(cam.REPOS, fetch=not args.no_fetch, full=args.full, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
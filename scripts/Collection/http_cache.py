@@ -0,0 +1,198 @@
+"""
+Persistent conditional-request cache for GitHub REST GETs.
+
+Responses are stored (zlib-compressed) in a small SQLite file, keyed by
+method + URL + sorted query params, together with their ETag / Last-Modified
+headers. The next request for the same key is sent with If-None-Match /
+If-Modified-Since; on 304 Not Modified (which GitHub does not charge against
+the rate limit) the cached body is served instead.
+
+Entries requested with cache_pin=True (e.g. workflow-run windows that closed
+long ago) are marked immutable: they are served straight from disk without a
+request. Pins still count toward max_bytes: once the cache grows past it,
+unpinned entries are evicted least-recently-used first and pinned ones only if
+that is not enough. Window boundaries drift between runs, so a pin that has not
+been served for pin_ttl_days is for a window no run asks for any more and is
+dropped on the next eviction pass.
+
+ConditionalCache.request() has the same call shape as requests.request(), so
+it sits between RateLimitScheduler(send=...) and the Transport. Pinned entries
+need no request at all, so ConditionalCache.pinned() is also handed to the
+scheduler as RateLimitScheduler(peek=...): they are answered before a slot is
+booked against the rate limit. With enabled=False it is a pass-through
+(cache_pin is accepted and ignored).
+"""
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_PIN_TTL_DAYS = 14
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (pinned, last_used);
+"""
+
+# Response headers worth keeping with the body (rate-limit headers are live state, not cached)
+_KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+def cache_key(method: str, url: str, params: dict = None) -> str:
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{method.upper()} {url}?{query}".encode("utf-8")).hexdigest()
+
+
+def _cached_response(url: str, headers: dict, body: bytes):
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r.headers = CaseInsensitiveDict(headers)
+    r.headers["X-From-Cache"] = "1"
+    r._content = body
+    r.encoding = "utf-8"
+    return r
+
+
+class ConditionalCache:
+    def __init__(self, send, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True,
+                 pin_ttl_days: float = DEFAULT_PIN_TTL_DAYS, log=print):
+        # send(method, url, **kwargs) -> requests.Response
+        self.send = send
+        self.max_bytes = max_bytes
+        self.pin_ttl_s = pin_ttl_days * 86400
+        self.enabled = enabled
+        self.log = log
+        self._lock = threading.Lock()
+        self.stats = {"pinned_hits": 0, "not_modified": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self.path = Path(path)
+        self._db = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """The SQLite file is created on first use, not when the cache is built."""
+        with self._open_lock:
+            if self._db is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+                self._db.executescript(_SCHEMA)
+        return self._db
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def _row(self, key: str):
+        with self._lock:
+            return self.db.execute(
+                "SELECT etag, last_modified, headers, body, pinned FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _serve_pinned(self, key: str, url: str, row):
+        self._touch(key)
+        self._count("pinned_hits")
+        return _cached_response(url, json.loads(row[2]), zlib.decompress(row[3]))
+
+    def pinned(self, method: str, url: str, params: dict = None, **kwargs):
+        """The pinned response for this request, served without sending it, or None."""
+        if not self.enabled or method.upper() != "GET":
+            return None
+        key = cache_key(method, url, params)
+        row = self._row(key)
+        return self._serve_pinned(key, url, row) if row and row[4] else None
+
+    def request(self, method: str, url: str, cache_pin: bool = False, **kwargs):
+        if not self.enabled or method.upper() != "GET":
+            return self.send(method, url, **kwargs)
+
+        key = cache_key(method, url, kwargs.get("params"))
+        row = self._row(key)
+
+        if row and row[4]:
+            return self._serve_pinned(key, url, row)
+
+        if row:
+            headers = dict(kwargs.pop("headers", None) or {})
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+            kwargs["headers"] = headers
+
+        r = self.send(method, url, **kwargs)
+
+        if r.status_code == 304 and row:
+            self._touch(key, pin=cache_pin)
+            self._count("not_modified")
+            return _cached_response(url, json.loads(row[2]), zlib.decompress(row[3]))
+
+        self._count("misses")
+        if r.status_code == 200 and (cache_pin or r.headers.get("ETag") or r.headers.get("Last-Modified")):
+            self._store(key, url, r, cache_pin)
+        return r
+
+    def _touch(self, key: str, pin: bool = False):
+        with self._lock, self.db:
+            self.db.execute(
+                "UPDATE responses SET last_used = ?, pinned = MAX(pinned, ?) WHERE key = ?",
+                (time.time(), int(pin), key),
+            )
+
+    def _store(self, key: str, url: str, r, pinned: bool):
+        body = zlib.compress(r.content)
+        headers = {h: r.headers[h] for h in _KEEP_HEADERS if h in r.headers}
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, etag, last_modified, headers, body, size, pinned, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, r.headers.get("ETag"), r.headers.get("Last-Modified"),
+                 json.dumps(headers), body, len(body), int(pinned), time.time()),
+            )
+        self._count("stored")
+        self._evict()
+
+    def _evict(self):
+        with self._lock, self.db:
+            evicted = self.db.execute(
+                "DELETE FROM responses WHERE pinned = 1 AND last_used < ?", (time.time() - self.pin_ttl_s,)
+            ).rowcount
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # unpinned entries first; pins only when those are not enough
+                for key, size in self.db.execute(
+                    "SELECT key, size FROM responses ORDER BY pinned, last_used"
+                ).fetchall():
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    evicted += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+        self._count("evicted", evicted)
+
+    def log_stats(self):
+        if self.enabled:
+            self.log(f"[HTTP cache] {self.stats}")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
@@ -0,0 +1,160 @@
+"""
+Shared HTTP transport for the GitHub and Sonar collectors.
+
+One Transport keeps pooled keep-alive connections per host (so thousands of
+pages reuse a handful of TLS connections), negotiates gzip/deflate, applies
+connect / read / total timeouts and records per-request latency per host.
+With http2=True and httpx[http2] installed, requests are multiplexed over
+HTTP/2 instead; without httpx it falls back to pooled HTTP/1.1.
+
+Transport.request() has the same call shape as requests.request(), so it can
+be plugged into RateLimitScheduler(send=...).
+"""
+import os
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Timeout
+
+try:
+    import httpx
+except ImportError:  # optional: only needed for HTTP/2
+    httpx = None
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+TOTAL_TIMEOUT = float(os.environ.get("HTTP_TOTAL_TIMEOUT", "120"))
+DEFAULT_POOL_SIZE = 10
+# Keep this many recent latencies per host for percentiles
+LATENCY_WINDOW = 2000
+
+
+class Transport:
+    def __init__(self, pool_sizes: dict = None, http2: bool = False,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 total_timeout: float = TOTAL_TIMEOUT, log=print):
+        self.pool_sizes = dict(pool_sizes or {})
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.log = log
+
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._mounted = set()
+        self._lock = threading.Lock()
+        self._latency = {}
+
+        self.client = None
+        if http2:
+            if httpx is None:
+                log("[HTTP] http2 requested but httpx is not installed. using pooled HTTP/1.1.")
+            else:
+                self.client = httpx.Client(
+                    http2=True,
+                    headers={"Accept-Encoding": "gzip, deflate"},
+                    limits=httpx.Limits(max_connections=max([DEFAULT_POOL_SIZE, *self.pool_sizes.values()])),
+                )
+
+    def _mount(self, url: str) -> str:
+        parts = urlsplit(url)
+        host = parts.netloc
+        with self._lock:
+            if host not in self._mounted:
+                size = self.pool_sizes.get(host, DEFAULT_POOL_SIZE)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+                self.session.mount(f"{parts.scheme}://{host}", adapter)
+                self._mounted.add(host)
+        return host
+
+    def _timeouts(self, timeout):
+        # a caller-supplied scalar timeout overrides the read timeout, like requests' own
+        read = timeout if isinstance(timeout, (int, float)) else self.read_timeout
+        return self.connect_timeout, read, max(self.total_timeout, read)
+
+    def request(self, method: str, url: str, timeout=None, **kwargs):
+        host = self._mount(url)
+        connect, read, total = self._timeouts(timeout)
+
+        t0 = time.perf_counter()
+        if self.client is not None:
+            r = self._request_http2(method, url, connect, read, total, **kwargs)
+        else:
+            r = self.session.request(method, url, timeout=Timeout(connect=connect, read=read, total=total), **kwargs)
+        self._record(host, time.perf_counter() - t0)
+        return r
+
+    def _request_http2(self, method, url, connect, read, total, params=None, headers=None,
+                       json=None, data=None, auth=None):
+        try:
+            r = self.client.request(
+                method, url, params=params, headers=headers, json=json, content=data, auth=auth,
+                timeout=httpx.Timeout(total, connect=connect, read=read),
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return _Http2Response(r)
+
+    # -----------------------------
+    # Latency reporting
+    # -----------------------------
+    def _record(self, host: str, seconds: float):
+        with self._lock:
+            stats = self._latency.get(host)
+            if stats is None:
+                stats = self._latency[host] = {"n": 0, "total_s": 0.0, "recent": deque(maxlen=LATENCY_WINDOW)}
+            stats["n"] += 1
+            stats["total_s"] += seconds
+            stats["recent"].append(seconds)
+
+    def latency_summary(self) -> dict:
+        out = {}
+        with self._lock:
+            for host, stats in self._latency.items():
+                recent = sorted(stats["recent"])
+                out[host] = {
+                    "requests": stats["n"],
+                    "total_s": round(stats["total_s"], 2),
+                    "mean_ms": round(1000 * stats["total_s"] / stats["n"], 1),
+                    "p50_ms": round(1000 * recent[len(recent) // 2], 1),
+                    "p95_ms": round(1000 * recent[int(0.95 * (len(recent) - 1))], 1),
+                }
+        return out
+
+    def log_latency_summary(self):
+        for host, s in self.latency_summary().items():
+            self.log(f"[HTTP] {host}: {s['requests']} requests, {s['total_s']}s total, "
+                     f"mean {s['mean_ms']}ms, p50 {s['p50_ms']}ms, p95 {s['p95_ms']}ms")
+
+    def close(self):
+        self.session.close()
+        if self.client is not None:
+            self.client.close()
+
+
+class _Http2Response:
+    """Exposes an httpx response through the small part of the requests.Response API the collectors use."""
+
+    def __init__(self, r):
+        self._r = r
+        self.status_code = r.status_code
+        self.headers = r.headers
+        self.content = r.content
+        self.url = str(r.url)
+
+    @property
+    def text(self):
+        return self._r.text
+
+    def json(self):
+        return self._r.json()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
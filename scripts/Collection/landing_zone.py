@@ -0,0 +1,110 @@
+"""
+Landing zone for raw API pages, with resume checkpoints.
+
+Every fetched GraphQL / REST page is appended as one JSON line to
+data/landing/<owner>__<repo>/<source>.jsonl.gz as soon as it arrives, and the
+stream's checkpoint (cursor / window / page) is rewritten next to it:
+
+    data/landing/<owner>__<repo>/<source>.jsonl.gz
+    data/landing/<owner>__<repo>/<source>.checkpoint.json
+
+Each append is its own gzip member, so a crash can at worst leave a truncated
+last member, which pages() skips. A stream whose checkpoint is not marked done
+is resumed by the next run; a finished stream is started fresh. A stream can
+carry a shape (e.g. a fingerprint of the query that produced its pages): an
+unfinished stream landed with another shape is started fresh too, so pages of
+different query variants are never mixed. The landed pages
+are also enough to rebuild the raw tables without refetching.
+"""
+import gzip
+import json
+import zlib
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+
+
+class LandingStream:
+    def __init__(self, root: Path, slug: str, source: str, enabled: bool = True, shape: str = None):
+        self.dir = root / slug
+        self.source = source
+        self.enabled = enabled
+        self.shape = shape
+        self.pages_path = self.dir / f"{source}.jsonl.gz"
+        self.checkpoint_path = self.dir / f"{source}.checkpoint.json"
+        self._lock = threading.Lock()
+
+    def checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return None
+        return json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+
+    def start(self):
+        """Checkpoint of an unfinished stream to resume from, else None (and the stream is reset)."""
+        if not self.enabled:
+            return None
+        ckpt = self.checkpoint()
+        if ckpt and not ckpt.get("done") and self.pages_path.exists() and ckpt.get("shape") == self.shape:
+            self._repair()
+            return ckpt
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.pages_path.unlink(missing_ok=True)
+        self._write_checkpoint({"done": False, "pages": 0, "shape": self.shape})
+        return None
+
+    def pages(self):
+        """Landed page records ({"meta": ..., "items": [...]}) in arrival order."""
+        if not self.pages_path.exists():
+            return
+        with gzip.open(self.pages_path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                return  # truncated last member from a crash
+
+    def _repair(self):
+        # drop a truncated trailing member so that new appends stay readable
+        records = list(self.pages())
+        tmp = self.pages_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            for rec in records:
+                f.write(gzip.compress((json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8")))
+        tmp.replace(self.pages_path)
+
+    def append(self, meta: dict, items: list, checkpoint: dict = None):
+        if not self.enabled:
+            return
+        line = json.dumps({"meta": meta, "items": items}, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.pages_path, "ab") as f:
+                f.write(gzip.compress(line.encode("utf-8")))
+            ckpt = self.checkpoint() or {"pages": 0}
+            ckpt.update(checkpoint or meta)
+            ckpt["pages"] = ckpt.get("pages", 0) + 1
+            ckpt["done"] = False
+            self._write_checkpoint(ckpt)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            ckpt = self.checkpoint() or {}
+            ckpt["done"] = True
+            self._write_checkpoint(ckpt)
+
+    def _write_checkpoint(self, ckpt: dict):
+        ckpt["updated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(ckpt, indent=2), encoding="utf-8")
+        tmp.replace(self.checkpoint_path)
+
+
+class LandingZone:
+    def __init__(self, root: Path, enabled: bool = True):
+        self.root = Path(root)
+        self.enabled = enabled
+
+    def stream(self, owner: str, repo: str, source: str, shape: str = None) -> LandingStream:
+        return LandingStream(self.root, f"{owner}__{repo}", source, enabled=self.enabled, shape=shape)
@@ -0,0 +1,85 @@
+"""
+Adaptive GraphQL page size per repo.
+
+PageSizeController keeps one `first:` value per key (a repo) between
+min_size and max_size:
+- a timeout or 5xx halves it right away, so the next attempt asks for a
+  lighter page instead of retrying the same expensive query,
+- a page slower than target_latency_s, or costing more than max_cost points,
+  shrinks it by a quarter,
+- a page well under the latency target and the cost cap grows it by step,
+  but for the rest of the run never back up to a size that failed.
+
+Sizes are persisted as JSON so the next run starts from the last good size.
+"""
+import json
+import threading
+from pathlib import Path
+
+MIN_SIZE = 10
+MAX_SIZE = 100
+START_SIZE = 50
+STEP = 10
+TARGET_LATENCY_S = 6.0
+MAX_COST = 10
+
+
+class PageSizeController:
+    def __init__(self, path: Path, min_size: int = MIN_SIZE, max_size: int = MAX_SIZE,
+                 start_size: int = START_SIZE, step: int = STEP,
+                 target_latency_s: float = TARGET_LATENCY_S, max_cost: int = MAX_COST, log=print):
+        self.path = Path(path)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.start_size = start_size
+        self.step = step
+        self.target_latency_s = target_latency_s
+        self.max_cost = max_cost
+        self.log = log
+        self._lock = threading.Lock()
+        self._sizes = {}
+        self._ceilings = {}  # smallest size that timed out / 5xx'd this run
+        if self.path.exists():
+            self._sizes = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def _clamp(self, size: int) -> int:
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def size(self, key: str) -> int:
+        with self._lock:
+            return self._clamp(self._sizes.get(key, self.start_size))
+
+    def observe(self, key: str, latency_s: float, cost: int = None):
+        """Adjust after a successful page."""
+        with self._lock:
+            size = self._clamp(self._sizes.get(key, self.start_size))
+            if latency_s > self.target_latency_s or (cost is not None and cost > self.max_cost):
+                new = self._clamp(size * 3 // 4)
+            elif latency_s < self.target_latency_s / 2 and (cost is None or cost < self.max_cost):
+                new = self._clamp(min(size + self.step, self._ceilings.get(key, self.max_size + 1) - 1))
+            else:
+                new = size
+            self._sizes[key] = new
+        if new != size:
+            self.log(f"[PageSize] {key}: {size} -> {new} ({latency_s:.1f}s, cost {cost})")
+
+    def shrink(self, key: str, reason: str) -> bool:
+        """Halve after a timeout / 5xx. False if already at min_size."""
+        with self._lock:
+            size = self._clamp(self._sizes.get(key, self.start_size))
+            new = self._clamp(size // 2)
+            self._sizes[key] = new
+            self._ceilings[key] = min(size, self._ceilings.get(key, size))
+        if new == size:
+            return False
+        self.log(f"[PageSize] {key}: {size} -> {new} after {reason}")
+        self.save()
+        return True
+
+    def save(self):
+        with self._lock:
+            sizes = dict(sorted(self._sizes.items()))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(sizes, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
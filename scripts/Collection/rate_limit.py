@@ -0,0 +1,247 @@
+"""
+Rate-limit-aware request scheduler shared by the GitHub collectors
+(collect_all_metrics.py and Data_Collection.py).
+
+Every GitHub request goes through RateLimitScheduler.request(), which
+- tracks the live budget per resource (core / graphql / search) from the
+  X-RateLimit-* headers and the GraphQL rateLimit { cost remaining resetAt } object,
+- sends at full speed while plenty of quota remains, spreads the remaining
+  quota evenly over the time left once it runs low, and sleeps exactly until
+  reset when it is exhausted,
+- waits out 403/429 primary, secondary and abuse-detection limits
+  (Retry-After when given) instead of failing the run,
+- retries timeouts, connection errors and 5xx with capped exponential backoff
+  (retry_transient=False hands them straight back to the caller instead, e.g.
+  so that a GraphQL page can be retried with a smaller page size).
+
+With reroute_limits=True a rate-limited response is returned right after the
+bucket is blocked, so a CredentialPool can send the request with another token.
+
+peek(method, url, **kwargs) -> response or None answers a request without
+sending it (e.g. pinned cache entries); such answers neither book nor wait
+for budget.
+
+A GraphQL 200 body is decoded once: graphql_payload(r) keeps the result on
+the response, so the scheduler, a CredentialPool and the caller share it.
+"""
+import json
+import time
+import threading
+from datetime import datetime
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # optional: faster parsing only
+    orjson = None
+
+# Below this many remaining points the scheduler starts pacing requests
+PACE_BELOW = 200
+# Points kept in reserve; at or below this the scheduler waits for the reset
+RESERVE = 5
+# Attempts for transient failures (timeouts, 5xx, secondary limits).
+# Waiting for a primary-limit reset does not count as an attempt.
+MAX_ATTEMPTS = 6
+SECONDARY_BACKOFF_S = 60
+MAX_BACKOFF_S = 900
+
+
+class _Budget:
+    __slots__ = ("remaining", "reset_at", "blocked_until", "last_cost")
+
+    def __init__(self):
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.last_cost = 1
+
+
+def _bucket_for(url: str) -> str:
+    if url.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    if "/search/" in url:
+        return "search"
+    return "core"
+
+
+def graphql_payload(r) -> dict:
+    """The decoded body of a GraphQL response, parsed on first use and kept on r (ValueError if not JSON)."""
+    payload = getattr(r, "graphql_payload", None)
+    if payload is None:
+        payload = orjson.loads(r.content) if orjson is not None else json.loads(r.content)
+        r.graphql_payload = payload
+    return payload
+
+
+def _is_secondary_limit(r) -> bool:
+    text = (r.text or "").lower()
+    return "secondary rate limit" in text or "abuse" in text
+
+
+def _is_rate_limit(r) -> bool:
+    """True for a 403/429 that says it is a limit: Retry-After, an exhausted budget or a secondary limit."""
+    return (r.headers.get("Retry-After") is not None or r.headers.get("X-RateLimit-Remaining") == "0"
+            or _is_secondary_limit(r))
+
+
+class RateLimitScheduler:
+    def __init__(self, send=None, pace_below: int = PACE_BELOW, reserve: int = RESERVE,
+                 max_attempts: int = MAX_ATTEMPTS, peek=None, log=print):
+        # send(method, url, **kwargs) -> requests.Response
+        self.send = send or requests.request
+        self.peek = peek
+        self.pace_below = pace_below
+        self.reserve = reserve
+        self.max_attempts = max_attempts
+        self.log = log
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Budget bookkeeping
+    # -----------------------------
+    def _budget(self, bucket: str) -> _Budget:
+        b = self._budgets.get(bucket)
+        if b is None:
+            b = self._budgets[bucket] = _Budget()
+        return b
+
+    def budget(self, bucket: str) -> dict:
+        with self._lock:
+            b = self._budget(bucket)
+            return {"remaining": b.remaining, "reset_at": b.reset_at, "blocked_until": b.blocked_until}
+
+    def _reserve_slot(self, bucket: str) -> float:
+        """Seconds to wait before the next request on this bucket; books the request's cost."""
+        now = time.time()
+        with self._lock:
+            b = self._budget(bucket)
+            wait = max(0.0, b.blocked_until - now)
+            if b.remaining is not None and b.reset_at > now:
+                if b.remaining <= self.reserve:
+                    wait = max(wait, b.reset_at - now + 1)
+                elif b.remaining < self.pace_below:
+                    wait = max(wait, (b.reset_at - now) / b.remaining)
+                b.remaining -= b.last_cost
+        return wait
+
+    def _note_headers(self, bucket: str, r):
+        h = r.headers
+        remaining = h.get("X-RateLimit-Remaining")
+        reset = h.get("X-RateLimit-Reset")
+        bucket = (h.get("X-RateLimit-Resource") or bucket).lower()
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            b = self._budget(bucket)
+            b.remaining = int(remaining)
+            b.reset_at = float(reset)
+
+    def note_graphql_rate_limit(self, rate_limit: dict):
+        if not rate_limit:
+            return
+        reset_at = datetime.fromisoformat(rate_limit["resetAt"].replace("Z", "+00:00")).timestamp()
+        with self._lock:
+            b = self._budget("graphql")
+            b.remaining = int(rate_limit["remaining"])
+            b.reset_at = reset_at
+            b.last_cost = max(1, int(rate_limit.get("cost") or 1))
+
+    def _block(self, bucket: str, seconds: float, reason: str):
+        with self._lock:
+            b = self._budget(bucket)
+            b.blocked_until = max(b.blocked_until, time.time() + seconds)
+        self.log(f"[RateLimit] {bucket}: {reason}. waiting {seconds:.0f}s")
+
+    def _limit_wait(self, bucket: str, r, attempt: int):
+        """(seconds, counts_as_attempt) for a 403/429 caused by a rate limit, else None."""
+        retry_after = r.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after), _is_secondary_limit(r)
+        if r.headers.get("X-RateLimit-Remaining") == "0":
+            reset = float(r.headers.get("X-RateLimit-Reset", time.time() + 60))
+            return max(1.0, reset - time.time() + 1), False
+        if _is_secondary_limit(r):
+            return min(SECONDARY_BACKOFF_S * 2 ** (attempt - 1), MAX_BACKOFF_S), True
+        return None
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+    def request(self, method: str, url: str, retry_transient: bool = True, reroute_limits: bool = False, **kwargs):
+        bucket = _bucket_for(url)
+        attempt = 0
+
+        if self.peek is not None:
+            r = self.peek(method, url, **kwargs)
+            if r is not None:
+                return r
+
+        while True:
+            wait = self._reserve_slot(bucket)
+            if wait > 0:
+                if wait > 5:
+                    self.log(f"[RateLimit] {bucket}: sleeping {wait:.0f}s before next request")
+                time.sleep(wait)
+
+            try:
+                r = self.send(method, url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if not retry_transient:
+                    raise
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise RuntimeError(f"{method} {url} failed after {attempt} attempts ({type(e).__name__}).") from e
+                backoff = min(2 ** attempt, 30)
+                self.log(f"[HTTP] attempt {attempt}/{self.max_attempts} failed ({type(e).__name__}). retry {backoff}s")
+                time.sleep(backoff)
+                continue
+
+            self._note_headers(bucket, r)
+
+            if r.status_code in (403, 429):
+                limit = self._limit_wait(bucket, r, attempt + 1)
+                if limit is not None:
+                    seconds, counts = limit
+                    if counts:
+                        attempt += 1
+                        if attempt >= self.max_attempts:
+                            return r
+                    self._block(bucket, seconds, f"HTTP {r.status_code} rate limited")
+                    if reroute_limits:
+                        return r
+                    continue
+                return r
+
+            if r.status_code >= 500:
+                attempt += 1
+                if not retry_transient or attempt >= self.max_attempts:
+                    return r
+                backoff = min(2 ** attempt, 30)
+                self.log(f"[HTTP] {r.status_code} from {url}. attempt {attempt}/{self.max_attempts}, retry {backoff}s")
+                time.sleep(backoff)
+                continue
+
+            if bucket == "graphql" and r.status_code == 200:
+                try:
+                    data = graphql_payload(r)
+                except ValueError:
+                    return r
+                self.note_graphql_rate_limit((data.get("data") or {}).get("rateLimit"))
+                errors = data.get("errors") or []
+                if any(e.get("type") == "RATE_LIMITED" for e in errors):
+                    reset_in = self.budget("graphql")["reset_at"] - time.time()
+                    self._block("graphql", reset_in + 1 if reset_in > 0 else SECONDARY_BACKOFF_S,
+                                "GraphQL RATE_LIMITED")
+                    if reroute_limits:
+                        return r
+                    continue
+
+            return r
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the collectors are flat scripts importing their siblings
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,132 @@
+import json
+import time
+
+import pytest
+
+from credentials import CredentialPool
+from rate_limit import graphql_payload
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+REST_URL = "https://api.github.com/repos/o/r/pulls"
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(body or {})
+        self.reads = 0
+
+    @property
+    def content(self):
+        self.reads += 1
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeTransport:
+    """send(method, url, **kwargs) answering per token from a queue of responses."""
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+        self.sent = []
+
+    def __call__(self, method, url, **kwargs):
+        token = kwargs["headers"]["Authorization"].split()[-1]
+        self.sent.append(token)
+        queue = self.responses[token]
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+def pool(transport):
+    return CredentialPool(["a", "b"], send=transport, log=lambda msg: None)
+
+
+def test_ok_response_is_not_rerouted_while_the_credential_is_blocked():
+    transport = FakeTransport({
+        "a": [FakeResponse(200, {"ok": 1}, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"})],
+        "b": [FakeResponse(200, {"ok": 2})],
+    })
+    p = pool(transport)
+    send = p.send
+
+    def send_and_block(method, url, **kwargs):
+        # another in-flight request on the same token hits a secondary limit meanwhile
+        r = send(method, url, **kwargs)
+        p.credentials[0].scheduler._block("core", 60, "concurrent limit")
+        return r
+
+    p.send = send_and_block
+    r = p.get(REST_URL)
+    assert r.json() == {"ok": 1}
+    assert transport.sent == ["a"]
+
+
+def test_rest_rate_limit_is_rerouted_to_the_next_credential():
+    transport = FakeTransport({
+        "a": [FakeResponse(429, {"message": "slow down"}, {"Retry-After": "60"})],
+        "b": [FakeResponse(200, {"ok": 2})],
+    })
+    r = pool(transport).get(REST_URL)
+    assert r.json() == {"ok": 2}
+    assert transport.sent == ["a", "b"]
+
+
+def test_graphql_rate_limited_is_rerouted_to_the_next_credential():
+    limited = {"errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}
+    transport = FakeTransport({
+        "a": [FakeResponse(200, limited)],
+        "b": [FakeResponse(200, {"data": {"viewer": {"login": "b"}}})],
+    })
+    r = pool(transport).post(GRAPHQL_URL, json={"query": "{ viewer { login } }", "variables": {}})
+    assert r.json()["data"]["viewer"]["login"] == "b"
+    assert transport.sent == ["a", "b"]
+
+
+def test_graphql_body_is_decoded_once():
+    body = FakeResponse(200, {"data": {"viewer": {"login": "a"}, "rateLimit": {"cost": 1, "remaining": 4000,
+                                                                               "resetAt": "2030-01-01T00:00:00Z"}}})
+    p = pool(FakeTransport({"a": [body], "b": [body]}))
+    r = p.post(GRAPHQL_URL, json={"query": "{ viewer { login } }", "variables": {}})
+    assert graphql_payload(r)["data"]["viewer"]["login"] == "a"
+    assert p.credentials[0].scheduler.budget("graphql")["remaining"] == 4000
+    assert r.reads == 1
+
+
+def test_pinned_credential_is_never_rerouted():
+    transport = FakeTransport({
+        "a": [FakeResponse(200, {"ok": 1})],
+        "b": [FakeResponse(200, {"ok": 2})],
+    })
+    p = CredentialPool(["a", "b"], send=transport, pins={"o": 1}, log=lambda msg: None)
+    assert p.get(REST_URL).json() == {"ok": 2}
+    assert transport.sent == ["b"]
+
+
+def test_plain_403_is_returned_without_rerouting():
+    transport = FakeTransport({
+        "a": [FakeResponse(403, {"message": "Resource not accessible by integration"})],
+        "b": [FakeResponse(200, {"ok": 2})],
+    })
+    r = pool(transport).get(REST_URL)
+    assert r.status_code == 403
+    assert transport.sent == ["a"]
+
+
+def test_exhausted_403_is_rerouted_to_the_next_credential():
+    transport = FakeTransport({
+        "a": [FakeResponse(403, {"message": "API rate limit exceeded"},
+                           {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 600)})],
+        "b": [FakeResponse(200, {"ok": 2})],
+    })
+    r = pool(transport).get(REST_URL)
+    assert r.json() == {"ok": 2}
+    assert transport.sent == ["a", "b"]
+
+
+@pytest.mark.parametrize("pins", [{"o": 2}, {"o": -1}, {"o/r": "x"}])
+def test_invalid_pins_fail_when_the_pool_is_built(pins):
+    with pytest.raises(ValueError, match="Token pin"):
+        CredentialPool(["a", "b"], pins=pins, log=lambda msg: None)
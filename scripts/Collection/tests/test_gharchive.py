@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pandas as pd
+
+import collect_all_metrics as cam
+import gharchive
+
+
+def event(etype, repo, at, payload):
+    return {"id": "1", "type": etype, "actor": {"login": "x"}, "repo": {"id": 1, "name": repo},
+            "payload": payload, "public": True, "created_at": at}
+
+
+def pull_request(number, created, merged=None):
+    return {"number": number, "node_id": f"PR_{number}", "created_at": created, "merged_at": merged,
+            "closed_at": merged, "state": "closed" if merged else "open", "merged": bool(merged), "draft": False,
+            "additions": 10, "deletions": 2, "changed_files": 1, "commits": 1, "user": {"login": "dev"},
+            "merge_commit_sha": "abc" if merged else None}
+
+
+def release(rid, tag, at):
+    return {"id": rid, "tag_name": tag, "name": tag, "draft": False, "prerelease": False,
+            "created_at": at, "published_at": at}
+
+
+def write_dump(path, events):
+    with gzip.open(path, "wt") as f:
+        for ev in events:
+            f.write(json.dumps(ev, separators=(",", ":")) + "\n")
+
+
+def test_ingest_maps_pr_review_and_release_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(cam, "REPOS", [("acme", "widget")])
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path / "raw")
+    monkeypatch.setattr(cam, "DATA_DERIVED", tmp_path / "derived")
+    monkeypatch.setattr(cam, "REPO_CACHE", tmp_path / "repos")
+    cam.DATA_RAW.mkdir()
+    runs = pd.DataFrame([{"owner": "acme", "repo": "widget", "repo_full": "acme/widget", "run_id": 1,
+                          "workflow_name": "CI", "event": "push", "status": "completed", "conclusion": "success",
+                          "created_at": "2026-05-04T09:00:00Z", "run_started_at": "2026-05-04T09:00:00Z",
+                          "updated_at": "2026-05-04T09:05:00Z", "head_sha": "s0", "pr_numbers": "[]"}])
+    runs.to_csv(cam.DATA_RAW / "workflow_runs__acme__widget.csv", index=False)
+
+    repo = "acme/widget"
+    review = {"submitted_at": "2026-05-04T11:00:00Z", "state": "approved", "user": {"login": "rev"}}
+    write_dump(tmp_path / "2026-05-04-10.json.gz", [
+        event("PullRequestEvent", repo, "2026-05-04T10:00:00Z",
+              {"action": "opened", "pull_request": pull_request(1, "2026-05-04T10:00:00Z")}),
+        event("PushEvent", repo, "2026-05-04T10:01:00Z", {}),
+        event("PullRequestEvent", "other/repo", "2026-05-04T10:02:00Z",
+              {"action": "opened", "pull_request": pull_request(5, "2026-05-04T10:00:00Z")}),
+        event("PullRequestReviewEvent", repo, "2026-05-04T11:00:00Z",
+              {"action": "created", "review": review, "pull_request": pull_request(1, "2026-05-04T10:00:00Z")}),
+        event("ReleaseEvent", repo, "2026-05-04T12:00:00Z",
+              {"action": "published", "release": release(9, "v1", "2026-05-04T12:00:00Z")}),
+    ])
+    write_dump(tmp_path / "2026-05-05-9.json.gz", [
+        event("PullRequestEvent", repo, "2026-05-05T09:00:00Z",
+              {"action": "closed", "pull_request": pull_request(1, "2026-05-04T10:00:00Z", "2026-05-05T09:00:00Z")}),
+        event("ReleaseEvent", repo, "2026-05-05T12:00:00Z",
+              {"action": "published", "release": release(10, "v2", "2026-05-05T12:00:00Z")}),
+        event("ReleaseEvent", repo, "2026-05-05T13:00:00Z",
+              {"action": "deleted", "release": release(9, "v1", "2026-05-04T12:00:00Z")}),
+    ])
+
+    gharchive.main([str(tmp_path), "--workers", "1"])
+
+    prs = pd.read_csv(cam.DATA_RAW / "prs__acme__widget.csv")
+    assert prs[["pr_number", "state", "merged_at", "author", "additions"]].values.tolist() == [
+        [1, "MERGED", "2026-05-05T09:00:00Z", "dev", 10]]
+    assert prs.loc[0, "first_review_at"] == "2026-05-04T11:00:00Z"
+    assert prs.loc[0, "review_count"] == 1
+
+    reviews = pd.read_csv(cam.DATA_RAW / "pr_reviews__acme__widget.csv")
+    assert reviews[["pr_number", "review_state", "reviewer"]].values.tolist() == [[1, "APPROVED", "rev"]]
+
+    rels = pd.read_csv(cam.DATA_RAW / "releases__acme__widget.csv")
+    assert rels[["release_id", "tag_name"]].values.tolist() == [[10, "v2"]]
+
+    # runs are not in the archive: the API-collected table is kept
+    kept = pd.read_csv(cam.DATA_RAW / "workflow_runs__acme__widget.csv")
+    assert kept["run_id"].tolist() == [1]
+    assert (cam.DATA_DERIVED / "merge_frequency_weekly.csv").exists()
@@ -0,0 +1,64 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+import collect_all_metrics as cam
+import git_mining as gm
+
+COLLECTION = Path(__file__).resolve().parents[1]
+
+
+def test_offline_tools_import_without_token(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("GITHUB_TOKEN", "GITHUB_TOKENS")}
+    r = subprocess.run([sys.executable, "-c", "import git_mining, webhook_receiver, gharchive"],
+                       cwd=COLLECTION, env=env, capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+
+
+def git(cwd, *args, at=None):
+    env = dict(os.environ, GIT_AUTHOR_NAME="Dev", GIT_AUTHOR_EMAIL="dev@example.com",
+               GIT_COMMITTER_NAME="Dev", GIT_COMMITTER_EMAIL="dev@example.com")
+    if at:
+        env.update(GIT_AUTHOR_DATE=at, GIT_COMMITTER_DATE=at)
+    subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True)
+
+
+def commit(cwd, name, text, message, at):
+    Path(cwd, name).write_text(text)
+    git(cwd, "add", ".")
+    git(cwd, "commit", "-q", "-m", message, at=at)
+
+
+def test_mine_repo_walks_the_mainline_of_a_local_clone(tmp_path, monkeypatch):
+    day = lambda n: (datetime.now(timezone.utc) - timedelta(days=n)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    src = tmp_path / "src"
+    src.mkdir()
+    git(src, "init", "-q", "-b", "main")
+    commit(src, "a.txt", "a\n", "init", day(30))
+    git(src, "checkout", "-q", "-b", "feature")
+    commit(src, "b.txt", "x\ny\nz\n", "feat", day(29))
+    git(src, "checkout", "-q", "main")
+    git(src, "merge", "-q", "--no-ff", "feature", "-m", "Merge pull request #7 from dev/feature", at=day(28))
+    commit(src, "a.txt", "a\nb\n", "Fix thing (#8)", day(20))
+    git(src, "tag", "v1.1.0-rc1")
+
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path / "raw")
+    monkeypatch.setattr(cam, "REPO_CACHE", tmp_path / "repos")
+    monkeypatch.setattr(gm, "GIT_STATE_PATH", tmp_path / "raw" / "git_state.json")
+    cam.DATA_RAW.mkdir()
+    git(tmp_path, "clone", "-q", str(src), str(cam.REPO_CACHE / "acme__widget"))
+
+    commits, tags = gm.mine_repo("acme", "widget", fetch=False, full=False)
+    assert list(commits["pr_number"].dropna()) == [8, 7]
+    merge = commits[commits["pr_number"] == 7].iloc[0]
+    assert (merge["additions"], merge["deletions"]) == (3, 0)
+    assert tags[["tag_name", "prerelease"]].values.tolist() == [["v1.1.0-rc1", True]]
+
+    # incremental: only the new mainline commit is walked
+    commit(src, "a.txt", "a\nb\nc\n", "More (#9)", day(10))
+    git(cam.REPO_CACHE / "acme__widget", "pull", "-q")
+    commits, _ = gm.mine_repo("acme", "widget", fetch=False, full=False)
+    assert list(commits["pr_number"].dropna()) == [9, 8, 7]
+    assert (cam.DATA_RAW / "git_commits__acme__widget.csv").exists()
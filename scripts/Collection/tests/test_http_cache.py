@@ -0,0 +1,89 @@
+import time
+
+import requests
+
+import rate_limit
+from http_cache import ConditionalCache
+from rate_limit import RateLimitScheduler
+
+URL = "https://api.github.com/repos/o/r/actions/runs"
+
+
+def ok(body: bytes):
+    r = requests.Response()
+    r.status_code = 200
+    r._content = body
+    r.headers["ETag"] = '"v1"'
+    return r
+
+
+def test_pinned_entries_are_served_before_the_rate_limit(tmp_path, monkeypatch):
+    sent = []
+
+    def send(method, url, **kwargs):
+        sent.append(url)
+        return ok(b'{"total_count": 1}')
+
+    cache = ConditionalCache(send, tmp_path / "cache.sqlite", log=lambda msg: None)
+    scheduler = RateLimitScheduler(send=cache.request, peek=cache.pinned, log=lambda msg: None)
+    params = {"created": "2024-01-01..2024-01-02"}
+    scheduler.get(URL, params=params, cache_pin=True)
+
+    # budget exhausted until the reset an hour from now: a sent request would sleep
+    budget = scheduler._budget("core")
+    budget.remaining, budget.reset_at = 0, time.time() + 3600
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda s: (_ for _ in ()).throw(AssertionError(f"slept {s}s")))
+
+    r = scheduler.get(URL, params=params, cache_pin=True)
+    assert r.content == b'{"total_count": 1}'
+    assert r.headers["X-From-Cache"] == "1"
+    assert sent == [URL]
+    assert budget.remaining == 0
+    assert cache.stats["pinned_hits"] == 1
+
+
+def test_unpinned_entries_still_go_through_the_scheduler(tmp_path):
+    sent = []
+
+    def send(method, url, **kwargs):
+        sent.append(kwargs.get("headers") or {})
+        return ok(b"[]")
+
+    cache = ConditionalCache(send, tmp_path / "cache.sqlite", log=lambda msg: None)
+    scheduler = RateLimitScheduler(send=cache.request, peek=cache.pinned, log=lambda msg: None)
+    scheduler.get(URL)
+    scheduler.get(URL)
+    assert len(sent) == 2
+    assert sent[1]["If-None-Match"] == '"v1"'
+
+
+def pinned_cache(tmp_path, **kwargs):
+    def send(method, url, **kw):
+        return ok(b"x" * 1000)
+    return ConditionalCache(send, tmp_path / "cache.sqlite", log=lambda msg: None, **kwargs)
+
+
+def test_pinned_entries_count_toward_the_size_bound(tmp_path):
+    cache = pinned_cache(tmp_path, max_bytes=100)
+    for day in range(1, 6):
+        cache.request("GET", URL, params={"created": f"2024-01-0{day}"}, cache_pin=True)
+    stored = cache.db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses").fetchone()
+    assert stored[0] <= 100
+    assert cache.stats["evicted"] == 5 - stored[1]
+    # the most recent pin is kept
+    assert cache.pinned("GET", URL, params={"created": "2024-01-05"}) is not None
+
+
+def test_pins_not_served_for_the_ttl_expire(tmp_path):
+    cache = pinned_cache(tmp_path, pin_ttl_days=14)
+    cache.request("GET", URL, params={"created": "2024-01-01"}, cache_pin=True)
+    cache.request("GET", URL, params={"created": "2024-01-02"}, cache_pin=True)
+    with cache.db:
+        cache.db.execute("UPDATE responses SET last_used = ?", (time.time() - 15 * 86400,))
+    # served recently enough: kept
+    assert cache.pinned("GET", URL, params={"created": "2024-01-02"}) is not None
+
+    cache.request("GET", URL, params={"created": "2024-01-03"}, cache_pin=True)
+    assert cache.pinned("GET", URL, params={"created": "2024-01-01"}) is None
+    assert cache.pinned("GET", URL, params={"created": "2024-01-02"}) is not None
+    assert cache.pinned("GET", URL, params={"created": "2024-01-03"}) is not None
@@ -0,0 +1,54 @@
+import json
+
+import requests
+
+import collect_all_metrics as cam
+
+
+def response(status, body=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(body or {}).encode("utf-8")
+    r.url = "https://api.github.com/"
+    return r
+
+
+class FakeScheduler:
+    """Run 2 was deleted after listing (404), run 3 fails with a 502 on /timing."""
+
+    def __init__(self):
+        self.calls = []
+
+    def budget(self, bucket):
+        return {"remaining": None, "reset_at": 0.0, "blocked_until": 0.0}
+
+    def get(self, url, **kwargs):
+        run_id = int(url.split("/runs/")[1].split("/")[0])
+        self.calls.append(run_id)
+        if run_id == 2:
+            return response(404, {"message": "Not Found"})
+        if url.endswith("/jobs"):
+            job = {"id": run_id * 10, "run_attempt": 1, "name": "build", "status": "completed",
+                   "conclusion": "success", "started_at": "2026-10-01T00:00:00Z",
+                   "completed_at": "2026-10-01T00:01:00Z"}
+            return response(200, {"total_count": 1, "jobs": [job]})
+        if run_id == 3:
+            return response(502, {"message": "Bad Gateway"})
+        return response(200, {"run_duration_ms": 60000})
+
+
+def test_failing_run_is_skipped_and_retried(tmp_path, monkeypatch):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(cam, "SCHEDULER", scheduler)
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path)
+
+    entries = cam.fetch_jobs_for_runs("acme", "widget", [1, 2, 3, 4])
+    assert sorted(entries) == [1, 2, 4]
+    assert entries[2]["jobs"] == []
+    assert [job["id"] for job in entries[4]["jobs"]] == [40]
+
+    # only the failed run is looked up again
+    scheduler.calls.clear()
+    entries = cam.fetch_jobs_for_runs("acme", "widget", [1, 2, 3, 4])
+    assert set(scheduler.calls) == {3}
+    assert sorted(entries) == [1, 2, 4]
@@ -0,0 +1,26 @@
+from landing_zone import LandingZone
+
+
+def land_unfinished(zone, shape):
+    stream = zone.stream("o", "r", "prs", shape=shape)
+    assert stream.start() is None
+    stream.append({"page": 1, "cursor": "c1", "has_next": True}, [{"number": 1}])
+    return stream
+
+
+def test_unfinished_stream_resumes_with_the_same_shape(tmp_path):
+    zone = LandingZone(tmp_path)
+    land_unfinished(zone, "full")
+    stream = zone.stream("o", "r", "prs", shape="full")
+    ckpt = stream.start()
+    assert ckpt["cursor"] == "c1"
+    assert [rec["items"] for rec in stream.pages()] == [[{"number": 1}]]
+
+
+def test_unfinished_stream_of_another_shape_is_restarted(tmp_path):
+    zone = LandingZone(tmp_path)
+    land_unfinished(zone, "projected:merged_at,state")
+    stream = zone.stream("o", "r", "prs", shape="projected:first_review_at")
+    assert stream.start() is None
+    assert list(stream.pages()) == []
+    assert stream.checkpoint()["shape"] == "projected:first_review_at"
@@ -0,0 +1,60 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import collect_all_metrics as cam
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def iso(t):
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ") if t else None
+
+
+def raw_tables(seed=7):
+    rnd = random.Random(seed)
+    prs, runs, rels = [], [], []
+    for owner, repo in [("acme", "api"), ("acme", "web")]:
+        base = {"owner": owner, "repo": repo, "repo_full": f"{owner}/{repo}"}
+        for n in range(300):
+            created = START + timedelta(hours=rnd.randrange(24 * 120))
+            state = rnd.choice(["MERGED", "MERGED", "CLOSED", "OPEN"])
+            done = created + timedelta(hours=rnd.randrange(1, 400)) if state != "OPEN" else None
+            review = created + timedelta(hours=rnd.randrange(1, 48)) if rnd.random() < 0.7 else None
+            prs.append({**base, "pr_number": n, "created_at": iso(created),
+                        "merged_at": iso(done) if state == "MERGED" else None, "closed_at": iso(done),
+                        "state": state, "additions": rnd.randrange(500), "deletions": rnd.randrange(200),
+                        "first_review_at": iso(review), "review_count": rnd.randrange(4) if review else None})
+        shas = [f"{owner}{repo}{i:04x}" for i in range(250)]
+        for run_id in range(600):
+            started = START + timedelta(hours=rnd.randrange(24 * 120)) if rnd.random() < 0.95 else None
+            runs.append({**base, "run_id": run_id, "workflow_name": rnd.choice(["CI", "Deploy", "Release"]),
+                         "conclusion": rnd.choice(["success", "success", "failure", "cancelled"]),
+                         "run_started_at": iso(started),
+                         "updated_at": iso(started + timedelta(minutes=rnd.randrange(1, 90))) if started else None,
+                         "head_sha": rnd.choice(shas) if rnd.random() < 0.9 else None})
+        for release_id in range(12):
+            published = START + timedelta(days=rnd.randrange(150))
+            rels.append({**base, "release_id": release_id, "created_at": iso(published),
+                         "published_at": iso(published) if rnd.random() < 0.8 else None})
+    return (cam.enrich_prs(pd.DataFrame(prs)), cam.enrich_runs(pd.DataFrame(runs)),
+            cam.enrich_releases(pd.DataFrame(rels)))
+
+
+def test_online_tables_match_derive_tables():
+    prs, runs, rels = raw_tables()
+    online = cam.OnlineTables()
+    # fed per repo and in chunks, as --pipeline does
+    for repo_full in ["acme/web", "acme/api"]:
+        for source, df in [("runs", runs), ("prs", prs), ("releases", rels)]:
+            sub = df[df["repo_full"] == repo_full]
+            for start in range(0, len(sub), 128):
+                online.update(source, sub.iloc[start:start + 128])
+
+    emitted = online.emit()
+    batch = dict(zip(cam.DERIVED_TABLES, cam.derive_tables(prs, runs, rels)))
+    assert set(emitted) == set(batch)
+    for table, expected in batch.items():
+        pd.testing.assert_frame_equal(emitted[table].reset_index(drop=True), expected.reset_index(drop=True),
+                                      obj=table)
@@ -0,0 +1,43 @@
+import threading
+
+import pandas as pd
+
+import collect_all_metrics as cam
+
+
+def pr_page(numbers):
+    return pd.DataFrame([{"owner": "o", "repo": "r", "repo_full": "o/r", "pr_number": n,
+                          "created_at": "2026-03-02T00:00:00Z", "merged_at": None, "closed_at": None,
+                          "state": "OPEN", "additions": 1, "deletions": 1, "first_review_at": None}
+                         for n in numbers])
+
+
+def test_pages_are_enriched_while_later_pages_are_fetched(tmp_path, monkeypatch):
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path)
+    monkeypatch.setattr(cam, "REPOS", [("o", "r")])
+    monkeypatch.setattr(cam, "PIPELINE_CHUNK_ROWS", 2)
+    monkeypatch.setattr(cam, "run_sonar_snapshots_for_repo", lambda owner, repo: pd.DataFrame())
+    enriched = threading.Event()
+
+    def enrich(df):
+        enriched.set()
+        return cam.enrich_prs(df)
+
+    monkeypatch.setitem(cam.PIPELINE_SOURCES, "prs", ("prs", enrich))
+
+    def fetch_prs(owner, repo, on_page=None):
+        pages = [pr_page([5, 4]), pr_page([3]), pr_page([2, 1])]
+        for page in pages[:2]:
+            on_page(page)
+        # the first chunk is enriched before the last page comes in
+        assert enriched.wait(5)
+        on_page(pages[2])
+        return pd.concat(pages, ignore_index=True)
+
+    def no_rows(owner, repo):
+        return pd.DataFrame()
+
+    all_prs, all_runs, all_rels, all_sonar = cam.collect_pipeline((fetch_prs, no_rows, no_rows))
+    assert all_prs[0]["pr_number"].tolist() == [5, 4, 3, 2, 1]
+    assert pd.read_csv(tmp_path / "prs__o__r.csv")["pr_number"].tolist() == [5, 4, 3, 2, 1]
+    assert all_runs[0].empty and all_rels[0].empty and all_sonar == []
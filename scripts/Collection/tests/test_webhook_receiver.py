@@ -0,0 +1,92 @@
+import json
+import threading
+
+import pandas as pd
+import pytest
+import requests
+
+import collect_all_metrics as cam
+import webhook_receiver as wh
+
+SECRET = "test-secret"
+REPO = {"full_name": "acme/widget"}
+PR = {"node_id": "PR_7", "number": 7, "created_at": "2026-10-10T00:00:00Z", "merged_at": None, "closed_at": None,
+      "state": "open", "draft": False, "additions": 3, "deletions": 1, "changed_files": 1, "commits": 2,
+      "user": {"login": "dev"}, "merge_commit_sha": None}
+MERGED_PR = dict(PR, merged_at="2026-10-12T00:00:00Z", closed_at="2026-10-12T00:00:00Z", state="closed",
+                 merged=True, merge_commit_sha="abc")
+DELIVERIES = [
+    ("pull_request", {"action": "opened", "repository": REPO, "pull_request": PR}),
+    ("pull_request_review", {"action": "submitted", "repository": REPO, "pull_request": PR,
+                             "review": {"submitted_at": "2026-10-11T00:00:00Z", "state": "approved",
+                                        "user": {"login": "rev"}}}),
+    ("pull_request", {"action": "closed", "repository": REPO, "pull_request": MERGED_PR}),
+    ("workflow_run", {"action": "completed", "repository": REPO, "workflow_run": {
+        "id": 99, "name": "CI", "event": "push", "status": "completed", "conclusion": "success",
+        "created_at": "2026-10-12T00:00:00Z", "run_started_at": "2026-10-12T00:00:00Z",
+        "updated_at": "2026-10-12T00:10:00Z", "head_sha": "abc", "pull_requests": [{"number": 7}]}}),
+    ("release", {"action": "published", "repository": REPO, "release": {
+        "id": 5, "tag_name": "v1", "name": "v1", "draft": False, "prerelease": False,
+        "created_at": "2026-10-12T00:00:00Z", "published_at": "2026-10-12T00:00:00Z"}}),
+    ("release", {"action": "published", "repository": {"full_name": "other/repo"}, "release": {}}),
+]
+
+
+@pytest.fixture
+def receiver(tmp_path, monkeypatch):
+    monkeypatch.setattr(cam, "REPOS", [("acme", "widget")])
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path / "raw")
+    monkeypatch.setattr(cam, "DATA_DERIVED", tmp_path / "derived")
+    monkeypatch.setattr(cam, "REPO_CACHE", tmp_path / "repos")
+    server = wh.serve("127.0.0.1", 0, SECRET)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, event, payload, secret=SECRET):
+    body = json.dumps(payload).encode("utf-8")
+    return requests.post(url, data=body, timeout=10, headers={
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event,
+        "X-Hub-Signature-256": wh.sign(body, secret),
+    })
+
+
+def test_bad_signature_is_rejected(receiver):
+    r = post(receiver, *DELIVERIES[0], secret="wrong")
+    assert r.status_code == 401
+    assert not (cam.DATA_RAW / "prs__acme__widget.csv").exists()
+
+
+def test_signed_deliveries_are_upserted(receiver):
+    outcomes = [post(receiver, event, payload) for event, payload in DELIVERIES]
+    assert [r.status_code for r in outcomes] == [200] * len(DELIVERIES)
+    assert outcomes[-1].text.startswith("ignored release for other/repo")
+
+    prs = pd.read_csv(cam.DATA_RAW / "prs__acme__widget.csv")
+    assert prs[["pr_number", "state", "merged_at", "merge_sha", "author"]].values.tolist() == [
+        [7, "MERGED", "2026-10-12T00:00:00Z", "abc", "dev"]]
+    # the closing pull_request payload has no reviews: the review event's values are kept
+    assert prs.loc[0, "first_review_at"] == "2026-10-11T00:00:00Z"
+    assert prs.loc[0, "review_count"] == 1
+
+    reviews = pd.read_csv(cam.DATA_RAW / "pr_reviews__acme__widget.csv")
+    assert reviews[["pr_number", "review_state", "reviewer"]].values.tolist() == [[7, "APPROVED", "rev"]]
+
+    runs = pd.read_csv(cam.DATA_RAW / "workflow_runs__acme__widget.csv")
+    assert runs[["run_id", "workflow_name", "conclusion", "head_sha"]].values.tolist() == [[99, "CI", "success", "abc"]]
+
+    rels = pd.read_csv(cam.DATA_RAW / "releases__acme__widget.csv")
+    assert rels[["release_id", "tag_name"]].values.tolist() == [[5, "v1"]]
+
+
+def test_redelivered_review_is_counted_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(cam, "REPOS", [("acme", "widget")])
+    monkeypatch.setattr(cam, "DATA_RAW", tmp_path / "raw")
+    for event, payload in DELIVERIES[:2] + DELIVERIES[1:2]:
+        wh.handle_event(event, payload)
+    prs = pd.read_csv(cam.DATA_RAW / "prs__acme__widget.csv")
+    assert prs.loc[0, "review_count"] == 1
@@ -0,0 +1,254 @@
+"""
+Local receiver for GitHub webhooks: pull_request, pull_request_review,
+workflow_run and release events are mapped to the same row schemas as
+fetch_all_prs / fetch_workflow_runs_by_windows / fetch_releases and upserted
+into the per-repo raw CSVs in data/raw, so polling only has to fill gaps.
+
+Deliveries must carry a valid X-Hub-Signature-256 for WEBHOOK_SECRET.
+Events for repos outside REPOS are acknowledged and ignored.
+
+Serve:
+    WEBHOOK_SECRET=... python webhook_receiver.py serve --port 8787
+
+Replay recorded deliveries ({"event": ..., "payload": {...}} JSON files),
+signed with the same secret, against a running receiver:
+    WEBHOOK_SECRET=... python webhook_receiver.py replay deliveries/*.json --url http://127.0.0.1:8787/
+"""
+import os
+import hmac
+import json
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+import pandas as pd
+
+import collect_all_metrics as cam
+
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8787"))
+
+# One writer per repo raw table at a time
+_table_locks = {}
+_table_locks_lock = threading.Lock()
+
+def table_lock(owner: str, repo: str, prefix: str) -> threading.Lock:
+    with _table_locks_lock:
+        return _table_locks.setdefault((owner, repo, prefix), threading.Lock())
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    return bool(signature) and hmac.compare_digest(sign(body, secret), signature)
+
+# =============================
+# Payload -> raw rows
+# =============================
+def graphql_shaped_pr(pr: dict) -> dict:
+    """REST / webhook pull_request object in the GraphQL shape pr_row() reads."""
+    merged = pr.get("merged") or pr.get("merged_at") is not None
+    node = {
+        "id": pr.get("node_id"),
+        "number": pr["number"],
+        "createdAt": pr.get("created_at"),
+        "mergedAt": pr.get("merged_at"),
+        "closedAt": pr.get("closed_at"),
+        "state": "MERGED" if merged else (pr.get("state") or "").upper(),
+        "isDraft": pr.get("draft"),
+        "additions": pr.get("additions"),
+        "deletions": pr.get("deletions"),
+        "changedFiles": pr.get("changed_files"),
+        "commits": {"totalCount": pr["commits"]} if "commits" in pr else None,
+        "author": {"login": pr["user"]["login"]} if pr.get("user") else None,
+        "mergeCommit": {"oid": pr["merge_commit_sha"]} if merged and pr.get("merge_commit_sha") else None,
+    }
+    return node
+
+def write_raw_table(owner: str, repo: str, prefix: str, df: pd.DataFrame):
+    path = cam.DATA_RAW / f"{prefix}__{cam.safe_slug(owner, repo)}.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    df.to_csv(tmp, index=False)
+    tmp.replace(path)
+
+def upsert_pr(owner: str, repo: str, row: dict):
+    with table_lock(owner, repo, "prs"):
+        existing = cam.read_raw_table(owner, repo, "prs", cam.PR_COLUMNS)
+        if existing is not None:
+            # pull_request payloads carry no reviews: keep what polling / review events recorded
+            old = existing[existing["pr_number"] == row["pr_number"]]
+            if not old.empty:
+                for col in ("first_review_at", "review_count"):
+                    if row.get(col) is None:
+                        row[col] = old.iloc[-1][col]
+        prs = cam.upsert_rows(existing, pd.DataFrame([row], columns=cam.PR_COLUMNS), "pr_number")
+        prs = prs.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+        write_raw_table(owner, repo, "prs", cam.enrich_prs(prs))
+
+def apply_review(owner: str, repo: str, pr: dict, review: dict):
+    review_at = review.get("submitted_at")
+    rv = cam.review_row(owner, repo, pr["number"], {
+        "createdAt": review_at,
+        "state": (review.get("state") or "").upper(),
+        "author": {"login": review["user"]["login"]} if review.get("user") else None,
+    })
+    reviews_path = cam.DATA_RAW / f"pr_reviews__{cam.safe_slug(owner, repo)}.csv"
+    with table_lock(owner, repo, "pr_reviews"):
+        reviews = pd.read_csv(reviews_path) if reviews_path.exists() else pd.DataFrame(columns=cam.REVIEW_COLUMNS)
+        key = ["pr_number", "review_created_at", "reviewer"]
+        seen = ((reviews[key] == pd.Series(rv)[key]).all(axis=1)).any() if not reviews.empty else False
+        if not seen:
+            reviews = pd.concat([reviews, pd.DataFrame([rv])], ignore_index=True)
+            tmp = reviews_path.with_suffix(".tmp")
+            reviews.to_csv(tmp, index=False)
+            tmp.replace(reviews_path)
+    if seen:
+        return
+
+    with table_lock(owner, repo, "prs"):
+        existing = cam.read_raw_table(owner, repo, "prs", cam.PR_COLUMNS)
+        old = existing[existing["pr_number"] == pr["number"]] if existing is not None else pd.DataFrame()
+        if old.empty:
+            row = cam.pr_row(owner, repo, graphql_shaped_pr(pr))
+            row.update({"first_review_at": review_at, "review_count": 1})
+        else:
+            row = old.iloc[-1].to_dict()
+            first = row["first_review_at"]
+            row["first_review_at"] = min(first, review_at) if isinstance(first, str) and review_at else review_at
+            row["review_count"] = (0 if pd.isna(row["review_count"]) else int(row["review_count"])) + 1
+        prs = cam.upsert_rows(existing, pd.DataFrame([row], columns=cam.PR_COLUMNS), "pr_number")
+        prs = prs.sort_values(["created_at", "pr_number"], ascending=False).reset_index(drop=True)
+        write_raw_table(owner, repo, "prs", cam.enrich_prs(prs))
+
+def upsert_run(owner: str, repo: str, run: dict):
+    with table_lock(owner, repo, "workflow_runs"):
+        existing = cam.read_raw_table(owner, repo, "workflow_runs", cam.RUN_COLUMNS)
+        row = pd.DataFrame([cam.run_row(owner, repo, run)], columns=cam.RUN_COLUMNS)
+        runs = cam.upsert_rows(existing, row, "run_id")
+        runs = runs.sort_values(["created_at", "run_id"]).reset_index(drop=True)
+        write_raw_table(owner, repo, "workflow_runs", cam.enrich_runs(runs))
+
+def upsert_release(owner: str, repo: str, rel: dict, deleted: bool = False):
+    with table_lock(owner, repo, "releases"):
+        existing = cam.read_raw_table(owner, repo, "releases", cam.RELEASE_COLUMNS)
+        if deleted:
+            if existing is None:
+                return
+            rels = existing[existing["release_id"] != rel["id"]]
+        else:
+            row = pd.DataFrame([cam.release_row(owner, repo, rel)], columns=cam.RELEASE_COLUMNS)
+            rels = cam.upsert_rows(existing, row, "release_id")
+        rels = rels.sort_values(["created_at", "release_id"], ascending=False).reset_index(drop=True)
+        write_raw_table(owner, repo, "releases", cam.enrich_releases(rels) if not rels.empty else rels)
+
+def handle_event(event: str, payload: dict) -> str:
+    """Apply one delivery to the raw tables; returns a short outcome for the log."""
+    full_name = (payload.get("repository") or {}).get("full_name", "")
+    owner, _, repo = full_name.partition("/")
+    if (owner, repo) not in cam.REPOS:
+        return f"ignored {event} for {full_name or '?'}"
+
+    action = payload.get("action")
+    if event == "pull_request":
+        upsert_pr(owner, repo, cam.pr_row(owner, repo, graphql_shaped_pr(payload["pull_request"])))
+    elif event == "pull_request_review":
+        if action != "submitted":
+            return f"ignored {event}.{action}"
+        apply_review(owner, repo, payload["pull_request"], payload["review"])
+    elif event == "workflow_run":
+        upsert_run(owner, repo, payload["workflow_run"])
+    elif event == "release":
+        upsert_release(owner, repo, payload["release"], deleted=action == "deleted")
+    else:
+        return f"ignored {event}"
+    return f"{event}.{action} -> {full_name}"
+
+# =============================
+# HTTP receiver
+# =============================
+class WebhookHandler(BaseHTTPRequestHandler):
+    secret = None
+
+    def _reply(self, status: int, msg: str):
+        body = (msg + "\n").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not verify_signature(body, self.headers.get("X-Hub-Signature-256"), self.secret):
+            self._reply(401, "bad signature")
+            return
+
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            self._reply(200, "pong")
+            return
+        try:
+            outcome = handle_event(event, json.loads(body))
+        except (KeyError, TypeError, ValueError) as e:
+            cam.log(f"[Webhook] {event} {self.headers.get('X-GitHub-Delivery')}: bad payload ({e!r})")
+            self._reply(400, "bad payload")
+            return
+        cam.log(f"[Webhook] {outcome}")
+        self._reply(200, outcome)
+
+    def log_message(self, fmt, *args):
+        pass  # one line per delivery is logged by do_POST
+
+def serve(host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT, secret: str = WEBHOOK_SECRET):
+    if not secret:
+        raise RuntimeError("Missing WEBHOOK_SECRET env var. Set it before running.")
+    cam.ensure_data_dirs()
+    handler = type("Handler", (WebhookHandler,), {"secret": secret})
+    server = ThreadingHTTPServer((host, port), handler)
+    cam.log(f"[Webhook] listening on http://{host}:{server.server_port}/ (raw tables in {cam.DATA_RAW})")
+    return server
+
+def replay(paths: list, url: str, secret: str = WEBHOOK_SECRET):
+    """POST recorded deliveries ({"event": ..., "payload": {...}}) to a receiver, signed with secret."""
+    if not secret:
+        raise RuntimeError("Missing WEBHOOK_SECRET env var. Set it before running.")
+    for i, path in enumerate(paths):
+        delivery = json.loads(Path(path).read_text(encoding="utf-8"))
+        body = json.dumps(delivery["payload"]).encode("utf-8")
+        r = requests.post(url, data=body, timeout=30, headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": delivery["event"],
+            "X-GitHub-Delivery": delivery.get("delivery", f"replay-{i}"),
+            "X-Hub-Signature-256": sign(body, secret),
+        })
+        cam.log(f"[Replay] {path}: {r.status_code} {r.text.strip()}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Receive GitHub webhooks into data/raw, or replay recorded deliveries.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("serve", help="run the receiver")
+    sp.add_argument("--host", default=WEBHOOK_HOST)
+    sp.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    rp = sub.add_parser("replay", help="POST recorded deliveries to a running receiver")
+    rp.add_argument("paths", nargs="+")
+    rp.add_argument("--url", default=f"http://{WEBHOOK_HOST}:{WEBHOOK_PORT}/")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        server = serve(args.host, args.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        replay(args.paths, args.url)
+
+if __name__ == "__main__":
+    main()